@@ -37,6 +37,7 @@
 ## name.
 
 import sys
+import threading
 
 import roslib
 
@@ -44,19 +45,63 @@ import roslib
 class Module(object):
     def __init__(self, wrapped):
         self.wrapped = wrapped
+        ## attribute name -> imported module
+        self._resolved = {}
+        ## package name -> error message of the failed import
+        self._failed = {}
+        self._lock = threading.Lock()
 
     def __getattr__(self, name):
         try:
             return getattr(self.wrapped, name)
         except AttributeError:
-            import roslib.packages
-            try:
-                roslib.load_manifest(name.split('.')[0])
-            except roslib.packages.InvalidROSPkgException as e:
-                raise ImportError("Cannot import module '%s': \n%s"%(name, str(e)))
-            return __import__(name)
+            if name.startswith('__'):
+                raise # e.g. __all__, not a package
+        # attributes are resolved once per process. Loading happens
+        # outside of the lock, as it imports modules that may use ros
+        # themselves; concurrent misses resolve to the same module.
+        val = self._resolved.get(name)
+        if val is not None:
+            return val
+        package = name.split('.')[0]
+        msg = self._failed.get(package)
+        if msg is not None:
+            raise ImportError(msg)
+        try:
+            val = self._load(name, package)
+        except ImportError as e:
+            with self._lock:
+                self._failed[package] = str(e)
+            raise
+        with self._lock:
+            self._resolved[name] = val
+        return val
+
+    def _load(self, name, package):
+        import rospkg
+        import roslib.packages
+        try:
+            roslib.load_manifest(package)
+        except (roslib.packages.InvalidROSPkgException, rospkg.ResourceNotFound) as e:
+            raise ImportError("Cannot import module '%s': \n%s"%(name, str(e)))
+        return __import__(name)
+
+    def _clear_cache(self, package=None):
+        """
+        Forget resolved attributes and failed packages, e.g. after
+        building a package.
+        @param package: package name, or None for all packages
+        @type  package: str
+        """
+        with self._lock:
+            if package is None:
+                self._resolved.clear()
+                self._failed.clear()
+            else:
+                self._failed.pop(package, None)
+                for name in [n for n in self._resolved if n.split('.')[0] == package]:
+                    del self._resolved[name]
 
 ## rewrite our own entry in sys.modules so that dynamic loading
 ## works.
 sys.modules[__name__] = Module(sys.modules[__name__])
-
@@ -47,11 +47,25 @@ numerous ROS tools (e.g. rostopic).
 
 __version__ = '1.7.0'
 
+import sys
+
 from roslib.launcher import load_manifest
 
-# this import is necessary due to a bug in purge_build.py in our
-# debian assets.
-import roslib.stacks
+# submodules that used to be imported by 'import roslib'. They are
+# loaded on first attribute access where Python supports it.
+_LAZY_SUBMODULES = frozenset(['stacks', 'packages', 'manifest', 'manifestlib',
+                              'stack_manifest', 'exceptions'])
+
+if sys.version_info >= (3, 7):
+    def __getattr__(name):
+        if name in _LAZY_SUBMODULES:
+            import importlib
+            return importlib.import_module('roslib.'+name)
+        raise AttributeError("module 'roslib' has no attribute %r"%name)
+else:
+    # this import is necessary due to a bug in purge_build.py in our
+    # debian assets.
+    import roslib.stacks
 
 _is_interactive = False
 def set_interactive(interactive):
@@ -0,0 +1,288 @@
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2012, Willow Garage, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+#
+#  * Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+#  * Redistributions in binary form must reproduce the above
+#    copyright notice, this list of conditions and the following
+#    disclaimer in the documentation and/or other materials provided
+#    with the distribution.
+#  * Neither the name of Willow Garage, Inc. nor the names of its
+#    contributors may be used to endorse or promote products derived
+#    from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE
+# COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT
+# LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN
+# ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+#
+
+"""
+asyncio variants of roslib APIs. Python 3 only: this module cannot be
+imported by Python 2.
+
+Package, stack and manifest queries run their blocking file system
+work on an executor (the loop's default one unless L{set_executor()}
+is called) and run rospack with asyncio.create_subprocess_exec(), so
+they do not block the event loop. Concurrent identical queries on a
+loop share one in-flight request, and therefore its result objects.
+"""
+
+import asyncio
+import os
+
+import rospkg
+
+import roslib.exceptions
+import roslib.manifest
+import roslib.packages
+import roslib.stacks
+
+from roslib.network import MAX_HANDSHAKE_HEADER_SIZE, ROSHandshakeException, \
+     _struct_I, decode_ros_handshake_header, encode_ros_handshake_header
+
+## handshake utils ###########################################
+
+def _terminated(received):
+    return ROSHandshakeException("connection from sender terminated before handshake header received. %s bytes were received. Please check sender for additional details."%received)
+
+async def read_ros_handshake_header(reader, max_size=MAX_HANDSHAKE_HEADER_SIZE):
+    """
+    Read in tcpros header off the asyncio stream \a reader. asyncio
+    counterpart of roslib.network.read_ros_handshake_header().
+
+    @param reader: stream to read from
+    @type  reader: asyncio.StreamReader
+    @param max_size: largest header size to accept, in bytes
+    @type  max_size: int
+    @return: key value pairs encoded in handshake
+    @rtype: {str: str}
+    @raise ROSHandshakeException: If header format does not match expected
+    """
+    try:
+        prefix = await reader.readexactly(4)
+    except asyncio.IncompleteReadError as e:
+        raise _terminated(len(e.partial))
+    (size, ) = _struct_I.unpack(prefix)
+    if size > max_size:
+        raise ROSHandshakeException("handshake header of %s bytes exceeds limit of %s bytes"%(size, max_size))
+    try:
+        body = await reader.readexactly(size)
+    except asyncio.IncompleteReadError as e:
+        raise _terminated(4 + len(e.partial))
+    return decode_ros_handshake_header(prefix + body)
+
+async def write_ros_handshake_header(writer, header):
+    """
+    Write ROS handshake header header to the asyncio stream \a writer.
+    asyncio counterpart of roslib.network.write_ros_handshake_header().
+
+    @param writer: stream to write to
+    @type  writer: asyncio.StreamWriter
+    @param header: header field keys/values
+    @type  header: {str : str}
+    @return: Number of bytes sent (for statistics)
+    @rtype: int
+    """
+    s = encode_ros_handshake_header(header)
+    writer.write(s)
+    await writer.drain()
+    return len(s)
+
+## package and manifest queries ##############################
+
+## executor for blocking queries, None for the loop's default executor
+_executor = None
+## (loop, request key) -> future of the request in flight
+_inflight = {}
+
+def set_executor(executor):
+    """
+    Set the executor that runs blocking queries.
+    @param executor: executor, or None for the default executor of
+      the event loop
+    @type  executor: concurrent.futures.Executor
+    """
+    global _executor
+    _executor = executor
+
+def _env_key(env=None):
+    """
+    @return: the part of env (defaults to os.environ) that query
+      results depend on
+    @rtype: (str, str)
+    """
+    if env is None:
+        env = os.environ
+    return env.get(rospkg.environment.ROS_ROOT), env.get(rospkg.environment.ROS_PACKAGE_PATH)
+
+async def _coalesce(key, factory):
+    """
+    Await the request identified by key, starting it with factory()
+    unless it is already in flight on this loop. Cancelling one
+    waiter does not cancel the request for the others.
+    @param factory: returns a coroutine that performs the request
+    @type  factory: fn()
+    """
+    loop = asyncio.get_event_loop()
+    k = (loop, key)
+    future = _inflight.get(k)
+    if future is None:
+        future = _inflight[k] = asyncio.ensure_future(factory())
+        def done(f):
+            if _inflight.get(k) is f:
+                del _inflight[k]
+            if not f.cancelled():
+                f.exception() # retrieved, even if every waiter was cancelled
+        future.add_done_callback(done)
+    return await asyncio.shield(future)
+
+async def _run_blocking(fn, *args):
+    return await asyncio.get_event_loop().run_in_executor(_executor, fn, *args)
+
+async def _communicate(args, env=None):
+    """
+    Run command args.
+    @return: standard output and standard error
+    @rtype: (bytes, bytes)
+    @raise OSError: if the command cannot be run
+    """
+    proc = await asyncio.create_subprocess_exec(
+        *args, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE, env=env)
+    return await proc.communicate()
+
+async def _find_pkg_dir(package, ros_root, ros_package_path):
+    penv, ros_root, ros_package_path = roslib.packages._pkg_dir_env(ros_root, ros_package_path)
+    pkg_dir = await _run_blocking(roslib.packages._cached_pkg_dir, package, ros_root, ros_package_path)
+    if pkg_dir is not None:
+        return pkg_dir
+    try:
+        rpout, rperr = await _communicate(['rospack', 'find', package], penv)
+    except OSError as e:
+        raise roslib.packages.InvalidROSPkgException("Environment configuration is invalid: cannot locate rospack (%s)"%e)
+    return roslib.packages._rospack_find_result(package, rpout, rperr, ros_root, ros_package_path)
+
+async def get_pkg_dir(package, required=True, ros_root=None, ros_package_path=None):
+    """
+    asyncio counterpart of L{roslib.packages.get_pkg_dir()}.
+
+    @param package: package name
+    @type  package: str
+    @param required: if True, an exception will be raised if the
+    package directory cannot be located.
+    @type  required: bool
+    @param ros_root: if specified, override ROS_ROOT
+    @type  ros_root: str
+    @param ros_package_path: if specified, override ROS_PACKAGE_PATH
+    @type  ros_package_path: str
+    @return: directory containing package or None if package cannot be found and required is False.
+    @rtype: str
+    @raise InvalidROSPkgException: if required is True and package cannot be located
+    """
+    key = ('get_pkg_dir', package, ros_root, ros_package_path, _env_key())
+    try:
+        return await _coalesce(key, lambda: _find_pkg_dir(package, ros_root, ros_package_path))
+    except asyncio.CancelledError:
+        raise
+    except Exception:
+        if required:
+            raise
+        return None
+
+async def get_pkg_dirs(packages, required=True):
+    """
+    asyncio counterpart of L{roslib.packages.get_pkg_dirs()}.
+
+    @param packages: package names
+    @type  packages: [str]
+    @return: directory of each package, None for packages that cannot
+    be found if required is False
+    @rtype: [str]
+    @raise InvalidROSPkgException: if required is True and a package cannot be located
+    """
+    packages = list(packages)
+    key = ('get_pkg_dirs', tuple(packages), required, _env_key())
+    dirs = await _coalesce(key, lambda: _run_blocking(roslib.packages.get_pkg_dirs, packages, required))
+    return list(dirs)
+
+async def load_manifest(package):
+    """
+    asyncio counterpart of L{roslib.manifest.load_manifest()}.
+    Concurrent callers share the returned instance.
+
+    @param package: package name
+    @type  package: str
+    @return: Manifest instance for package
+    @rtype: L{roslib.manifest.Manifest}
+    """
+    key = ('load_manifest', package, _env_key())
+    return await _coalesce(key, lambda: _run_blocking(roslib.manifest.load_manifest, package))
+
+async def get_stack_dir(stack, env=None):
+    """
+    asyncio counterpart of L{roslib.stacks.get_stack_dir()}.
+
+    @param stack: stack name
+    @type  stack: str
+    @param env: override environment variables
+    @type  env: {str: str}
+    @return: filesystem path of stack
+    @rtype: str
+    @raise InvalidROSStackException: if stack cannot be located.
+    """
+    key = ('get_stack_dir', stack, _env_key(env))
+    return await _coalesce(key, lambda: _run_blocking(roslib.stacks.get_stack_dir, stack, env))
+
+async def list_stacks(env=None):
+    """
+    asyncio counterpart of L{roslib.stacks.list_stacks()}.
+
+    @param env: override environment variables
+    @type  env: {str: str}
+    @return: complete list of stacks names in ROS environment
+    @rtype: [str]
+    """
+    stacks = await _coalesce(('list_stacks', _env_key(env)),
+                             lambda: _run_blocking(roslib.stacks.list_stacks, env))
+    return list(stacks)
+
+async def _exec(command, args):
+    out, _ = await _communicate([command] + list(args))
+    val = out.decode().strip()
+    if val.startswith('%s:'%command): #error message
+        raise roslib.exceptions.ROSLibException(val)
+    return val
+
+async def rospackexec(args):
+    """
+    asyncio counterpart of roslib.rospack.rospackexec().
+    @return: result of executing rospack command. string will be strip()ed.
+    @rtype: str
+    @raise roslib.exceptions.ROSLibException: if rospack command fails
+    """
+    args = list(args)
+    return await _coalesce(('rospack', tuple(args), _env_key()), lambda: _exec('rospack', args))
+
+async def rosstackexec(args):
+    """
+    asyncio counterpart of roslib.rospack.rosstackexec().
+    @return: result of executing rosstack command. string will be strip()ed.
+    @rtype: str
+    @raise roslib.exceptions.ROSLibException: if rosstack command fails
+    """
+    args = list(args)
+    return await _coalesce(('rosstack', tuple(args), _env_key()), lambda: _exec('rosstack', args))
@@ -0,0 +1,564 @@
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2012, Willow Garage, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+#
+#  * Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+#  * Redistributions in binary form must reproduce the above
+#    copyright notice, this list of conditions and the following
+#    disclaimer in the documentation and/or other materials provided
+#    with the distribution.
+#  * Neither the name of Willow Garage, Inc. nor the names of its
+#    contributors may be used to endorse or promote products derived
+#    from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE
+# COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT
+# LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN
+# ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+#
+
+"""
+Spec-driven serialization of ROS messages for introspection tools
+that only have a L{roslib.msgs.MsgSpec} and no generated message
+class, e.g.::
+
+  spec = roslib.msgs.load_from_string(text, 'sensor_msgs')
+  codec = roslib.codec.get_codec(spec)
+  msg = codec.decode(data)
+  data = codec.encode(msg)
+
+Decoded messages are dictionaries keyed by field name. time and
+duration values are (secs, nsecs) tuples, uint8/char arrays are byte
+strings and variable-length arrays of other numeric types are
+array.array instances (lists for bool and for types the array module
+cannot represent). Embedded message types are resolved through the
+roslib.msgs registry. Tools that receive the full message definition
+(e.g. from a connection header or bag file) can use
+L{get_codec_from_full_text()} instead, which does not need the
+embedded types to be installed.
+"""
+
+import array
+import struct
+import sys
+
+import roslib.msgs
+import roslib.names
+from roslib.msgs import Field, STRUCT_FORMATS
+
+if sys.hexversion > 0x03000000: #Python3
+    python3 = True
+else:
+    python3 = False
+
+class MsgCodecException(Exception):
+    """
+    Exception to represent errors encoding or decoding a message
+    """
+    pass
+
+_uint32 = struct.Struct('<I')
+
+def _array_typecode(fmt):
+    """
+    @return: array typecode with the size of struct format character
+        fmt, or None if the array module cannot represent it
+    @rtype: str
+    """
+    for code in {'i': 'il', 'I': 'IL', 'q': 'ql', 'Q': 'QL'}.get(fmt, fmt):
+        try:
+            if array.array(code).itemsize == struct.calcsize('<'+fmt):
+                return code
+        except ValueError:
+            pass # typecode unsupported by this version of Python
+    return None
+
+## numeric type -> array typecode, for types decoded with the array module
+ARRAY_TYPECODES = {}
+for _t, _f in STRUCT_FORMATS.items():
+    if len(_f) == 1 and _t != 'bool' and _array_typecode(_f):
+        ARRAY_TYPECODES[_t] = _array_typecode(_f)
+
+def _get(msg, name):
+    if isinstance(msg, dict):
+        return msg[name]
+    return getattr(msg, name)
+
+def _to_bytes(val):
+    if python3 and isinstance(val, str):
+        return val.encode('utf-8')
+    elif not python3 and isinstance(val, unicode):
+        return val.encode('utf-8')
+    elif isinstance(val, (bytes, bytearray)):
+        return bytes(val)
+    elif isinstance(val, array.array):
+        return val.tostring() if not python3 else val.tobytes()
+    return bytes(bytearray(val)) # list of ints
+
+def _view_bytes(view, start, end):
+    """
+    @return: copy of view[start:end]
+    @rtype: bytes
+    @raise MsgCodecException: if view is too short
+    """
+    if end > len(view):
+        raise MsgCodecException("buffer too short: need %s bytes, have %s"%(end, len(view)))
+    return view[start:end].tobytes()
+
+# fixed-size values ###########################################
+
+def _lookup(spec, base_type, get_spec):
+    """
+    @return: spec of embedded type base_type of spec
+    @rtype: L{roslib.msgs.MsgSpec}
+    @raise roslib.msgs.MsgSpecException: if the type is unknown
+    """
+    try:
+        return (get_spec or roslib.msgs.get_embedded_spec)(base_type, spec.package)
+    except KeyError:
+        raise roslib.msgs.MsgSpecException("cannot compile [%s]: type [%s] is not registered"%(spec.full_name, base_type))
+
+def _fixed_type_ops(spec, base_type, get_spec):
+    """
+    Compile operations for a fixed-size type. Fixed-size values are
+    packed with the struct of their enclosing L{LayoutSegment}.
+
+    @return: number of struct values of the type, build(values, i)
+        returning the value starting at values[i], flatten(value,
+        out) appending the struct values of value to list out
+    @rtype: int, fn, fn
+    """
+    if base_type in [roslib.msgs.TIME, roslib.msgs.DURATION]:
+        return 2, lambda v, i: (v[i], v[i+1]), lambda x, out: out.extend((x[0], x[1]))
+    elif base_type == 'bool':
+        return 1, lambda v, i: bool(v[i]), lambda x, out: out.append(x)
+    elif base_type in STRUCT_FORMATS:
+        return 1, lambda v, i: v[i], lambda x, out: out.append(x)
+
+    subspec = _lookup(spec, base_type, get_spec)
+    segments = subspec.layout(get_spec).segments
+    ops = []
+    width = 0
+    for name, type_, count in (segments[0].fields if segments else []):
+        ops.append((name, _fixed_field_ops(subspec, Field(name, type_), get_spec)))
+        width += count
+    def build(v, i):
+        msg = {}
+        for name, (w, b, _) in ops:
+            msg[name] = b(v, i)
+            i += w
+        return msg
+    plain = [f for f in subspec.parsed_fields() if not f.is_array and f.base_type in STRUCT_FORMATS]
+    if len(plain) == len(ops) and width == len(ops) and not [f for f in plain if f.base_type == 'bool']:
+        # one struct value per field: no per-field conversion necessary
+        names = [name for name, _ in ops]
+        build = lambda v, i: dict(zip(names, v[i:i+width]))
+    def flatten(x, out):
+        for name, (_, _, f) in ops:
+            f(_get(x, name), out)
+    return width, build, flatten
+
+def _fixed_field_ops(spec, field, get_spec):
+    """
+    Compile operations for a fixed-size field, see L{_fixed_type_ops()}.
+    """
+    width, build, flatten = _fixed_type_ops(spec, field.base_type, get_spec)
+    if not field.is_array:
+        return width, build, flatten
+    n = field.array_len
+    if field.base_type in ['uint8', 'char']:
+        # packed as a single 's' value
+        return 1, lambda v, i: v[i], lambda x, out: out.append(_to_bytes(x))
+    if width == 1 and field.base_type != 'bool':
+        build_array = lambda v, i: list(v[i:i+n])
+    else:
+        build_array = lambda v, i: [build(v, i+k*width) for k in range(n)]
+    def flatten_array(x, out):
+        if len(x) != n:
+            raise MsgCodecException("field [%s] must have %s elements, has %s"%(field.name, n, len(x)))
+        for e in x:
+            flatten(e, out)
+    return width*n, build_array, flatten_array
+
+def _compile_fixed_segment(spec, segment, get_spec):
+    """
+    @return: decode(view, offset, msg) and encode(msg, write) for a
+        fixed L{LayoutSegment}
+    @rtype: fn, fn
+    """
+    st = segment.struct
+    ops = [(name, _fixed_field_ops(spec, Field(name, type_), get_spec)) for name, type_, _ in segment.fields]
+    def decode(view, offset, msg):
+        v = st.unpack_from(view, offset)
+        i = 0
+        for name, (w, b, _) in ops:
+            msg[name] = b(v, i)
+            i += w
+        return offset + st.size
+    def encode(msg, write):
+        out = []
+        for name, (_, _, f) in ops:
+            f(_get(msg, name), out)
+        write(st.pack(*out))
+    return decode, encode
+
+# variable-length values ######################################
+
+def _decode_string(view, offset):
+    (n,) = _uint32.unpack_from(view, offset)
+    offset += 4
+    val = _view_bytes(view, offset, offset+n)
+    if python3:
+        val = val.decode('utf-8')
+    return val, offset+n
+
+def _encode_string(val, write):
+    val = _to_bytes(val)
+    write(_uint32.pack(len(val)))
+    write(val)
+
+def _element_ops(spec, base_type, get_spec):
+    """
+    @return: decode(view, offset) -> (value, offset) and
+        encode(value, write) for a single value of base_type
+    @rtype: fn, fn
+    """
+    if base_type == 'string':
+        return _decode_string, _encode_string
+    if base_type in STRUCT_FORMATS:
+        width, build, flatten = _fixed_type_ops(spec, base_type, get_spec)
+        st = struct.Struct('<'+STRUCT_FORMATS[base_type])
+    else:
+        subspec = _lookup(spec, base_type, get_spec)
+        layout = subspec.layout(get_spec)
+        if layout.fixed_size is None:
+            if get_spec is None:
+                codec = get_codec(subspec)
+            else:
+                codec = MessageCodec(subspec, get_spec)
+            return codec.decode_from, codec.encode_to
+        width, build, flatten = _fixed_type_ops(spec, base_type, get_spec)
+        segments = layout.segments
+        st = segments[0].struct if segments else struct.Struct('<')
+    def decode(view, offset):
+        return build(st.unpack_from(view, offset), 0), offset + st.size
+    def encode(val, write):
+        out = []
+        flatten(val, out)
+        write(st.pack(*out))
+    # expose the per-element struct for array fast paths
+    decode.struct = st
+    decode.build = build
+    return decode, encode
+
+def _array_ops(spec, field, get_spec):
+    """
+    @return: decode(view, offset) -> (value, offset) and
+        encode(value, write) for an array field
+    @rtype: fn, fn
+    """
+    base_type = field.base_type
+    fixed_len = field.array_len
+    def read_len(view, offset):
+        if fixed_len is not None:
+            return fixed_len, offset
+        return _uint32.unpack_from(view, offset)[0], offset + 4
+    def write_len(val, write):
+        if fixed_len is None:
+            write(_uint32.pack(len(val)))
+        elif len(val) != fixed_len:
+            raise MsgCodecException("field [%s] must have %s elements, has %s"%(field.name, fixed_len, len(val)))
+
+    if base_type in ['uint8', 'char']:
+        def decode(view, offset):
+            n, offset = read_len(view, offset)
+            return _view_bytes(view, offset, offset+n), offset+n
+        def encode(val, write):
+            val = _to_bytes(val)
+            write_len(val, write)
+            write(val)
+        return decode, encode
+
+    if base_type in ARRAY_TYPECODES:
+        code = ARRAY_TYPECODES[base_type]
+        size = struct.calcsize('<'+STRUCT_FORMATS[base_type])
+        swap = sys.byteorder != 'little'
+        def decode(view, offset):
+            n, offset = read_len(view, offset)
+            end = offset + n*size
+            val = array.array(code)
+            if python3:
+                if end > len(view):
+                    raise MsgCodecException("buffer too short: need %s bytes, have %s"%(end, len(view)))
+                val.frombytes(view[offset:end])
+            else:
+                val.fromstring(_view_bytes(view, offset, end))
+            if swap:
+                val.byteswap()
+            return val, end
+        def encode(val, write):
+            write_len(val, write)
+            if not isinstance(val, array.array) or val.typecode != code:
+                val = array.array(code, val)
+            if swap:
+                val = array.array(code, val)
+                val.byteswap()
+            write(val.tobytes() if python3 else val.tostring())
+        return decode, encode
+
+    elem_decode, elem_encode = _element_ops(spec, base_type, get_spec)
+    st = getattr(elem_decode, 'struct', None)
+    if st is not None:
+        # fixed-size elements: unpack with one struct per array
+        build = elem_decode.build
+        size = st.size
+        def decode(view, offset):
+            n, offset = read_len(view, offset)
+            end = offset + n*size
+            if end > len(view):
+                raise MsgCodecException("buffer too short: need %s bytes, have %s"%(end, len(view)))
+            if size and hasattr(st, 'iter_unpack'):
+                return [build(v, 0) for v in st.iter_unpack(view[offset:end])], end
+            return [build(st.unpack_from(view, offset+k*size), 0) for k in range(n)], end
+        def encode(val, write):
+            write_len(val, write)
+            for e in val:
+                elem_encode(e, write)
+        return decode, encode
+
+    def decode(view, offset):
+        n, offset = read_len(view, offset)
+        val = []
+        for _ in range(n):
+            e, offset = elem_decode(view, offset)
+            val.append(e)
+        return val, offset
+    def encode(val, write):
+        write_len(val, write)
+        for e in val:
+            elem_encode(e, write)
+    return decode, encode
+
+def _compile_variable_segment(spec, segment, get_spec):
+    """
+    @return: decode(view, offset, msg) and encode(msg, write) for a
+        variable L{LayoutSegment}
+    @rtype: fn, fn
+    """
+    name, type_, _ = segment.fields[0]
+    field = Field(name, type_)
+    if field.is_array:
+        val_decode, val_encode = _array_ops(spec, field, get_spec)
+    else:
+        val_decode, val_encode = _element_ops(spec, field.base_type, get_spec)
+    def decode(view, offset, msg):
+        msg[name], offset = val_decode(view, offset)
+        return offset
+    def encode(msg, write):
+        val_encode(_get(msg, name), write)
+    return decode, encode
+
+# codec ##########################################################
+
+class MessageCodec(object):
+    """
+    Encoder/decoder for the ROS wire format of a message type,
+    compiled from the L{roslib.msgs.MsgLayout} of its spec. Use
+    L{get_codec()} to obtain cached instances.
+    """
+
+    def __init__(self, spec, get_spec=None):
+        """
+        @param spec: message spec
+        @type  spec: L{roslib.msgs.MsgSpec}
+        @param get_spec: function (base_type, package_context) -> L{roslib.msgs.MsgSpec}
+            resolving embedded types. Defaults to the registry, see
+            L{roslib.msgs.get_embedded_spec()}.
+        @type  get_spec: fn
+        @raise roslib.msgs.MsgSpecException: if an embedded type is not registered
+        """
+        self.spec = spec
+        self._decoders = []
+        self._encoders = []
+        for segment in spec.layout(get_spec).segments:
+            if segment.is_variable():
+                decode, encode = _compile_variable_segment(spec, segment, get_spec)
+            else:
+                decode, encode = _compile_fixed_segment(spec, segment, get_spec)
+            self._decoders.append(decode)
+            self._encoders.append(encode)
+
+    def decode_from(self, view, offset=0):
+        """
+        Decode a message starting at offset of view.
+        @param view: serialized data
+        @type  view: memoryview
+        @return: message and offset of the first byte after it
+        @rtype: dict, int
+        """
+        msg = {}
+        for decode in self._decoders:
+            offset = decode(view, offset, msg)
+        return msg, offset
+
+    def decode(self, data):
+        """
+        Decode a serialized message
+        @param data: serialized message
+        @type  data: str/bytes/bytearray
+        @return: message
+        @rtype: dict
+        @raise MsgCodecException: if data cannot be decoded
+        """
+        try:
+            msg, offset = self.decode_from(memoryview(data))
+        except (struct.error, UnicodeDecodeError) as e:
+            raise MsgCodecException("cannot decode [%s]: %s"%(self.spec.full_name, e))
+        if offset != len(data):
+            raise MsgCodecException("cannot decode [%s]: %s trailing bytes"%(self.spec.full_name, len(data)-offset))
+        return msg
+
+    def encode_to(self, msg, write):
+        """
+        Serialize msg, passing each chunk of data to write.
+        @param msg: message as a dictionary or object with attributes for each field
+        @param write: function called with byte strings
+        @type  write: fn(bytes)
+        """
+        for encode in self._encoders:
+            encode(msg, write)
+
+    def encode(self, msg):
+        """
+        Serialize msg.
+        @param msg: message as a dictionary or object with attributes for each field
+        @return: serialized message
+        @rtype: bytes
+        @raise MsgCodecException: if msg cannot be encoded
+        """
+        buff = []
+        try:
+            self.encode_to(msg, buff.append)
+        except (struct.error, KeyError, AttributeError, TypeError) as e:
+            raise MsgCodecException("cannot encode [%s]: %s"%(self.spec.full_name, e))
+        return b''.join(buff)
+
+## (full_name, package, text) or (type_name, full text) -> MessageCodec,
+## valid for _codec_generation
+_codec_cache = {}
+_codec_generation = None
+
+def _cached(key, factory):
+    """
+    @return: cached codec for key, created with factory() if missing.
+        The cache is dropped when roslib.msgs registrations change, as
+        compiled codecs embed the specs of their field types.
+    @rtype: L{MessageCodec}
+    """
+    global _codec_generation
+    generation = roslib.msgs.get_registry_generation()
+    if generation != _codec_generation:
+        _codec_cache.clear()
+        _codec_generation = generation
+    codec = _codec_cache.get(key)
+    if codec is None:
+        codec = factory()
+        # factory() may have loaded embedded types and bumped the generation
+        _codec_generation = roslib.msgs.get_registry_generation()
+        _codec_cache[key] = codec
+    return codec
+
+def get_codec(spec):
+    """
+    Get the codec for spec, compiling it on first use.
+    @param spec: message spec. Embedded types must be registered.
+    @type  spec: L{roslib.msgs.MsgSpec}
+    @rtype: L{MessageCodec}
+    @raise roslib.msgs.MsgSpecException: if an embedded type is not registered
+    """
+    return _cached((spec.full_name, spec.package, spec.text), lambda: MessageCodec(spec))
+
+def load_full_text(text, type_name):
+    """
+    Parse a full message definition, i.e. the definition of type_name
+    followed by the definitions of its embedded types, as stored in
+    the message_definition field of connection headers and bag files::
+
+      Header header
+      geometry_msgs/Point p
+      ================================================================================
+      MSG: std_msgs/Header
+      ...
+      ================================================================================
+      MSG: geometry_msgs/Point
+      ...
+
+    The specs are not registered with roslib.msgs.
+    @param text: full message definition
+    @type  text: str
+    @param type_name: package-qualified name of the top-level type
+    @type  type_name: str
+    @return: spec of type_name and a map of canonical type name to
+        spec for all types defined in text
+    @rtype: L{roslib.msgs.MsgSpec}, {str: L{roslib.msgs.MsgSpec}}
+    @raise roslib.msgs.MsgSpecException: if text cannot be parsed
+    """
+    sections = [(type_name, [])]
+    for line in text.split('\n'):
+        l = line.strip()
+        if l and l == '='*len(l) and len(l) >= 3:
+            sections.append((None, []))
+        elif sections[-1][0] is None:
+            if l.startswith('MSG:'):
+                sections[-1] = (l[4:].strip(), sections[-1][1])
+            elif l:
+                raise roslib.msgs.MsgSpecException("invalid full message definition for [%s]: expected 'MSG: type' line, got [%s]"%(type_name, l))
+        else:
+            sections[-1][1].append(line)
+    types = {}
+    for name, lines in sections:
+        if name is None:
+            raise roslib.msgs.MsgSpecException("invalid full message definition for [%s]: section without 'MSG: type' line"%type_name)
+        package, short_name = roslib.names.package_resource_name(name)
+        spec = roslib.msgs.load_from_string('\n'.join(lines), package, name, short_name)
+        types[roslib.msgs._canonical_type(name)] = spec
+    return types[roslib.msgs._canonical_type(type_name)], types
+
+def get_codec_from_full_text(text, type_name):
+    """
+    Get the codec for a full message definition, see
+    L{load_full_text()}. Embedded types are resolved from the
+    definitions in text first, so they do not need to be registered
+    (or even installed) locally; types missing from text fall back
+    to the roslib.msgs registry.
+    @param text: full message definition
+    @type  text: str
+    @param type_name: package-qualified name of the top-level type
+    @type  type_name: str
+    @rtype: L{MessageCodec}
+    @raise roslib.msgs.MsgSpecException: if text cannot be parsed or
+        an embedded type is unknown
+    """
+    def factory():
+        spec, types = load_full_text(text, type_name)
+        def get_spec(base_type, package_context):
+            name = roslib.msgs._canonical_type(base_type, package_context)
+            if name in types:
+                return types[name]
+            return roslib.msgs.get_embedded_spec(base_type, package_context)
+        return MessageCodec(spec, get_spec)
+    return _cached((type_name, text), factory)
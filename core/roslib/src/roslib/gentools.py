@@ -52,6 +52,7 @@ except ImportError:
 
 import rospkg
 
+import roslib.instrument
 import roslib.msgs 
 from roslib.msgs import MsgSpecException
 import roslib.names 
@@ -202,6 +203,7 @@ def compute_md5_v1(get_deps_dict):
     import hashlib
     return _compute_hash_v1(get_deps_dict, hashlib.md5())
 
+@roslib.instrument.timed('gentools.compute_md5')
 def compute_md5(get_deps_dict, rospack=None):
     """
     Compute md5 hash for message/service
@@ -222,6 +224,7 @@ def compute_md5(get_deps_dict, rospack=None):
 ## alias
 compute_md5_v2 = compute_md5
 
+@roslib.instrument.timed('gentools.compute_full_text')
 def compute_full_text(get_deps_dict):
     """
     Compute full text of message/service, including text of embedded
@@ -250,6 +253,7 @@ def compute_full_text(get_deps_dict):
     # #1168: remove the trailing \n separator that is added by the concatenation logic
     return buff.getvalue()[:-1]
 
+@roslib.instrument.timed('gentools.get_file_dependencies')
 def get_file_dependencies(f, stdout=sys.stdout, stderr=sys.stderr):
     """
     Compute dependencies of the specified message/service file
@@ -274,6 +278,7 @@ def get_file_dependencies(f, stdout=sys.stdout, stderr=sys.stderr):
         raise Exception("[%s] does not appear to be a message or service"%spec)
     return get_dependencies(spec, package, stdout, stderr)
 
+@roslib.instrument.timed('gentools.get_dependencies')
 def get_dependencies(spec, package, compute_files=True, stdout=sys.stdout, stderr=sys.stderr, rospack=None):
     """
     Compute dependencies of the specified Msgs/Srvs
@@ -0,0 +1,263 @@
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2012, Willow Garage, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+#
+#  * Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+#  * Redistributions in binary form must reproduce the above
+#    copyright notice, this list of conditions and the following
+#    disclaimer in the documentation and/or other materials provided
+#    with the distribution.
+#  * Neither the name of Willow Garage, Inc. nor the names of its
+#    contributors may be used to endorse or promote products derived
+#    from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE
+# COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT
+# LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN
+# ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+#
+
+"""
+Opt-in instrumentation of roslib entry points: call counts and
+cumulative wall time, cache hit ratios and every subprocess spawned.
+
+Instrumentation is off unless enabled with L{enable()} or by setting
+ROSLIB_INSTRUMENT before roslib is imported::
+
+  ROSLIB_INSTRUMENT=/tmp/roslib.json rosmsg show std_msgs/String
+
+The report is written as JSON at exit to that file, or to stderr if
+the value is '-'. L{get_report()} returns the same data as a dict::
+
+  {"calls": {"packages.get_pkg_dir": {"count": 3, "time": 0.012}},
+   "caches": {"packages.pkg_dir": {"hits": 2, "misses": 1, "ratio": 0.67}},
+   "counters": {...},
+   "subprocesses": [{"args": ["rospack", "find", "foo"], "caller": "packages.get_pkg_dir",
+                     "time": 0.011, "returncode": 0}]}
+
+Subprocesses that could not be started have an "error" instead of
+a time and exit code.
+
+Call times include the time of nested instrumented calls. While
+disabled, an instrumented function costs one extra call and a flag
+check.
+"""
+
+import atexit
+import functools
+import os
+import sys
+import threading
+import time
+
+INSTRUMENT_ENV = 'ROSLIB_INSTRUMENT'
+
+## True while instrumentation is recording. Hot paths may test this
+## before computing arguments for the recording functions.
+enabled = False
+
+_lock = threading.Lock()
+## name -> [count, cumulative time]
+_calls = {}
+## name -> [hits, misses]
+_caches = {}
+## name -> count
+_counters = {}
+## dicts of args, caller, time, returncode
+_subprocesses = []
+## per-thread stack of the instrumented calls in progress
+_local = threading.local()
+## file the report is written to at exit, '-' for stderr
+_dump_file = None
+_atexit_registered = False
+
+def enable(filename=None):
+    """
+    Start recording.
+    @param filename: if set, write the report to filename at exit, '-'
+      writes it to stderr
+    @type  filename: str
+    """
+    global enabled, _dump_file, _atexit_registered
+    with _lock:
+        if filename:
+            _dump_file = filename
+            if not _atexit_registered:
+                atexit.register(_dump_at_exit)
+                _atexit_registered = True
+        enabled = True
+
+def disable():
+    """
+    Stop recording. Data recorded so far is kept, see L{reset()}.
+    """
+    global enabled
+    enabled = False
+
+def is_enabled():
+    """
+    @return: True if instrumentation is recording
+    @rtype: bool
+    """
+    return enabled
+
+def reset():
+    """
+    Discard all recorded data.
+    """
+    with _lock:
+        _calls.clear()
+        _caches.clear()
+        _counters.clear()
+        del _subprocesses[:]
+
+def count(name, n=1):
+    """
+    Add n to counter name.
+    """
+    if not enabled:
+        return
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + n
+
+def cache_access(name, hit):
+    """
+    Record a lookup in cache name.
+    @param hit: True if the lookup was answered from the cache
+    @type  hit: bool
+    """
+    if not enabled:
+        return
+    with _lock:
+        entry = _caches.get(name)
+        if entry is None:
+            entry = _caches[name] = [0, 0]
+        entry[0 if hit else 1] += 1
+
+def _current_call():
+    stack = getattr(_local, 'stack', None)
+    return stack[-1] if stack else None
+
+def timed(name):
+    """
+    Decorator that records the calls of a function under name.
+    @param name: report name, 'module.function' by convention
+    @type  name: str
+    """
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not enabled:
+                return fn(*args, **kwargs)
+            stack = getattr(_local, 'stack', None)
+            if stack is None:
+                stack = _local.stack = []
+            stack.append(name)
+            start = time.time()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                elapsed = time.time() - start
+                stack.pop()
+                with _lock:
+                    entry = _calls.get(name)
+                    if entry is None:
+                        entry = _calls[name] = [0, 0.]
+                    entry[0] += 1
+                    entry[1] += elapsed
+        return wrapper
+    return decorator
+
+## subprocess.Popen subclass, created on first use of Popen() as
+## subprocess is not needed by 'import roslib'
+_Popen = None
+
+def _popen_class():
+    global _Popen
+    if _Popen is None:
+        import subprocess
+        class AccountedPopen(subprocess.Popen):
+            def __init__(self, args, *popen_args, **kwargs):
+                self._record = None
+                if enabled:
+                    self._record = {'args': list(args) if isinstance(args, (list, tuple)) else args,
+                                    'caller': _current_call(), 'time': None, 'returncode': None}
+                    self._start = time.time()
+                    with _lock:
+                        _subprocesses.append(self._record)
+                try:
+                    subprocess.Popen.__init__(self, args, *popen_args, **kwargs)
+                except OSError as e:
+                    if self._record is not None:
+                        self._record['error'] = str(e)
+                    raise
+
+            def wait(self, *args, **kwargs):
+                returncode = subprocess.Popen.wait(self, *args, **kwargs)
+                record = self._record
+                if record is not None and record['time'] is None:
+                    record['time'] = time.time() - self._start
+                    record['returncode'] = returncode
+                return returncode
+        _Popen = AccountedPopen
+    return _Popen
+
+def Popen(args, *popen_args, **kwargs):
+    """
+    Drop-in replacement of subprocess.Popen that records the process
+    and, once waited for, its run time and exit code.
+    """
+    return _popen_class()(args, *popen_args, **kwargs)
+
+def get_report():
+    """
+    @return: recorded data, see module documentation for the layout
+    @rtype: dict
+    """
+    with _lock:
+        caches = {}
+        for name, (hits, misses) in _caches.items():
+            caches[name] = {'hits': hits, 'misses': misses,
+                            'ratio': float(hits) / (hits + misses)}
+        return {'calls': dict([(name, {'count': n, 'time': t}) for name, (n, t) in _calls.items()]),
+                'caches': caches,
+                'counters': dict(_counters),
+                'subprocesses': [dict(s) for s in _subprocesses]}
+
+def dump(filename=None):
+    """
+    Write the report as JSON.
+    @param filename: file to write to, stderr if None or '-'
+    @type  filename: str
+    """
+    import json
+    text = json.dumps(get_report(), indent=2, sort_keys=True)
+    if not filename or filename == '-':
+        sys.stderr.write(text + '\n')
+    else:
+        with open(filename, 'w') as f:
+            f.write(text + '\n')
+
+def _dump_at_exit():
+    if _dump_file:
+        try:
+            dump(_dump_file)
+        except (IOError, OSError) as e:
+            sys.stderr.write("roslib: cannot write instrumentation report to %s: %s\n"%(_dump_file, e))
+
+if os.environ.get(INSTRUMENT_ENV):
+    enable(os.environ[INSTRUMENT_ENV])
@@ -38,28 +38,82 @@ derived from dependency structure declared in ROS manifest files.
 
 import os
 import sys
+import threading
 
-import rospkg
+import roslib.instrument
+
+# rospkg, json and the other modules only needed by load_manifest()
+# are imported on first use to keep 'import roslib' cheap
 
 # bootstrapped keeps track of which packages we've loaded so we don't
 # update the path multiple times
-_bootstrapped = []
-# _rospack is our cache of ROS package data
-_rospack = rospkg.RosPack()
+_bootstrapped = set()
+# packages of _bootstrapped whose paths are on sys.path. Replaced, not
+# mutated, so that load_manifest() can test it without locking while
+# another thread is bootstrapping.
+_bootstrapped_ready = frozenset()
+# serializes bootstrapping, which updates _bootstrapped and sys.path
+_bootstrap_lock = threading.RLock()
+# paths added by load_manifest(), highest priority first
+_added_paths = []
+# installed ManifestPathFinder, see enable_import_finder()
+_finder = None
+# _rospack is our cache of ROS package data, see _get_rospack()
+_rospack = None
 
 def get_depends(package, rospack):
     vals = rospack.get_depends(package, implicit=True)
     return [v for v in vals if not rospack.get_manifest(v).is_catkin]
 
+@roslib.instrument.timed('launcher.load_manifest')
 def load_manifest(package_name, bootstrap_version="0.7"):
     """
-    Update the Python sys.path with package's dependencies
+    Update the Python sys.path with package's dependencies. The
+    computed paths are cached on disk, see
+    :func:`get_python_path_cache_file`.
 
     :param package_name: name of the package that load_manifest() is being called from, ``str``
     """
-    if package_name in _bootstrapped:
+    global _bootstrapped_ready
+    if package_name in _bootstrapped_ready:
+        roslib.instrument.cache_access('launcher.bootstrapped', True)
         return
-    sys.path = _generate_python_path(package_name, _rospack) + sys.path
+    with _bootstrap_lock:
+        if package_name in _bootstrapped:
+            roslib.instrument.cache_access('launcher.bootstrapped', True)
+        else:
+            roslib.instrument.cache_access('launcher.bootstrapped', False)
+            _insert_paths(_load_python_path(package_name))
+        _bootstrapped_ready = frozenset(_bootstrapped)
+
+def _get_rospack():
+    """
+    :returns: shared :class:`rospkg.RosPack`, created on first use
+    """
+    global _rospack
+    if _rospack is None:
+        import rospkg
+        _rospack = rospkg.RosPack()
+    return _rospack
+
+def _insert_paths(paths):
+    """
+    Prepend paths to sys.path, in order. Entries are not duplicated:
+    paths already on sys.path are moved to the front, which leaves
+    module resolution unchanged as the first entry wins.
+    :param paths: paths, highest priority first, ``[str]``
+    """
+    seen = set()
+    unique = []
+    for p in paths:
+        if p not in seen:
+            seen.add(p)
+            unique.append(p)
+    if unique:
+        sys.path[:] = unique + [p for p in sys.path if p not in seen]
+        _added_paths[:] = unique + [p for p in _added_paths if p not in seen]
+        if _finder is not None:
+            _finder.add_paths(unique)
     
 def _append_package_paths(manifest_, paths, pkg_dir):
     """
@@ -81,6 +135,7 @@ def _append_package_paths(manifest_, paths, pkg_dir):
         dirs = [os.path.join(pkg_dir, d) for d in ['src', 'lib']]
         paths.extend([d for d in dirs if os.path.isdir(d)])
     
+@roslib.instrument.timed('launcher._generate_python_path')
 def _generate_python_path(pkg, rospack):
     """
     Recursive subroutine for building dependency list and python path
@@ -92,7 +147,7 @@ def _generate_python_path(pkg, rospack):
     # short-circuit if this is a catkin-ized package
     m = rospack.get_manifest(pkg)
     if m.is_catkin:
-        _bootstrapped.append(pkg)
+        _bootstrapped.add(pkg)
         return []
 
     packages = get_depends(pkg, rospack) 
@@ -104,9 +159,223 @@ def _generate_python_path(pkg, rospack):
             m = rospack.get_manifest(p)
             d = rospack.get_path(p)
             _append_package_paths(m, paths, d)
-            _bootstrapped.append(p)
+            _bootstrapped.add(p)
     except:
-        if pkg in _bootstrapped:
-            _bootstrapped.remove(pkg)
+        _bootstrapped.discard(pkg)
         raise
     return paths
+
+# persistent python path cache ####################################
+
+#: environment variable with the python path cache file. Set it to an
+#: empty string to disable the cache.
+PYTHON_PATH_CACHE_ENV = 'ROS_PYTHON_PATH_CACHE'
+
+def get_python_path_cache_file(env=None):
+    """
+    :param env: environment, defaults to ``os.environ``, ``dict``
+    :returns: file the python paths computed by :func:`load_manifest`
+      are cached in for the ROS environment of env, or None if the
+      cache is disabled, ``str``
+    """
+    import hashlib
+    import json
+    if env is None:
+        env = os.environ
+    if PYTHON_PATH_CACHE_ENV in env:
+        return env[PYTHON_PATH_CACHE_ENV] or None
+    # paths depend on the package search path
+    key = [env.get('ROS_ROOT'), env.get('ROS_PACKAGE_PATH')]
+    if [p for p in (key[1] or '').split(os.pathsep) if p and not os.path.isabs(p)]:
+        key.append(os.getcwd())
+    key = json.dumps(key)
+    digest = hashlib.md5(key.encode('utf-8')).hexdigest()
+    # same as rospkg.get_ros_home(), which would import all of rospkg
+    ros_home = env.get('ROS_HOME') or os.path.join(os.path.expanduser('~'), '.ros')
+    return os.path.join(ros_home, 'roslib', 'python_path-%s.json'%digest)
+
+def _stamps(pkg_dir):
+    """
+    :returns: mtimes of pkg_dir and its manifests, None if missing. The
+      directory mtime covers the creation of ``src``/``lib``, ``[float]``
+    """
+    stamps = []
+    for path in [pkg_dir, os.path.join(pkg_dir, 'manifest.xml'),
+                 os.path.join(pkg_dir, 'package.xml')]:
+        try:
+            stamps.append(os.stat(path).st_mtime)
+        except OSError:
+            stamps.append(None)
+    return stamps
+
+def _native(s):
+    """
+    :returns: s as native string, json returns unicode on Python 2
+    """
+    if sys.version_info[0] < 3 and isinstance(s, unicode):
+        return s.encode(sys.getfilesystemencoding() or 'utf-8')
+    return s
+
+def _read_path_cache(filename):
+    import json
+    try:
+        with open(filename) as f:
+            cache = json.load(f)
+    except (IOError, OSError, ValueError):
+        return {}
+    return cache if isinstance(cache, dict) else {}
+
+def _write_path_cache(filename, cache):
+    """
+    Atomically replace filename, ignoring errors, e.g. a read-only
+    ROS_HOME.
+    """
+    import json
+    import tempfile
+    try:
+        d = os.path.dirname(filename)
+        if d and not os.path.isdir(d):
+            os.makedirs(d)
+        fd, tmp = tempfile.mkstemp(dir=d or None, prefix='.python_path')
+        try:
+            with os.fdopen(fd, 'w') as f:
+                json.dump(cache, f)
+            os.rename(tmp, filename)
+        except:
+            os.remove(tmp)
+            raise
+    except (IOError, OSError):
+        pass
+
+def _load_python_path(pkg, rospack=None):
+    """
+    :func:`_generate_python_path` backed by the file returned by
+    :func:`get_python_path_cache_file`. Entries are valid as long as
+    the directories and manifests of pkg and its dependencies are
+    unchanged.
+    :param rospack: defaults to the shared instance, which is not
+      created on cache hits, :class:`rospkg.RosPack`
+    :raises: :exc:`rospkg.ResourceNotFound` If an error occurs while attempting to load package or dependencies
+    """
+    if pkg in _bootstrapped:
+        return []
+    filename = get_python_path_cache_file()
+    if filename is None:
+        return _generate_python_path(pkg, rospack or _get_rospack())
+    cache = _read_path_cache(filename)
+    entry = cache.get(pkg)
+    try:
+        if entry and all([_stamps(d) == stamps for d, stamps in entry['stamps']]):
+            _bootstrapped.update([_native(p) for p in entry['packages']])
+            roslib.instrument.cache_access('launcher.python_path_cache', True)
+            return [_native(p) for p in entry['paths']]
+    except (KeyError, TypeError, ValueError):
+        pass # malformed entry
+    roslib.instrument.cache_access('launcher.python_path_cache', False)
+    rospack = rospack or _get_rospack()
+    paths = _generate_python_path(pkg, rospack)
+    if rospack.get_manifest(pkg).is_catkin:
+        packages = [pkg]
+    else:
+        packages = get_depends(pkg, rospack) + [pkg]
+    dirs = [rospack.get_path(p) for p in packages]
+    cache[pkg] = {'paths': paths, 'packages': packages,
+                  'stamps': [(d, _stamps(d)) for d in dirs]}
+    _write_path_cache(filename, cache)
+    return paths
+
+# import finder ###################################################
+
+try:
+    import importlib.machinery
+    _MODULE_SUFFIXES = frozenset(importlib.machinery.all_suffixes())
+except ImportError: #Python 2
+    import imp
+    import pkgutil
+    _MODULE_SUFFIXES = frozenset([s for s, _, _ in imp.get_suffixes()])
+
+def _top_level_modules(path):
+    """
+    :returns: names of the top-level modules and packages in directory path, ``[str]``
+    """
+    try:
+        entries = os.listdir(path)
+    except OSError:
+        return []
+    names = []
+    for e in entries:
+        base, ext = os.path.splitext(e)
+        if ext in _MODULE_SUFFIXES:
+            names.append(base.split('.')[0]) # foo.so and foo.cpython-36m-x86_64-linux-gnu.so
+        elif not ext and os.path.isfile(os.path.join(path, e, '__init__.py')):
+            names.append(e)
+    return names
+
+class ManifestPathFinder(object):
+    """
+    Import finder that maps top-level module names to the directory
+    on the paths added by :func:`load_manifest` that provides them,
+    so importing them does not probe every ``sys.path`` entry in
+    front of that directory. Names it does not know fall through to the regular
+    ``sys.path`` search. Install it with :func:`enable_import_finder`.
+    """
+
+    def __init__(self):
+        self._modules = {}
+
+    def add_paths(self, paths):
+        """
+        Index paths. They take priority over previously added paths,
+        like they do on ``sys.path``.
+        :param paths: paths, highest priority first, ``[str]``
+        """
+        for p in reversed(paths):
+            for name in _top_level_modules(p):
+                self._modules[name] = p
+
+    def get_path(self, fullname):
+        """
+        :returns: directory providing top-level module fullname, or None, ``str``
+        """
+        return self._modules.get(fullname)
+
+    def find_spec(self, fullname, path=None, target=None):
+        if path is not None or fullname not in self._modules:
+            return None
+        return importlib.machinery.PathFinder.find_spec(fullname, [self._modules[fullname]])
+
+    def find_module(self, fullname, path=None):
+        # Python 2 import protocol
+        if path is not None or fullname not in self._modules:
+            return None
+        return pkgutil.ImpImporter(self._modules[fullname]).find_module(fullname)
+
+def enable_import_finder():
+    """
+    Install a :class:`ManifestPathFinder` at the front of
+    ``sys.meta_path`` that resolves top-level modules on the paths
+    added by :func:`load_manifest` directly. This is opt-in: modules
+    that are shadowed by entries later inserted at the front of
+    ``sys.path`` by other means are still found on the manifest
+    paths.
+    :returns: installed finder, :class:`ManifestPathFinder`
+    """
+    global _finder
+    with _bootstrap_lock:
+        if _finder is None:
+            finder = ManifestPathFinder()
+            finder.add_paths(_added_paths)
+            sys.meta_path.insert(0, finder)
+            _finder = finder
+        return _finder
+
+def disable_import_finder():
+    """
+    Remove the finder installed by :func:`enable_import_finder`.
+    """
+    global _finder
+    with _bootstrap_lock:
+        if _finder is not None:
+            if _finder in sys.meta_path:
+                sys.meta_path.remove(_finder)
+            _finder = None
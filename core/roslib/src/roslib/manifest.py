@@ -44,6 +44,7 @@ import sys
 import os
 import getopt
 
+import roslib.instrument
 import roslib.packages
 
 MANIFEST_FILE = 'manifest.xml'
@@ -97,6 +98,7 @@ Package '%(package_dir)s' is improperly configured: no manifest file is present.
         if required:
             raise
 
+@roslib.instrument.timed('manifest.manifest_file')
 def manifest_file(package, required=True, env=None):
     """
     @param package str: package name
@@ -117,6 +119,7 @@ def manifest_file(package, required=True, env=None):
     d = roslib.packages.get_pkg_dir(package, required, ros_root=env['ROS_ROOT']) 
     return _manifest_file_by_dir(d, required=required, env=env)
 
+@roslib.instrument.timed('manifest.load_manifest')
 def load_manifest(package):
     """
     Load manifest for specified package.
@@ -128,6 +131,7 @@ def load_manifest(package):
     """
     return parse_file(manifest_file(package))
     
+@roslib.instrument.timed('manifest.parse_file')
 def parse_file(file):
     """
     Parse manifest.xml file
@@ -41,8 +41,13 @@ name.
 
 import os
 import sys
+import threading
+
 import rospkg
 import roslib
+import roslib.instrument
+import roslib.launcher
+import roslib.msgs
 
 import genmsg
 import genpy.message #for wrapping get_message_class, get_service_class
@@ -88,30 +93,130 @@ def _get_message_or_service_class(type_str, message_type, reload_on_error=False)
         
 ## cache for get_message_class
 _message_class_cache = {}
+## message types that could not be loaded, see get_message_class
+_message_class_misses = set()
 
 ## cache for get_service_class
 _service_class_cache = {}
+## service types that could not be loaded, see get_service_class
+_service_class_misses = set()
 
-def get_message_class(message_type, reload_on_error=False):
-    if message_type in _message_class_cache:
-        return _message_class_cache[message_type]
+# guards updates of the caches above, hits are read without it.
+# Loading happens outside of the lock, as importing a message module
+# can load other message classes.
+_class_cache_lock = threading.Lock()
+
+def _get_class(type_name, type_str, genpy_loader, cache, misses, reload_on_error):
+    cls = cache.get(type_name)
+    if cls is not None:
+        roslib.instrument.cache_access('message.class', True)
+        return cls
+    with _class_cache_lock:
+        if type_name in misses and not reload_on_error:
+            roslib.instrument.cache_access('message.class', True)
+            return None
+    roslib.instrument.cache_access('message.class', False)
     # try w/o bootstrapping
-    cls = genpy.message.get_message_class(message_type, reload_on_error=reload_on_error)
+    cls = genpy_loader(type_name, reload_on_error=reload_on_error)
     if cls is None:
         # try old loader w/ bootstrapping
-        cls = _get_message_or_service_class('msg', message_type, reload_on_error=reload_on_error)
-    if cls:
-        _message_class_cache[message_type] = cls
+        cls = _get_message_or_service_class(type_str, type_name, reload_on_error=reload_on_error)
+    with _class_cache_lock:
+        if cls:
+            cache[type_name] = cls
+            misses.discard(type_name)
+        else:
+            misses.add(type_name)
     return cls
 
+def get_message_class(message_type, reload_on_error=False):
+    """
+    Get the message class for message_type. Failed lookups are cached
+    as well, use L{invalidate_message_class()} after building new
+    message types or pass reload_on_error=True, which always retries.
+    @param message_type: message type name, e.g. 'std_msgs/String'
+    @type  message_type: str
+    @return: message class, or None if it cannot be loaded
+    @rtype: type
+    @raise ValueError: if message_type has no package name
+    """
+    return _get_class(message_type, 'msg', genpy.message.get_message_class,
+                      _message_class_cache, _message_class_misses, reload_on_error)
+
 def get_service_class(service_type, reload_on_error=False):
-    if service_type in _service_class_cache:
-        return _service_class_cache[service_type]
-    cls = genpy.message.get_service_class(service_type, reload_on_error=reload_on_error)
-    # try w/o bootstrapping
-    if cls is None:
-        # try old loader w/ bootstrapping
-        cls = _get_message_or_service_class('srv', service_type, reload_on_error=reload_on_error)
-    if cls:
-        _service_class_cache[service_type] = cls
-    return cls
+    """
+    Get the service class for service_type. Failed lookups are cached,
+    see L{get_message_class()}.
+    @param service_type: service type name, e.g. 'std_srvs/Empty'
+    @type  service_type: str
+    @return: service class, or None if it cannot be loaded
+    @rtype: type
+    @raise ValueError: if service_type has no package name
+    """
+    return _get_class(service_type, 'srv', genpy.message.get_service_class,
+                      _service_class_cache, _service_class_misses, reload_on_error)
+
+def _invalidate(cache, misses, type_name):
+    with _class_cache_lock:
+        if type_name is None:
+            cache.clear()
+            misses.clear()
+        else:
+            cache.pop(type_name, None)
+            misses.discard(type_name)
+
+def invalidate_message_class(message_type=None):
+    """
+    Forget the cached result of L{get_message_class()}, e.g. after
+    message_type has been built.
+    @param message_type: message type name, or None for all types
+    @type  message_type: str
+    """
+    _invalidate(_message_class_cache, _message_class_misses, message_type)
+
+def invalidate_service_class(service_type=None):
+    """
+    Forget the cached result of L{get_service_class()}.
+    @param service_type: service type name, or None for all types
+    @type  service_type: str
+    """
+    _invalidate(_service_class_cache, _service_class_misses, service_type)
+
+def preload_message_classes(message_types, max_workers=None):
+    """
+    Load the classes of message_types into the cache of
+    L{get_message_class()}, e.g. at startup of introspection tools.
+    The manifests of the packages are loaded on the calling thread,
+    then each package's types are imported together on a thread pool.
+    @param message_types: message type names
+    @type  message_types: iterable of str
+    @param max_workers: maximum number of threads, defaults to
+        roslib.msgs.MAX_LOAD_WORKERS
+    @type  max_workers: int
+    @return: message type name -> class, or None if it cannot be loaded
+    @rtype: {str: type}
+    @raise ValueError: if a message type has no package name
+    """
+    by_package = {}
+    for message_type in message_types:
+        package, base_type = genmsg.package_resource_name(message_type)
+        if not package:
+            if base_type != 'Header':
+                raise ValueError("message type is missing package name: %s"%str(message_type))
+            package = 'std_msgs'
+        by_package.setdefault(package, []).append(message_type)
+    packages = sorted(by_package)
+    for package in packages:
+        # bootstrap sys.path up front: load_manifest() serializes on
+        # launcher._bootstrap_lock, so the pool threads would only wait
+        # for each other here
+        try:
+            roslib.launcher.load_manifest(package)
+        except rospkg.ResourceNotFound:
+            pass
+    def load(package):
+        return [(t, get_message_class(t)) for t in by_package[package]]
+    classes = {}
+    for loaded in roslib.msgs.map_threaded(load, packages, max_workers):
+        classes.update(loaded)
+    return classes
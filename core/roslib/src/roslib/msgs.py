@@ -46,16 +46,24 @@ try:
 except ImportError:
     from io import StringIO # Python 3.x
 
+try:
+    from concurrent.futures import ThreadPoolExecutor
+except ImportError:
+    ThreadPoolExecutor = None # Python 2.x without the futures backport
+
 import os
 import sys
-import string
+import struct
+import threading
 
 import rospkg
 
+import roslib.instrument
 import roslib.manifest
 import roslib.packages
 import roslib.names
 import roslib.resources
+import roslib.snapshot
 
 VERBOSE = False
 
@@ -70,6 +78,8 @@ def set_verbose(v):
 
 EXT = '.msg'
 SEP = '/' #e.g. std_msgs/String
+## default number of threads used to read msg files concurrently
+MAX_LOAD_WORKERS = 8
 ## character that designates a constant assignment rather than a field
 CONSTCHAR   = '='
 COMMENTCHAR = '#'
@@ -172,7 +182,7 @@ def is_valid_msg_type(x):
                 state = 0 #closed
             else:
                 try:
-                    string.atoi(c)
+                    int(c)
                 except:
                     return False
     return state == 0
@@ -309,6 +319,7 @@ class MsgSpec(object):
         self.short_name = short_name
         self.package = package
         self._parsed_fields = [Field(name, type) for (name, type) in zip(self.names, self.types)]
+        self._layout = None
         
     def fields(self):
         """
@@ -349,7 +360,211 @@ class MsgSpec(object):
 
     def __str__(self):
         return _strify_spec(self)
+
+    def layout(self, get_spec=None):
+        """
+        Compute the wire layout of this message. Embedded message
+        types are resolved through the registry, and the result is
+        cached on the spec until the registry changes.
+        @param get_spec: resolve embedded types with this function
+            instead of the registry, see L{compute_layout()}. The
+            result is not cached.
+        @type  get_spec: fn(str, str) -> L{MsgSpec}
+        @return: wire layout
+        @rtype: L{MsgLayout}
+        @raise MsgSpecException: if an embedded type is not registered
+        """
+        if get_spec is not None:
+            return compute_layout(self, get_spec)
+        if self._layout is None or self._layout[0] != _registry_generation:
+            self._layout = (_registry_generation, compute_layout(self))
+        return self._layout[1]
     
+# wire layout ##########################################
+
+## struct format characters of fixed-size builtin types. Values are
+## serialized little-endian, without padding.
+STRUCT_FORMATS = {
+    'int8': 'b', 'uint8': 'B', 'int16': 'h', 'uint16': 'H',
+    'int32': 'i', 'uint32': 'I', 'int64': 'q', 'uint64': 'Q',
+    'float32': 'f', 'float64': 'd', 'bool': 'B',
+    # deprecated:
+    'char': 'B', 'byte': 'b',
+    # time and duration are (secs, nsecs) pairs
+    'time': 'II', 'duration': 'ii',
+    }
+
+class LayoutSegment(object):
+    """
+    Container class for a run of fields in a L{MsgLayout}.
+
+    A fixed segment holds contiguous fixed-size fields that are
+    packed with the single struct.Struct in C{struct}. Its C{fields}
+    are (name, type, count) tuples, where count is the number of
+    values the field contributes to C{struct.unpack()}. A variable
+    segment holds a single variable-length field (string, variable
+    array, fixed array of variable-length type or embedded
+    variable-length message); C{struct} is None and count is None.
+
+    C{offset} is the byte offset of the segment relative to the end
+    of the previous variable segment, or to the start of the message.
+    """
+    __slots__ = ['offset', 'struct', 'fields']
+
+    def __init__(self, offset, struct_, fields):
+        self.offset = offset
+        self.struct = struct_
+        self.fields = fields
+
+    def is_variable(self):
+        """
+        @return: True if segment is a single variable-length field
+        @rtype: bool
+        """
+        return self.struct is None
+
+    def __repr__(self):
+        if self.struct is None:
+            return "LayoutSegment[%s, variable, %s]"%(self.offset, self.fields)
+        return "LayoutSegment[%s, %r, %s]"%(self.offset, self.struct.format, self.fields)
+
+class MsgLayout(object):
+    """
+    Wire layout of a message type, see L{MsgSpec.layout()}.
+
+    Contains:
+    fixed_size: serialized size in bytes, or None if the size varies
+    segments: L{LayoutSegment}s in serialization order
+    variable_fields: (name, offset) of each variable-length field
+    """
+    __slots__ = ['fixed_size', 'segments', 'variable_fields']
+
+    def __init__(self, fixed_size, segments):
+        self.fixed_size = fixed_size
+        self.segments = segments
+        self.variable_fields = [(s.fields[0][0], s.offset) for s in segments if s.struct is None]
+
+    def is_fixed_size(self):
+        """
+        @return: True if every instance of the message serializes to fixed_size bytes
+        @rtype: bool
+        """
+        return self.fixed_size is not None
+
+    def __repr__(self):
+        return "MsgLayout[%s, %s]"%(self.fixed_size, self.segments)
+
+def _fixed_field_format(spec, field, get_spec):
+    """
+    @return: struct format (without byte order) and number of values
+        of field, or None, None if field is variable-length
+    @rtype: str, int
+    @raise MsgSpecException: if an embedded type is not registered
+    """
+    base_type = field.base_type
+    if base_type in STRUCT_FORMATS:
+        fmt = STRUCT_FORMATS[base_type]
+        count = len(fmt)
+    elif base_type == 'string':
+        return None, None
+    else:
+        try:
+            subspec = get_spec(base_type, spec.package)
+        except KeyError:
+            raise MsgSpecException("Cannot compute layout of [%s]: type [%s] is not registered"%(spec.full_name, base_type))
+        if get_spec is get_embedded_spec:
+            sublayout = subspec.layout()
+        else:
+            sublayout = compute_layout(subspec, get_spec)
+        if sublayout.fixed_size is None:
+            return None, None
+        if not sublayout.segments:
+            fmt, count = '', 0
+        else:
+            fmt = sublayout.segments[0].struct.format[1:]
+            count = sum([c for _, _, c in sublayout.segments[0].fields])
+    if not field.is_array:
+        return fmt, count
+    elif field.array_len is None:
+        return None, None
+    elif base_type in ['uint8', 'char']:
+        # byte arrays are unpacked as a single str/bytes value
+        return '%ss'%field.array_len, 1
+    return fmt * field.array_len, count * field.array_len
+
+def get_embedded_spec(base_type, package_context=''):
+    """
+    Look up the spec of an embedded message type. Header (and its
+    REP 100 alias roslib/Header) resolves to std_msgs/Header, which
+    is loaded from std_msgs if available and otherwise taken from
+    L{HEADER_MSG}.
+
+    @param base_type: type name without array specifier
+    @type  base_type: str
+    @param package_context: package of the embedding message
+    @type  package_context: str
+    @rtype: L{MsgSpec}
+    @raise KeyError: if the type is not registered
+    """
+    global _default_header
+    name = _canonical_type(base_type, package_context)
+    if is_registered(name):
+        return REGISTERED_TYPES[name]
+    elif name == 'std_msgs/'+HEADER:
+        if _default_header is not None:
+            # std_msgs could not be loaded before, do not search again
+            return _default_header
+        try:
+            _init()
+        except Exception:
+            pass # no ROS environment, e.g. tools working from recorded message definitions
+        if is_registered(name):
+            return REGISTERED_TYPES[name]
+        _default_header = load_from_string(HEADER_MSG, 'std_msgs', name, HEADER)
+        return _default_header
+    return get_registered(base_type, package_context)
+
+def compute_layout(spec, get_spec=None):
+    """
+    Compute the wire layout of spec. Use L{MsgSpec.layout()} for the
+    cached value.
+    @param spec: message spec
+    @type  spec: L{MsgSpec}
+    @param get_spec: function (base_type, package_context) -> L{MsgSpec}
+        that resolves embedded types, raising KeyError for unknown
+        types. Defaults to L{get_embedded_spec()}.
+    @type  get_spec: fn
+    @return: wire layout
+    @rtype: L{MsgLayout}
+    @raise MsgSpecException: if an embedded type is not registered
+    """
+    if get_spec is None:
+        get_spec = get_embedded_spec
+    segments = []
+    fmt = ''
+    fields = []
+    offset = 0
+    for field in spec.parsed_fields():
+        field_fmt, count = _fixed_field_format(spec, field, get_spec)
+        if field_fmt is not None:
+            fmt += field_fmt
+            fields.append((field.name, field.type, count))
+            continue
+        if fields:
+            segments.append(LayoutSegment(offset, struct.Struct('<'+fmt), fields))
+            offset += segments[-1].struct.size
+        segments.append(LayoutSegment(offset, None, [(field.name, field.type, None)]))
+        fmt = ''
+        fields = []
+        offset = 0
+    if fields:
+        segments.append(LayoutSegment(offset, struct.Struct('<'+fmt), fields))
+    if [s for s in segments if s.struct is None]:
+        fixed_size = None
+    else:
+        fixed_size = sum([s.struct.size for s in segments])
+    return MsgLayout(fixed_size, segments)
+
 # msg spec loading utilities ##########################################
 
 def reinit():
@@ -357,16 +572,30 @@ def reinit():
     Reinitialize roslib.msgs. This API is for message generators
     (e.g. genpy) that need to re-initialize the registration table.
     """
-    global _initialized , _loaded_packages
+    global _initialized, _default_header
     # unset the initialized state and unregister everything 
-    _initialized = False
-    del _loaded_packages[:]
-    REGISTERED_TYPES.clear()
+    with _registry_lock:
+        _initialized = False
+        _loaded_packages.clear()
+        _package_types.clear()
+        _pending_types.clear()
+        _embeds.clear()
+        _embedded_by.clear()
+        REGISTERED_TYPES.clear()
+        _bump_generation()
+        _default_header = None
     _init()
     
 _initialized = False
+_init_lock = threading.Lock()
 def _init():
     #lazy-init
+    if _initialized:
+        return
+    with _init_lock:
+        return _init_locked()
+
+def _init_locked():
     global _initialized
     if _initialized:
         return
@@ -394,15 +623,11 @@ def _init():
 
 # .msg file routines ##############################################################       
 
-def _msg_filter(f):
-    """
-    Predicate for filtering directory list. matches message files
-    @param f: filename
-    @type  f: str
-    """
-    return os.path.isfile(f) and f.endswith(EXT)
+## predicate for filtering directory list. matches message files
+_msg_filter = roslib.resources.ExtensionFilter(EXT)
 
 # also used by doxymaker
+@roslib.instrument.timed('msgs.list_msg_types')
 def list_msg_types(package, include_depends):
     """
     List all messages in the specified package
@@ -410,6 +635,11 @@ def list_msg_types(package, include_depends):
     @param include_depends bool: if True, will also list messages in package dependencies
     @return [str]: message type names
     """
+    snapshot = roslib.snapshot.get_snapshot()
+    if snapshot is not None:
+        types = snapshot.list_types(package, 'msg', include_depends)
+        if types is not None:
+            return types
     types = roslib.resources.list_package_resources(package, include_depends, 'msg', _msg_filter)
     return [x[:-len(EXT)] for x in types]
 
@@ -427,6 +657,59 @@ def msg_file(package, type_):
     """
     return roslib.packages.resource_file(package, 'msg', type_+EXT)
 
+def map_threaded(fn, items, max_workers=None):
+    """
+    Apply fn to each item on a bounded thread pool. Items are
+    processed serially if concurrent.futures is not available.
+    Shared by the .msg and .srv loaders; fn must not touch the
+    package directory cache (see L{get_pkgs_msg_specs()}).
+
+    @param max_workers: maximum number of threads, defaults to MAX_LOAD_WORKERS
+    @type  max_workers: int
+    @return: results of fn in the same order as items
+    @rtype: list
+    """
+    items = list(items)
+    if max_workers is None:
+        max_workers = MAX_LOAD_WORKERS
+    if ThreadPoolExecutor is None or max_workers < 2 or len(items) < 2:
+        return [fn(i) for i in items]
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(items))) as executor:
+        return list(executor.map(fn, items))
+
+def try_load(loader, path, package):
+    """
+    @return: result of loader(path, package) and None, or None and
+        the raised exception
+    @rtype: (object, Exception)
+    """
+    try:
+        return loader(path, package), None
+    except Exception as e:
+        return None, e
+
+def list_types_concurrently(packages, subdir, rfilter, ext, max_workers=None):
+    """
+    List the resource files in subdir of each package. Package
+    directories are resolved on the calling thread, as this may run
+    rospack and fills the package directory cache; only the
+    directory listings run on the thread pool.
+
+    @return: (package, resource directory, type name) for each
+        resource, ordered by package in the order given
+    @rtype: [(str, str, str)]
+    @raise roslib.packages.InvalidROSPkgException: if a package cannot be found
+    """
+    packages = list(packages)
+    pkg_dirs = roslib.packages.get_pkg_dirs(packages)
+    listings = map_threaded(lambda d: roslib.resources.list_package_resources_by_dir(d, False, subdir, rfilter),
+                            pkg_dirs, max_workers)
+    jobs = []
+    for package, pkg_dir, types in zip(packages, pkg_dirs, listings):
+        d = roslib.packages._get_pkg_subdir_by_dir(pkg_dir, subdir, False)
+        jobs.extend([(package, d, t[:-len(ext)]) for t in types])
+    return jobs
+
 def get_pkg_msg_specs(package):
     """
     List all messages that a package contains.
@@ -437,29 +720,130 @@ def get_pkg_msg_specs(package):
         of message names that could not be processed. 
     @rtype: [(str, L{MsgSpec}), [str]]
     """
+    return get_pkgs_msg_specs([package])
+
+@roslib.instrument.timed('msgs.get_pkgs_msg_specs')
+def get_pkgs_msg_specs(packages, max_workers=None):
+    """
+    List all messages that the packages contain. Message files are
+    read and parsed concurrently; results are ordered by package in
+    the order given, then by message name listing order.
+    
+    @param packages: packages to load messages from, e.g. in dependency order
+    @type  packages: [str]
+    @param max_workers: maximum number of loader threads, defaults to MAX_LOAD_WORKERS
+    @type  max_workers: int
+    @return: list of message type names and specs for packages, as well as a list
+        of message names that could not be processed. 
+    @rtype: [(str, L{MsgSpec}), [str]]
+    """
     _init()
-    types = list_msg_types(package, False)
+    jobs = list_types_concurrently(packages, 'msg', _msg_filter, EXT, max_workers)
+    results = map_threaded(lambda j: try_load(load_from_file, os.path.join(j[1], j[2]+EXT), j[0]), jobs, max_workers)
     specs = [] #no fancy list comprehension as we want to show errors
     failures = []
-    for t in types:
-        try: 
-            typespec = load_from_file(msg_file(package, t), package)
+    for (package, _, t), (typespec, e) in zip(jobs, results):
+        if e is None:
             specs.append(typespec)
-        except Exception as e:
+        else:
             failures.append(t)
             print("ERROR: unable to load %s, %s"%(t, e))
     return specs, failures
 
+def _list_package_types(packages, max_workers=None):
+    """
+    List the message types of packages concurrently, filling in
+    the per-package type listing used by L{_register_lazy()}.
+
+    @param packages: package names
+    @type  packages: [str]
+    """
+    missing = [p for p in packages if p not in _package_types]
+    found = dict([(p, []) for p in missing])
+    for p, _, t in list_types_concurrently(missing, 'msg', _msg_filter, EXT, max_workers):
+        found[p].append(t)
+    with _registry_lock:
+        for p in missing:
+            _package_types.setdefault(p, found[p])
+
+def _register_lazy(package, local_key=False):
+    """
+    Record the message types available in package without parsing
+    them. Each spec is loaded from disk on first access through
+    L{is_registered()} or L{get_registered()}.
+
+    @param package: package name
+    @type  package: str
+    @param local_key: if True, also record each type under
+        package-relative key (see L{load_package()})
+    @type  local_key: bool
+    """
+    types = _package_types.get(package)
+    if types is None:
+        types = list_msg_types(package, False)
+    with _registry_lock:
+        types = _package_types.setdefault(package, types)
+        for t in types:
+            keys = _local_aliases(package, t)
+            for key in (keys if local_key else keys[:1]):
+                if key not in REGISTERED_TYPES:
+                    _pending_types[key] = (package, t)
+
+def _load_pending(msg_type_name):
+    """
+    Load and register a spec recorded by L{_register_lazy()}.
+
+    @return: True if msg_type_name is now registered
+    @rtype: bool
+    """
+    entry = _pending_types.get(msg_type_name)
+    if entry is None:
+        # register() adds to REGISTERED_TYPES before it drops the
+        # pending entry, so a concurrent load is visible here
+        return msg_type_name in REGISTERED_TYPES
+    # threads loading the same file wait for each other, different
+    # files load in parallel
+    with _load_locks[hash(entry) % len(_load_locks)]:
+        with _registry_lock:
+            if _pending_types.get(msg_type_name) != entry:
+                return msg_type_name in REGISTERED_TYPES
+            # load_package() records the same file under two keys
+            aliases = [msg_type_name] + [k for k in _local_aliases(entry[0], entry[1])
+                                         if k != msg_type_name and _pending_types.get(k) == entry]
+        package, t = entry
+        try:
+            _, spec = load_from_file(msg_file(package, t), package)
+        except Exception as e:
+            print("ERROR: unable to load %s, %s"%(t, e))
+            with _registry_lock:
+                for k in aliases:
+                    if _pending_types.get(k) == entry:
+                        del _pending_types[k]
+            return False
+        with _registry_lock:
+            for k in aliases:
+                register(k, spec)
+        return True
+
+def _local_aliases(package, t):
+    """
+    @return: keys that L{_register_lazy()} may record type t of package under
+    @rtype: [str]
+    """
+    key = package + SEP + t
+    return [key, package + roslib.names.PRN_SEPARATOR + key]
+
+@roslib.instrument.timed('msgs.load_package_dependencies')
 def load_package_dependencies(package, load_recursive=False):
     """
     Register all messages that the specified package depends on.
+    Message specs are parsed lazily on first lookup.
     
     @param load_recursive: (optional) if True, load all dependencies,
         not just direct dependencies. By default, this is false to
         prevent packages from incorrectly inheriting dependencies.
     @type  load_recursive: bool
     """
-    global _loaded_packages
     _init()    
     if VERBOSE:
         print("Load dependencies for package", package)
@@ -471,33 +855,35 @@ def load_package_dependencies(package, load_recursive=False):
     else:
         depends = rospkg.RosPack().get_depends(package, implicit=True)
 
-    msgs = []
-    failures = []
+    new_depends = []
     for d in depends:
         if VERBOSE:
             print("Load dependency", d)
         #check if already loaded
         # - we are dependent on manifest.getAll returning first-order dependencies first
-        if d in _loaded_packages or d == package:
+        if d in _loaded_packages or d == package or d in new_depends:
             continue
-        _loaded_packages.append(d)
-        specs, failed = get_pkg_msg_specs(d)
-        msgs.extend(specs)
-        failures.extend(failed)
-    for key, spec in msgs:
-        register(key, spec)
+        new_depends.append(d)
+    _list_package_types(new_depends)
+    for d in new_depends:
+        _register_lazy(d)
+    # only mark packages loaded once their types are visible, threads
+    # that race on the same package both register it
+    with _registry_lock:
+        _loaded_packages.update(new_depends)
 
+@roslib.instrument.timed('msgs.load_package')
 def load_package(package):
     """
     Load package into the local registered namespace. All messages found
     in the package will be registered if they are successfully
     loaded. This should only be done with one package (i.e. the 'main'
-    package) per Python instance.
+    package) per Python instance. Message specs are parsed lazily on
+    first lookup.
 
     @param package: package name
     @type  package: str
     """
-    global _loaded_packages
     _init()    
     if VERBOSE:
         print("Load package", package)
@@ -509,14 +895,12 @@ def load_package(package):
             print("Package %s is already loaded"%package)
         return
 
-    _loaded_packages.append(package)
-    specs, failed = get_pkg_msg_specs(package)
+    #register spec under both local and fully-qualified key
+    _register_lazy(package, local_key=True)
+    with _registry_lock:
+        _loaded_packages.add(package)
     if VERBOSE:
-        print("Package contains the following messages: %s"%specs)
-    for key, spec in specs:
-        #register spec under both local and fully-qualified key
-        register(key, spec)
-        register(package + roslib.names.PRN_SEPARATOR + key, spec)        
+        print("Package contains the following messages: %s"%_package_types[package])
 
 def _convert_val(type_, val):
     """
@@ -556,6 +940,7 @@ def _convert_val(type_, val):
         return True if eval(val) else False
     raise MsgSpecException("invalid constant type: [%s]"%type_)
         
+@roslib.instrument.timed('msgs.load_by_type')
 def load_by_type(msgtype, package_context=''):
     """
     Load message specification for specified type
@@ -630,6 +1015,7 @@ def load_from_string(text, package_context='', full_name='', short_name=''):
             names.append(name)
     return MsgSpec(types, names, constants, text, full_name, short_name, package_context)
 
+@roslib.instrument.timed('msgs.load_from_file')
 def load_from_file(file_path, package_context=''):
     """
     Convert the .msg representation in the file to a MsgSpec instance.
@@ -660,15 +1046,11 @@ def load_from_file(file_path, package_context=''):
     if not roslib.names.is_legal_resource_name(type_):
         raise MsgSpecException("%s: [%s] is not a legal type name"%(file_path, type_))
     
-    f = open(file_path, 'r')
+    text = roslib.snapshot.read_file(file_path)
     try:
-        try:
-            text = f.read()
-            return (type_, load_from_string(text, package_context, type_, base_type_))
-        except MsgSpecException as e:
-            raise MsgSpecException('%s: %s'%(file_name, e))
-    finally:
-        f.close()
+        return (type_, load_from_string(text, package_context, type_, base_type_))
+    except MsgSpecException as e:
+        raise MsgSpecException('%s: %s'%(file_name, e))
 
 # data structures and builtins specification ###########################
 
@@ -696,6 +1078,8 @@ def is_header_type(type_):
 TIME_MSG     = "uint32 secs\nuint32 nsecs"
 ## duration as msg spec. duration is just like time except signed
 DURATION_MSG = "int32 secs\nint32 nsecs"
+## definition of std_msgs/Header, for use without a ROS environment
+HEADER_MSG   = "uint32 seq\ntime stamp\nstring frame_id"
 
 ## primitive types are those for which we allow constants, i.e. have  primitive representation
 PRIMITIVE_TYPES = ['int8','uint8','int16','uint16','int32','uint32','int64','uint64','float32','float64',
@@ -720,7 +1104,24 @@ EXTENDED_BUILTINS = { TIME : load_from_string(TIME_MSG), DURATION: load_from_str
 RESERVED_TYPES  = BUILTIN_TYPES + [HEADER]
 
 REGISTERED_TYPES = { } 
-_loaded_packages = [] #keep track of packages so that we only load once (note: bug #59)
+## incremented whenever REGISTERED_TYPES changes, see L{get_registry_generation()}
+_registry_generation = 0
+## std_msgs/Header spec used when std_msgs cannot be loaded
+_default_header = None
+_loaded_packages = set() #keep track of packages so that we only load once (note: bug #59)
+## guards updates of the registry tables. Lookups of registered
+## types do not take it.
+_registry_lock = threading.RLock()
+## striped locks that serialize loading the same pending spec
+_load_locks = [threading.Lock() for _ in range(16)]
+## package name -> message type names found in its msg directory
+_package_types = { }
+## type name -> (package, type) of specs recorded but not yet parsed
+_pending_types = { }
+## reverse type index: type name -> names of the registered types that directly embed it
+_embedded_by = { }
+## forward edges of _embedded_by: type name -> names of the types it directly embeds
+_embeds = { }
 
 def is_registered(msg_type_name):
     """
@@ -730,7 +1131,7 @@ def is_registered(msg_type_name):
     registered. NOTE: builtin types are not registered.
     @rtype: bool
     """
-    return msg_type_name in REGISTERED_TYPES
+    return msg_type_name in REGISTERED_TYPES or _load_pending(msg_type_name)
 
 def get_registered(msg_type_name, default_package=None):
     """
@@ -739,15 +1140,32 @@ def get_registered(msg_type_name, default_package=None):
     @return: msg spec for msg type name
     @rtype: L{MsgSpec}
     """
-    if msg_type_name in REGISTERED_TYPES:
+    if is_registered(msg_type_name):
         return REGISTERED_TYPES[msg_type_name]
     elif default_package:
         # if msg_type_name has no package specifier, try with default package resolution
         p, n = roslib.names.package_resource_name(msg_type_name)
         if not p:
-            return REGISTERED_TYPES[roslib.names.resource_name(default_package, msg_type_name)]
+            key = roslib.names.resource_name(default_package, msg_type_name)
+            _load_pending(key)
+            return REGISTERED_TYPES[key]
     raise KeyError(msg_type_name)
 
+def _bump_generation():
+    global _registry_generation
+    with _registry_lock:
+        _registry_generation += 1
+
+def get_registry_generation():
+    """
+    Caches derived from registered specs (e.g. layouts and codecs)
+    compare this value to detect that they may be stale.
+    @return: counter that changes whenever a type is registered or
+        the registry is reinitialized
+    @rtype: int
+    """
+    return _registry_generation
+
 def register(msg_type_name, msg_spec):
     """
     Load MsgSpec into the type dictionary
@@ -759,5 +1177,85 @@ def register(msg_type_name, msg_spec):
     """
     if VERBOSE:
         print("Register msg %s"%msg_type_name)
-    REGISTERED_TYPES[msg_type_name] = msg_spec
+    with _registry_lock:
+        REGISTERED_TYPES[msg_type_name] = msg_spec
+        entry = _pending_types.pop(msg_type_name, None)
+        if entry is not None:
+            # spec supersedes the file recorded by load_package(), also
+            # under its other key
+            for k in _local_aliases(*entry):
+                if _pending_types.get(k) == entry:
+                    del _pending_types[k]
+        _bump_generation()
+        _index_spec(_canonical_type(msg_spec.full_name or msg_type_name), msg_spec)
+
+def _canonical_type(type_, package_context=''):
+    """
+    @return: package-qualified base type of type_ if it can be
+        determined, e.g. 'Header[]' -> 'std_msgs/Header'
+    @rtype: str
+    """
+    bt = base_msg_type(type_)
+    if bt in BUILTIN_TYPES:
+        return bt
+    elif SEP not in bt and (bt == HEADER or package_context):
+        bt = resolve_type(bt, package_context)
+    if bt == 'roslib/'+HEADER:
+        # REP 100: roslib/Header is the pre-Diamondback name of std_msgs/Header
+        return 'std_msgs/'+HEADER
+    return bt
+
+def _index_spec(name, spec):
+    """
+    Update the reverse type index with the types embedded by spec.
+
+    @param name: canonical type name of spec
+    @type  name: str
+    @param spec: spec that is registered under name
+    @type  spec: L{MsgSpec}
+    """
+    embeds = set([_canonical_type(t, spec.package) for t in spec.types])
+    embeds.difference_update(BUILTIN_TYPES)
+    for t in _embeds.get(name, ()):
+        if t not in embeds:
+            _embedded_by[t].discard(name)
+    for t in embeds:
+        _embedded_by.setdefault(t, set()).add(name)
+    _embeds[name] = embeds
+
+def get_embedding_types(msg_type_name, transitive=True, load_pending=True):
+    """
+    Query the reverse type index for the message types that embed
+    msg_type_name, e.g. to determine which generated code must be
+    rebuilt if msg_type_name changes. The index covers registered
+    types only.
+
+    @param msg_type_name: name of message type, e.g. 'std_msgs/Header'
+    @type  msg_type_name: str
+    @param transitive: if True, include types that embed
+        msg_type_name indirectly through other types
+    @type  transitive: bool
+    @param load_pending: if True, parse any specs that were recorded
+        by L{load_package()}/L{load_package_dependencies()} but
+        have not been looked up yet, so that they are indexed
+    @type  load_pending: bool
+    @return: names of embedding types
+    @rtype: [str]
+    """
+    if load_pending:
+        for key in list(_pending_types.keys()):
+            _load_pending(key)
+    start = _canonical_type(msg_type_name)
+    found = set()
+    queue = [start]
+    while queue:
+        with _registry_lock:
+            embedding = list(_embedded_by.get(queue.pop(), ()))
+        for t in embedding:
+            if t not in found:
+                found.add(t)
+                if transitive:
+                    queue.append(t)
+    found.discard(start)
+    return sorted(found)
 
@@ -39,8 +39,11 @@ routines will likely be *deleted* in future releases.
 """
 
 import os
+import string
 import sys
 
+from collections import OrderedDict
+
 #TODO: deprecate PRN_SEPARATOR
 PRN_SEPARATOR = '/'
 TYPE_SEPARATOR = PRN_SEPARATOR #alias
@@ -345,6 +348,147 @@ def is_legal_resource_base_name(name):
     m = BASE_NAME_LEGAL_CHARS_P.match(name)
     return m is not None and m.group(0) == name
 
+################################################################################
+# BATCH NAME VALIDATORS
+
+# Each validator accepts the same names as its single-name counterpart
+# above. The per-name patterns exclude '//' directly so that a single
+# match decides legality. For batches of ASCII names, the batch is
+# joined by newlines (which are never legal) and scanned once at C
+# speed for anything that can make a name illegal; only the names
+# containing such a position are checked individually.
+_NAME_P = r'(?:/(?:\w+/)*\w*|[~A-Za-z]\w*(?:/\w+)*/?)'
+_RESOURCE_NAME_P = r'[A-Za-z]\w*(?:/\w+)*/?'
+_BASE_NAME_P = r'[A-Za-z]\w*'
+_ASCII_WORD_CHARS = string.ascii_letters + string.digits + '_'
+
+def _find_all(blob, sub):
+    """
+    @return: positions of sub in blob
+    @rtype: [int]
+    """
+    positions = []
+    p = blob.find(sub)
+    while p != -1:
+        positions.append(p)
+        p = blob.find(sub, p + 1)
+    return positions
+
+def _batch_validator(pattern, allow_empty, first_chars, extra_chars):
+    if allow_empty:
+        pattern = '(?:%s)?'%pattern
+    single = re.compile('%s\\Z'%pattern)
+    first = re.compile('[%s]'%first_chars)
+    rest = re.compile('[\\w%s]'%extra_chars)
+    allowed = (_ASCII_WORD_CHARS + extra_chars + '\n').encode('ascii')
+    bad_first = re.compile(('\n[^%s\n]'%first_chars).encode('ascii'))
+    def reason(name):
+        """
+        @return: reason name is illegal, or None if it is legal
+        @rtype: str
+        """
+        if not isstring(name):
+            return "not a string"
+        elif single.match(name) is not None:
+            return None
+        elif not name:
+            return "empty name"
+        elif first.match(name) is None:
+            return "illegal first character %r"%name[0]
+        elif '/' in extra_chars and '//' in name:
+            return "contains '//'"
+        for c in name[1:]:
+            if rest.match(c) is None:
+                return "illegal character %r"%c
+        return "illegal name"
+    def suspects(names):
+        """
+        @return: indices of the names that may be illegal, or None if
+            the joined scan is inconclusive and every name has to be
+            checked
+        @rtype: [int]
+        """
+        try:
+            blob = ('\n' + '\n'.join(names) + '\n').encode('ascii')
+        except (TypeError, UnicodeError):
+            return None # non-string or non-ASCII entries
+        if blob.count(b'\n') != len(names) + 1:
+            return None # entries containing newlines
+        # positions that make the enclosing name illegal. Each check
+        # is a single C-speed scan in the common all-legal case.
+        positions = []
+        for c in set(bytearray(blob.translate(None, allowed))):
+            positions.extend(_find_all(blob, bytes(bytearray([c]))))
+        if bad_first.search(blob) is not None:
+            positions.extend([m.start() + 1 for m in bad_first.finditer(blob)])
+        if not allow_empty:
+            positions.extend([p + 1 for p in _find_all(blob, b'\n\n')])
+        if '/' in extra_chars:
+            positions.extend(_find_all(blob, b'//'))
+        if '~' in extra_chars and blob.count(b'~') != blob.count(b'\n~'):
+            positions.extend([p for p in _find_all(blob, b'~') if blob[p-1:p] != b'\n'])
+        # name i spans the bytes after the (i+1)th newline
+        indices = []
+        index = -1
+        start = 0
+        for p in sorted(positions):
+            index += blob.count(b'\n', start, p)
+            start = p
+            if not indices or indices[-1] != index:
+                indices.append(index)
+        return indices
+    def find_illegal(names):
+        names = list(names)
+        indices = suspects(names)
+        if indices is not None:
+            names = [names[i] for i in indices]
+        return [(n, r) for n, r in ((n, reason(n)) for n in names) if r is not None]
+    return find_illegal
+
+_find_illegal_names = _batch_validator(_NAME_P, True, '~/A-Za-z', '/~')
+_find_illegal_resource_names = _batch_validator(_RESOURCE_NAME_P, False, 'A-Za-z', '/')
+_find_illegal_base_names = _batch_validator(_BASE_NAME_P, False, 'A-Za-z', '')
+
+def find_illegal_names(names):
+    """
+    Batch version of L{is_legal_name()}.
+    @param names: names to validate
+    @type  names: iterable of str
+    @return: (name, reason) for each illegal name, in input order
+    @rtype: [(str, str)]
+    """
+    return _find_illegal_names(names)
+
+def find_illegal_resource_names(names):
+    """
+    Batch version of L{is_legal_resource_name()}.
+    @param names: names to validate
+    @type  names: iterable of str
+    @return: (name, reason) for each illegal name, in input order
+    @rtype: [(str, str)]
+    """
+    return _find_illegal_resource_names(names)
+
+def find_illegal_base_names(names):
+    """
+    Batch version of L{is_legal_base_name()}.
+    @param names: names to validate
+    @type  names: iterable of str
+    @return: (name, reason) for each illegal name, in input order
+    @rtype: [(str, str)]
+    """
+    return _find_illegal_base_names(names)
+
+def find_illegal_resource_base_names(names):
+    """
+    Batch version of L{is_legal_resource_base_name()}.
+    @param names: names to validate
+    @type  names: iterable of str
+    @return: (name, reason) for each illegal name, in input order
+    @rtype: [(str, str)]
+    """
+    return _find_illegal_base_names(names)
+
 def canonicalize_name(name):
     """
     Put name in canonical form. Extra slashes '//' are removed and
@@ -393,6 +537,301 @@ def resolve_name(name, namespace_, remappings=None):
     else:
         return resolved_name
 
+## default maximum number of entries in each L{NameResolver} cache
+RESOLVER_CACHE_SIZE = 4096
+
+_MISSING = object()
+
+class _LRUCache(object):
+    """
+    Bounded least-recently-used mapping with hit/miss counters
+    """
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+
+    def get(self, key):
+        """
+        @return: cached value for key, or _MISSING
+        """
+        try:
+            value = self._data.pop(key)
+        except KeyError:
+            self.misses += 1
+            return _MISSING
+        # re-insert to mark as most recently used
+        self._data[key] = value
+        self.hits += 1
+        return value
+
+    def put(self, key, value):
+        self._data[key] = value
+        if len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def clear(self):
+        self._data.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._data)
+
+class NameResolver(object):
+    """
+    Resolver for ROS names relative to a fixed namespace and
+    remapping table. Canonical and resolved names are memoized in
+    bounded LRU caches, which makes it suitable for tools that
+    resolve the same names repeatedly. Results are identical to
+    L{canonicalize_name()} and L{resolve_name()}.
+    """
+
+    def __init__(self, namespace_, remappings=None, maxsize=RESOLVER_CACHE_SIZE):
+        """
+        @param namespace_: node name to resolve relative to, see L{resolve_name()}
+        @type  namespace_: str
+        @param remappings: Map of resolved remappings or
+            L{Remapper}. A dict is copied, so later changes to it do
+            not affect the resolver.
+        @type  remappings: {str: str}
+        @param maxsize: maximum number of entries in each cache
+        @type  maxsize: int
+        """
+        self.namespace = namespace_
+        if isinstance(remappings, dict):
+            remappings = dict(remappings)
+        self.remappings = remappings or None
+        self._canonical = _LRUCache(maxsize)
+        self._resolved = _LRUCache(maxsize)
+
+    def canonicalize_name(self, name):
+        """
+        Memoized L{canonicalize_name()}
+        @param name: ROS name
+        @type  name: str
+        """
+        val = self._canonical.get(name)
+        if val is _MISSING:
+            val = canonicalize_name(name)
+            self._canonical.put(name, val)
+        return val
+
+    def resolve_name(self, name):
+        """
+        Memoized L{resolve_name()} using the namespace and remappings of this resolver
+        @param name: name to resolve.
+        @type  name: str
+        @return: Resolved name.
+        @rtype: str
+        """
+        val = self._resolved.get(name)
+        if val is _MISSING:
+            val = resolve_name(name, self.namespace, self.remappings)
+            self._resolved.put(name, val)
+        return val
+
+    @property
+    def hits(self):
+        """
+        Number of lookups answered from the caches
+        """
+        return self._canonical.hits + self._resolved.hits
+
+    @property
+    def misses(self):
+        """
+        Number of lookups that had to be computed
+        """
+        return self._canonical.misses + self._resolved.misses
+
+    def cache_size(self):
+        """
+        @return: number of entries currently cached
+        @rtype: int
+        """
+        return len(self._canonical) + len(self._resolved)
+
+    def clear_cache(self):
+        """
+        Empty the caches and reset hit/miss counters
+        """
+        self._canonical.clear()
+        self._resolved.clear()
+
+class _TrieNode(object):
+    __slots__ = ['children', 'exact', 'prefix']
+
+    def __init__(self):
+        self.children = {}
+        self.exact = None
+        self.prefix = None
+
+class Remapper(object):
+    """
+    Remapping table backed by a trie over the '/'-separated segments
+    of resolved names. In addition to exact rules, as produced by
+    L{load_mappings()}, it supports namespace rules that remap a
+    namespace and every name below it, e.g. a namespace rule
+    '/robot1' -> '/fleet/robot1' maps '/robot1/odom' to
+    '/fleet/robot1/odom'. An exact rule for a name takes precedence,
+    otherwise the rule of the deepest matching namespace is used.
+
+    Lookups are O(depth) of the name. A Remapper supports 'in' and
+    [] like a dict of remappings, so it can be passed as the
+    remappings argument of L{resolve_name()} and L{NameResolver}.
+    """
+
+    def __init__(self, mappings=None, namespace_mappings=None):
+        """
+        @param mappings: exact name->name remappings, e.g. from L{load_mappings()}
+        @type  mappings: {str: str}
+        @param namespace_mappings: namespace->namespace remappings
+        @type  namespace_mappings: {str: str}
+        """
+        self._root = _TrieNode()
+        # exact rules for names that are not global
+        self._relative = {}
+        for src, dst in (mappings or {}).items():
+            self.add_mapping(src, dst)
+        for src, dst in (namespace_mappings or {}).items():
+            self.add_namespace_mapping(src, dst)
+
+    def _node(self, name):
+        node = self._root
+        for segment in name.split(SEP):
+            if segment:
+                node = node.children.setdefault(segment, _TrieNode())
+        return node
+
+    def add_mapping(self, src, dst):
+        """
+        Remap resolved name src to dst
+        @param src: resolved (global) name
+        @type  src: str
+        @param dst: name to remap src to
+        @type  dst: str
+        """
+        if is_global(src):
+            self._node(src).exact = dst
+        else:
+            self._relative[src] = dst
+
+    def add_namespace_mapping(self, src, dst):
+        """
+        Remap namespace src and every name in it to namespace dst
+        @param src: resolved (global) namespace
+        @type  src: str
+        @param dst: namespace to remap src to
+        @type  dst: str
+        """
+        self._node(src).prefix = canonicalize_name(dst) or SEP
+
+    def _remap(self, segments, start, node, best, best_depth):
+        """
+        Continue the trie walk for segments[start:] from node.
+        @return: remapped name or None if no rule matches
+        """
+        for depth in range(start, len(segments)):
+            node = node.children.get(segments[depth])
+            if node is None:
+                break
+            if node.prefix is not None:
+                best, best_depth = node.prefix, depth + 1
+        else:
+            if node.exact is not None:
+                return node.exact
+        if best is None:
+            return None
+        return _join_remainder(best, segments[best_depth:])
+
+    def remap(self, name):
+        """
+        @param name: resolved (global) name
+        @type  name: str
+        @return: remapped name, or name if no rule matches
+        @rtype: str
+        """
+        val = self.get(name)
+        return name if val is None else val
+
+    def get(self, name, default=None):
+        """
+        @return: remapped name, or default if no rule matches
+        """
+        if not name or name[0] != SEP:
+            return self._relative.get(name, default)
+        val = self._remap([x for x in name.split(SEP) if x], 0, self._root, self._root.prefix, 0)
+        return default if val is None else val
+
+    def resolve_many(self, names):
+        """
+        Remap a batch of resolved names. Names are walked in sorted
+        order so that names sharing a namespace share the trie
+        traversal of that namespace.
+        @param names: resolved (global) names
+        @type  names: [str]
+        @return: remapped names, in the order of names
+        @rtype: [str]
+        """
+        names = list(names)
+        results = {}
+        # stack of (segment, node, best, best_depth) along the previous name's path
+        stack = []
+        prev = []
+        for name in sorted(set(names)):
+            if not name or name[0] != SEP:
+                results[name] = self._relative.get(name, name)
+                continue
+            segments = [x for x in name.split(SEP) if x]
+            common = 0
+            while common < len(prev) and common < len(segments) and \
+                    common < len(stack) and prev[common] == segments[common]:
+                common += 1
+            del stack[common:]
+            if stack:
+                _, node, best, best_depth = stack[-1]
+            else:
+                node, best, best_depth = self._root, self._root.prefix, 0
+            # extend the shared path one segment at a time
+            depth = len(stack)
+            while node is not None and depth < len(segments):
+                node = node.children.get(segments[depth])
+                if node is None:
+                    break
+                if node.prefix is not None:
+                    best, best_depth = node.prefix, depth + 1
+                stack.append((segments[depth], node, best, best_depth))
+                depth += 1
+            prev = segments
+            if node is not None and depth == len(segments) and node.exact is not None:
+                results[name] = node.exact
+            elif best is not None:
+                results[name] = _join_remainder(best, segments[best_depth:])
+            else:
+                results[name] = name
+        return [results[n] for n in names]
+
+    def __contains__(self, name):
+        return self.get(name) is not None
+
+    def __getitem__(self, name):
+        val = self.get(name)
+        if val is None:
+            raise KeyError(name)
+        return val
+
+def _join_remainder(ns, segments):
+    """
+    @return: ns joined with the remaining name segments
+    @rtype: str
+    """
+    if not segments:
+        return ns
+    return ns_join(ns, SEP.join(segments))
+
 def anonymous_name(id):
     """
     Generate a ROS-legal 'anonymous' name
@@ -38,11 +38,15 @@ here have been superceded by other libraries (e.g. rosgraph).  These
 routines will likely be *deleted* in future releases.
 """
 
+import binascii
+import errno
+import heapq
 import os
 import socket
 import struct
 import sys
 import platform
+import time
 
 try:
     from cStringIO import StringIO #Python 2.x
@@ -56,6 +60,16 @@ try:
 except ImportError:
     import urlparse
 
+try:
+    from queue import Queue #Python 3.x
+except ImportError:
+    from Queue import Queue #Python 2.x
+
+try:
+    import selectors #Python 3.4+
+except ImportError:
+    selectors = None
+
 #TODO: change this to rosgraph equivalents once we have ported this module
 ROS_IP = 'ROS_IP'
 ROS_HOSTNAME = 'ROS_HOSTNAME'
@@ -113,20 +127,89 @@ def get_address_override():
         return os.environ[ROS_IP]
     return None
 
+## seconds that get_local_addresses() results are reused for
+LOCAL_ADDRESS_TTL = 5.0
+## seconds that hostname resolutions made by is_local_address() are reused for
+HOSTNAME_TTL = 30.0
+## maximum number of hostname resolutions kept by is_local_address()
+HOSTNAME_CACHE_SIZE = 256
+
+_monotonic = getattr(time, 'monotonic', time.time)
+
+# hostname -> (expiry, [normalized address])
+_host_cache = {}
+
+def _normalize_address(addr):
+    """
+    @return: canonical text form of IPv6 address addr (brackets and
+      zone index removed, e.g. '[0:0:0:0:0:0:0:1]' -> '::1'). IPv4
+      addresses, also IPv4-mapped IPv6 ones, are returned in dotted
+      form.
+    @rtype: str
+    """
+    if ':' not in addr:
+        return addr
+    addr = addr.strip('[]').split('%')[0]
+    try:
+        addr = socket.inet_ntop(socket.AF_INET6, socket.inet_pton(socket.AF_INET6, addr))
+    except (AttributeError, ValueError, socket.error):
+        # not an IPv6 address, or no inet_pton (Python 2 on Windows)
+        return addr.lower()
+    if addr.startswith('::ffff:') and '.' in addr:
+        return addr[len('::ffff:'):]
+    return addr
+
+def _resolve_host(hostname):
+    """
+    socket.getaddrinfo() with results (including failures) cached for
+    HOSTNAME_TTL seconds.
+    @return: normalized IPv4 and IPv6 addresses of hostname, empty if
+      it cannot be resolved
+    @rtype: [str]
+    """
+    now = _monotonic()
+    entry = _host_cache.get(hostname)
+    if entry is not None and entry[0] > now:
+        return entry[1]
+    try:
+        addrs = []
+        for info in socket.getaddrinfo(hostname, None):
+            addr = _normalize_address(info[4][0])
+            if addr not in addrs:
+                addrs.append(addr)
+    except (socket.error, UnicodeError):
+        addrs = []
+    if len(_host_cache) >= HOSTNAME_CACHE_SIZE:
+        for k, v in list(_host_cache.items()):
+            if v[0] <= now:
+                _host_cache.pop(k, None)
+        if len(_host_cache) >= HOSTNAME_CACHE_SIZE:
+            _host_cache.clear()
+    _host_cache[hostname] = (now + HOSTNAME_TTL, addrs)
+    return addrs
+
+def _is_loopback(addr):
+    # 127. check is due to #1260
+    return addr.startswith('127.') or addr == '::1'
+
 def is_local_address(hostname):
     """
     @param hostname: host name/address
     @type  hostname: str
     @return True: if hostname maps to a local address, False otherwise. False conditions include invalid hostnames.
     """
-    try:
-        reverse_ip = socket.gethostbyname(hostname)
-    except socket.error:
-        return False
-    # 127. check is due to #1260
-    if reverse_ip not in get_local_addresses() and not reverse_ip.startswith('127.'):
+    if ':' in hostname:
+        # IPv6 literal
+        addrs = [_normalize_address(hostname)]
+    else:
+        addrs = _resolve_host(hostname)
+    if not addrs:
         return False
-    return True
+    local_addrs = set([_normalize_address(a) for a in get_local_addresses(ipv6=True)])
+    for addr in addrs:
+        if addr in local_addrs or _is_loopback(addr):
+            return True
+    return False
     
 def get_local_address():
     """
@@ -146,72 +229,146 @@ def get_local_address():
     else: # loopback 
         return '127.0.0.1'
 
-# cache for performance reasons
-_local_addrs = None
-def get_local_addresses():
+_PROC_FIB_TRIE = '/proc/net/fib_trie'
+_PROC_IF_INET6 = '/proc/net/if_inet6'
+
+def _read_proc_addresses(fib_trie=_PROC_FIB_TRIE, if_inet6=_PROC_IF_INET6):
     """
-    @return: known local addresses. Not affected by ROS_IP/ROS_HOSTNAME
-    @rtype:  [str]
+    Read local interface addresses from procfs (Linux).
+    @return: IPv4 addresses, IPv6 addresses. IPv6 addresses are None
+      if if_inet6 is not available (no IPv6 support).
+    @rtype: [str], [str]
+    @raise IOError: if fib_trie cannot be read
     """
-    # cache address data as it can be slow to calculate
-    global _local_addrs
-    if _local_addrs is not None:
-        return _local_addrs
+    ipv4 = []
+    with open(fib_trie) as f:
+        last = None
+        for line in f:
+            line = line.strip()
+            if line.startswith('|-- '):
+                last = line[4:]
+            elif line == '/32 host LOCAL' and last not in ipv4:
+                # same address is listed in both the Main and Local tables
+                ipv4.append(last)
+    ipv6 = None
+    try:
+        with open(if_inet6) as f:
+            ipv6 = []
+            for line in f:
+                fields = line.split()
+                if fields:
+                    ipv6.append(socket.inet_ntop(socket.AF_INET6, binascii.unhexlify(fields[0])))
+    except IOError:
+        pass
+    return ipv4, ipv6
+
+def _read_ioctl_addresses():
+    """
+    Read local IPv4 interface addresses with the SIOCGIFCONF ioctl.
+    @rtype: [str]
+    """
+    # unix-only branch
+    # adapted from code from Rosen Diankov (rdiankov@cs.cmu.edu)
+    # and from ActiveState recipe
+
+    import fcntl
+    import array
 
-    local_addrs = None
+    ifsize = 32
+    if platform.system() == 'Linux' and platform.architecture()[0] == '64bit':
+        ifsize = 40 # untested
+
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    try:
+        # grow the buffer until the kernel no longer fills it, so
+        # that there is no fixed limit on the number of interfaces
+        max_bytes = 32 * ifsize
+        while True:
+            buff = array.array('B', b'\0' * max_bytes)
+            # serialize the buffer length and address to ioctl
+            info = fcntl.ioctl(sock.fileno(), SIOCGIFCONF,
+                               struct.pack('iL', max_bytes, buff.buffer_info()[0]))
+            retbytes = struct.unpack('iL', info)[0]
+            if retbytes < max_bytes:
+                break
+            max_bytes *= 2
+    finally:
+        sock.close()
+    buffstr = bytearray(buff)
+    if platform.system() == 'Linux':
+        return [socket.inet_ntoa(bytes(buffstr[i+20:i+24])) for i in range(0, retbytes, ifsize)]
+    else:
+        # in FreeBSD, ifsize is variable: 16 + (16 or 28 or 56) bytes
+        # When ifsize is 32 bytes, it contains the interface name and address,
+        # else it contains the interface name and other information
+        # This means the buffer must be traversed in its entirety
+        local_addrs = []
+        bufpos = 0
+        while bufpos < retbytes:
+            bufpos += 16
+            ifreqsize = buffstr[bufpos]
+            if ifreqsize == 16:
+                local_addrs += [socket.inet_ntoa(bytes(buffstr[bufpos+4:bufpos+8]))]
+            bufpos += ifreqsize
+        return local_addrs
+
+def _read_local_addresses():
+    """
+    @return: IPv4 addresses, IPv6 addresses (None if unknown)
+    @rtype: [str], [str]
+    """
     if _use_netifaces:
         # #552: netifaces is a more robust package for looking up
         # #addresses on multiple platforms (OS X, Unix, Windows)
-        local_addrs = []
+        ipv4 = []
+        ipv6 = []
         # see http://alastairs-place.net/netifaces/
         for i in netifaces.interfaces():
-            try:
-                local_addrs.extend([d['addr'] for d in netifaces.ifaddresses(i)[netifaces.AF_INET]])
-            except KeyError: pass
-    elif _is_unix_like_platform():
-        # unix-only branch
-        # adapted from code from Rosen Diankov (rdiankov@cs.cmu.edu)
-        # and from ActiveState recipe
-
-        import fcntl
-        import array
-
-        ifsize = 32
-        if platform.system() == 'Linux' and platform.architecture()[0] == '64bit':
-            ifsize = 40 # untested
+            addrs = netifaces.ifaddresses(i)
+            ipv4.extend([d['addr'] for d in addrs.get(netifaces.AF_INET, [])])
+            ipv6.extend([d['addr'] for d in addrs.get(netifaces.AF_INET6, [])])
+        return ipv4, ipv6
+    if platform.system() == 'Linux' and os.path.exists(_PROC_FIB_TRIE):
+        try:
+            return _read_proc_addresses()
+        except IOError:
+            pass
+    if _is_unix_like_platform():
+        return _read_ioctl_addresses(), None
+    # cross-platform branch, can only resolve one address
+    return [socket.gethostbyname(socket.gethostname())], None
 
-        # 32 interfaces allowed, far more than ROS can sanely deal with
+# cache for performance reasons: (expiry, IPv4 addresses, IPv6 addresses)
+_local_addrs = None
+def get_local_addresses(ipv6=False):
+    """
+    Local addresses are read again once they are older than
+    LOCAL_ADDRESS_TTL seconds, or after clear_local_address_cache().
 
-        max_bytes = 32 * ifsize
-        # according to http://docs.python.org/library/fcntl.html, the buffer limit is 1024 bytes
-        buff = array.array('B', '\0' * max_bytes)
-        # serialize the buffer length and address to ioctl
-        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)        
-        info = fcntl.ioctl(sock.fileno(), SIOCGIFCONF,
-                           struct.pack('iL', max_bytes, buff.buffer_info()[0]))
-        retbytes = struct.unpack('iL', info)[0]
-        buffstr = buff.tostring()
-        if platform.system() == 'Linux':
-            local_addrs = [socket.inet_ntoa(buffstr[i+20:i+24]) for i in range(0, retbytes, ifsize)]
-        else:
-            # in FreeBSD, ifsize is variable: 16 + (16 or 28 or 56) bytes
-            # When ifsize is 32 bytes, it contains the interface name and address,
-            # else it contains the interface name and other information
-            # This means the buffer must be traversed in its entirety
-            local_addrs = []
-            bufpos = 0
-            while bufpos < retbytes:
-                bufpos += 16
-                ifreqsize = ord(buffstr[bufpos])
-                if ifreqsize == 16:
-                    local_addrs += [socket.inet_ntoa(buffstr[bufpos+4:bufpos+8])]
-                bufpos += ifreqsize
-    else:
-        # cross-platform branch, can only resolve one address
-        local_addrs = [socket.gethostbyname(socket.gethostname())]
-    _local_addrs = local_addrs
-    return local_addrs
+    @param ipv6: if True, include IPv6 addresses
+    @type  ipv6: bool
+    @return: known local addresses. Not affected by ROS_IP/ROS_HOSTNAME
+    @rtype:  [str]
+    """
+    # cache address data as it can be slow to calculate
+    global _local_addrs
+    cache = _local_addrs
+    now = _monotonic()
+    if cache is None or cache[0] <= now:
+        ipv4_addrs, ipv6_addrs = _read_local_addresses()
+        cache = _local_addrs = (now + LOCAL_ADDRESS_TTL, ipv4_addrs, ipv6_addrs or [])
+    if ipv6:
+        return cache[1] + cache[2]
+    return cache[1]
 
+def clear_local_address_cache():
+    """
+    Forget cached local addresses and hostname resolutions, e.g. after
+    a network interface has changed.
+    """
+    global _local_addrs
+    _local_addrs = None
+    _host_cache.clear()
 
 def get_bind_address(address=None):
     """
@@ -268,12 +425,22 @@ def create_local_xmlrpc_uri(port):
 
 ## handshake utils ###########################################
 
+# asyncio stream variants of read_ros_handshake_header() and
+# write_ros_handshake_header() live in roslib.aio (Python 3 only).
+
 class ROSHandshakeException(Exception):
     """
     Exception to represent errors decoding handshake
     """
     pass
 
+_struct_I = struct.Struct('<I')
+
+## default limit on the size of a handshake header read by HandshakeReader
+MAX_HANDSHAKE_HEADER_SIZE = 16 * 1024 * 1024
+
+_RETRY_ERRNOS = (errno.EAGAIN, errno.EWOULDBLOCK, errno.EINTR)
+
 def decode_ros_handshake_header(header_str):
     """
     Decode serialized ROS handshake header into a Python dictionary
@@ -281,38 +448,47 @@ def decode_ros_handshake_header(header_str):
     header is a list of string key=value pairs, each prefixed by a
     4-byte length field. It is preceeded by a 4-byte length field for
     the entire header.
+
+    Length fields are read in place with struct.unpack_from. Each
+    line is copied out of header_str once (on Python 3 it is decoded
+    straight from a memoryview) and then split into key and value with
+    str.partition, which copies both a second time. Copying key and
+    value straight out of the buffer avoids that, but costs more per
+    field than it saves on typical headers; see benchmark_network.py.
     
     @param header_str: encoded header string. May contain extra data at the end.
-    @type  header_str: str
+    @type  header_str: str/bytes/bytearray
     @return: key value pairs encoded in \a header_str
     @rtype: {str: str} 
     """
-    (size, ) = struct.unpack('<I', header_str[0:4])
+    unpack_from = _struct_I.unpack_from
+    (size, ) = unpack_from(header_str, 0)
     size += 4 # add in 4 to include size of size field
     header_len = len(header_str)
     if size > header_len:
         raise ROSHandshakeException("Incomplete header. Expected %s bytes but only have %s"%((size+4), header_len))
 
+    #python3 compatibility
+    if python3 == 1:
+        view = memoryview(header_str)
+    elif isinstance(header_str, bytearray):
+        header_str = bytes(header_str[:size])
     d = {}
     start = 4
     while start < size:
-        (field_size, ) = struct.unpack('<I', header_str[start:start+4])
+        (field_size, ) = unpack_from(header_str, start)
         if field_size == 0:
             raise ROSHandshakeException("Invalid 0-length handshake header field")
         start += field_size + 4
         if start > size:
             raise ROSHandshakeException("Invalid line length in handshake header: %s"%size)
-        line = header_str[start-field_size:start]
-        
-        #python3 compatibility
         if python3 == 1:
-            line = line.decode()
-        
-        idx = line.find("=")
-        if idx < 0:
+            line = str(view[start-field_size:start], 'utf-8')
+        else:
+            line = header_str[start-field_size:start]
+        key, sep, value = line.partition('=')
+        if not sep:
             raise ROSHandshakeException("Invalid line in handshake header: [%s]"%line)
-        key = line[:idx]
-        value = line[idx+1:]
         d[key.strip()] = value
     return d
     
@@ -330,6 +506,7 @@ def read_ros_handshake_header(sock, b, buff_size):
     @rtype: {str: str}
     @raise ROSHandshakeException: If header format does not match expected
     """
+    # see HandshakeReader for a variant that does not copy the buffer on every recv
     header_str = None
     while not header_str:
         d = sock.recv(buff_size)
@@ -355,6 +532,264 @@ def read_ros_handshake_header(sock, b, buff_size):
     # process the header
     return decode_ros_handshake_header(bval)
 
+class HandshakeReader(object):
+    """
+    Reads tcpros handshake headers off a socket with recv_into into a
+    single, growable bytearray. Unlike read_ros_handshake_header(), the
+    received data is not copied while waiting for the rest of the
+    header, and bytes received past the end of the header are handed
+    back as a memoryview instead of being rewritten into a buffer.
+    """
+
+    def __init__(self, sock, buff_size=65536, max_size=MAX_HANDSHAKE_HEADER_SIZE):
+        """
+        @param sock: socket must be in blocking mode
+        @type  sock: socket
+        @param buff_size: incoming buffer size to use. The buffer grows
+          by at most this much per recv.
+        @type  buff_size: int
+        @param max_size: largest header size to accept, in bytes. Larger
+          length prefixes are rejected before anything is allocated for them.
+        @type  max_size: int
+        """
+        self.sock = sock
+        self.buff_size = buff_size
+        self.max_size = max_size
+        self._buff = bytearray(buff_size)
+        self._len = 0
+
+    def _recv(self, size):
+        """
+        recv_into the free space of the buffer, growing it first so
+        that there is room for at least size bytes.
+        """
+        if self._len + size > len(self._buff):
+            # allocate rather than resize: a bytearray cannot be
+            # resized while leftovers from a previous read are exported
+            buff = bytearray(max(self._len + size, 2 * len(self._buff)))
+            buff[:self._len] = memoryview(self._buff)[:self._len]
+            self._buff = buff
+        n = self.sock.recv_into(memoryview(self._buff)[self._len:])
+        if not n:
+            raise ROSHandshakeException("connection from sender terminated before handshake header received. %s bytes were received. Please check sender for additional details."%self._len)
+        self._len += n
+
+    def read_header(self):
+        """
+        Read in the next tcpros header off the socket.
+
+        @return: key value pairs encoded in handshake and the bytes
+          received after the header. The leftovers are a view into the
+          reader's buffer and are only valid until the next call to
+          read_header().
+        @rtype: ({str: str}, memoryview)
+        @raise ROSHandshakeException: If header format does not match expected
+        """
+        self._len = 0
+        while self._len < 4:
+            self._recv(4 - self._len)
+        (size, ) = _struct_I.unpack_from(self._buff, 0)
+        if size > self.max_size:
+            raise ROSHandshakeException("handshake header of %s bytes exceeds limit of %s bytes"%(size, self.max_size))
+        size += 4
+        while self._len < size:
+            # only grow as data arrives, not by what the peer claims
+            self._recv(min(size - self._len, self.buff_size))
+        header = decode_ros_handshake_header(self._buff)
+        return header, memoryview(self._buff)[size:self._len]
+
+class _PendingHandshake(object):
+    """
+    Partially received handshake header of a HandshakeAcceptor connection.
+    """
+    __slots__ = ['sock', 'addr', 'deadline', 'buff', 'len', 'size']
+
+    def __init__(self, sock, addr, deadline, buff_size):
+        self.sock = sock
+        self.addr = addr
+        self.deadline = deadline
+        self.buff = bytearray(buff_size)
+        self.len = 0
+        # total header size including length prefix, once known
+        self.size = None
+
+class HandshakeAcceptor(object):
+    """
+    Accepts connections on a listening socket and reads their
+    handshake headers on a single thread, multiplexing partially
+    received headers with the selectors module. Connections whose
+    header exceeds max_size or that do not complete their header
+    within timeout seconds are closed. Completed connections are put
+    on queue as (sock, header, leftovers) tuples, with sock switched
+    back to blocking mode and leftovers a memoryview of the bytes
+    received after the header. Requires Python 3.4+.
+    """
+
+    def __init__(self, server_sock, queue=None, max_size=MAX_HANDSHAKE_HEADER_SIZE,
+                 timeout=10.0, buff_size=65536):
+        """
+        @param server_sock: bound, listening socket
+        @type  server_sock: socket.socket
+        @param queue: queue to hand completed connections to. A new
+          queue.Queue is created if None.
+        @type  queue: queue.Queue
+        @param max_size: largest header size to accept, in bytes
+        @type  max_size: int
+        @param timeout: seconds a connection has to send its full header
+        @type  timeout: float
+        @param buff_size: incoming buffer size to use per connection
+        @type  buff_size: int
+        @raise ImportError: if the selectors module is not available
+        """
+        if selectors is None:
+            raise ImportError("HandshakeAcceptor requires the selectors module (Python 3.4+)")
+        self.server_sock = server_sock
+        self.queue = queue if queue is not None else Queue()
+        self.max_size = max_size
+        self.timeout = timeout
+        self.buff_size = buff_size
+        self._pending = {}
+        self._deadlines = []
+        self._selector = selectors.DefaultSelector()
+        self._wakeup_r, self._wakeup_w = socket.socketpair()
+        self._wakeup_r.setblocking(False)
+        self._shutdown = False
+        server_sock.setblocking(False)
+        self._selector.register(server_sock, selectors.EVENT_READ)
+        self._selector.register(self._wakeup_r, selectors.EVENT_READ)
+
+    def pending_count(self):
+        """
+        @return: number of connections whose header is not complete yet
+        @rtype: int
+        """
+        return len(self._pending)
+
+    def handle_error(self, sock, addr, error):
+        """
+        Called before a connection is closed because its handshake
+        failed. Does nothing by default.
+
+        @param error: ROSHandshakeException or socket.error
+        """
+        pass
+
+    def poll(self, timeout=None):
+        """
+        Wait up to timeout seconds for activity and process it:
+        accept new connections, read available header data and expire
+        connections past their deadline.
+
+        @param timeout: seconds to wait, or None to wait until there
+          is activity or a connection expires
+        @type  timeout: float
+        """
+        now = _monotonic()
+        if self._deadlines:
+            wait = max(0.0, self._deadlines[0][0] - now)
+            if timeout is None or wait < timeout:
+                timeout = wait
+        for key, _ in self._selector.select(timeout):
+            if key.fileobj is self.server_sock:
+                self._accept()
+            elif key.fileobj is self._wakeup_r:
+                try:
+                    self._wakeup_r.recv(4096)
+                except socket.error:
+                    pass
+            else:
+                self._read(key.data)
+        self._expire(_monotonic())
+
+    def serve_forever(self):
+        """
+        Run poll() until shutdown() is called.
+        """
+        while not self._shutdown:
+            self.poll()
+
+    def shutdown(self):
+        """
+        Stop serve_forever(). May be called from any thread.
+        """
+        self._shutdown = True
+        try:
+            self._wakeup_w.send(b'\0')
+        except socket.error:
+            pass
+
+    def close(self):
+        """
+        Close all connections that have not completed their handshake
+        and release the selector. The server socket is not closed.
+        """
+        for pending in list(self._pending.values()):
+            self._drop(pending)
+        self._deadlines = []
+        self._selector.close()
+        self._wakeup_r.close()
+        self._wakeup_w.close()
+
+    def _accept(self):
+        deadline = _monotonic() + self.timeout
+        while True:
+            try:
+                sock, addr = self.server_sock.accept()
+            except socket.error:
+                # EAGAIN: no more pending connections
+                return
+            sock.setblocking(False)
+            pending = _PendingHandshake(sock, addr, deadline, min(self.buff_size, 4096))
+            self._pending[sock] = pending
+            heapq.heappush(self._deadlines, (deadline, id(pending), pending))
+            self._selector.register(sock, selectors.EVENT_READ, pending)
+
+    def _read(self, pending):
+        try:
+            # grow the buffer by at most buff_size, as data arrives
+            if pending.len == len(pending.buff):
+                buff = bytearray(len(pending.buff) + min(len(pending.buff), self.buff_size))
+                buff[:pending.len] = pending.buff[:pending.len]
+                pending.buff = buff
+            n = pending.sock.recv_into(memoryview(pending.buff)[pending.len:])
+            if not n:
+                raise ROSHandshakeException("connection from sender terminated before handshake header received. %s bytes were received. Please check sender for additional details."%pending.len)
+            pending.len += n
+            if pending.size is None and pending.len >= 4:
+                (size, ) = _struct_I.unpack_from(pending.buff, 0)
+                if size > self.max_size:
+                    raise ROSHandshakeException("handshake header of %s bytes exceeds limit of %s bytes"%(size, self.max_size))
+                pending.size = size + 4
+            if pending.size is None or pending.len < pending.size:
+                return
+            header = decode_ros_handshake_header(pending.buff)
+        except (ROSHandshakeException, socket.error, struct.error, ValueError) as e:
+            # struct.error: field length prefix cut off by the header
+            # size, ValueError: invalid UTF-8 (UnicodeDecodeError)
+            if isinstance(e, socket.error) and e.args and e.args[0] in _RETRY_ERRNOS:
+                return
+            self.handle_error(pending.sock, pending.addr, e)
+            self._drop(pending)
+            return
+        self._selector.unregister(pending.sock)
+        del self._pending[pending.sock]
+        pending.sock.setblocking(True)
+        self.queue.put((pending.sock, header, memoryview(pending.buff)[pending.size:pending.len]))
+
+    def _expire(self, now):
+        deadlines = self._deadlines
+        while deadlines and deadlines[0][0] <= now:
+            _, _, pending = heapq.heappop(deadlines)
+            if self._pending.get(pending.sock) is pending:
+                self.handle_error(pending.sock, pending.addr, ROSHandshakeException(
+                    "handshake header not received within %s seconds"%self.timeout))
+                self._drop(pending)
+
+    def _drop(self, pending):
+        if self._pending.pop(pending.sock, None) is not None:
+            self._selector.unregister(pending.sock)
+        pending.sock.close()
+
 def encode_ros_handshake_header(header):
     """
     Encode ROS handshake header as a byte string. Each header
@@ -395,3 +830,87 @@ def write_ros_handshake_header(sock, header):
     sock.sendall(s)
     return len(s) #STATS
     
+
+def _encode_fields(header):
+    """
+    Encode header fields as [4-byte field length + field=value]*,
+    without the leading length of the whole header.
+    """
+    if python3 == 0:
+        fields = ["%s=%s"%(k,v) for k,v in header.items()]
+    else:
+        fields = [("%s=%s"%(k,v)).encode("utf-8") for k,v in header.items()]
+    pack = _struct_I.pack
+    return b''.join([pack(len(f)) + f for f in fields])
+
+class HandshakeTemplate(object):
+    """
+    Handshake header with fields that are the same for every
+    connection (e.g. a publisher's type, md5sum and message
+    definition) encoded once. Per-connection fields are encoded on
+    each call and sent along with the pre-encoded fields in a single
+    sendmsg or sendall call.
+    """
+
+    def __init__(self, header):
+        """
+        @param header: static header field keys/values
+        @type  header: {str : str}
+        """
+        self.header = dict(header)
+        self._static = _encode_fields(self.header)
+        self._static_len = len(self._static)
+        self._prefix = _struct_I.pack(self._static_len)
+        self._keys = frozenset(self.header)
+
+    def parts(self, fields=None):
+        """
+        @param fields: per-connection header field keys/values
+        @type  fields: {str : str}
+        @return: buffers that make up the encoded header, in order
+        @rtype: [str]
+        """
+        if not fields:
+            return [self._prefix, self._static]
+        if not self._keys.isdisjoint(fields):
+            # overriding a static field: encode from scratch so
+            # that the field is not sent twice
+            merged = dict(self.header)
+            merged.update(fields)
+            return [encode_ros_handshake_header(merged)]
+        dynamic = _encode_fields(fields)
+        return [_struct_I.pack(self._static_len + len(dynamic)), self._static, dynamic]
+
+    def encode(self, fields=None):
+        """
+        @param fields: per-connection header field keys/values
+        @type  fields: {str : str}
+        @return: header encoded as byte string, as
+          encode_ros_handshake_header() would for the combined fields
+        @rtype: str
+        """
+        return b''.join(self.parts(fields))
+
+    def write(self, sock, fields=None):
+        """
+        Write the header to socket sock with a single vectored
+        sendmsg where the socket supports it, else a single sendall.
+
+        @param sock: socket to write to (must be in blocking mode)
+        @type  sock: socket.socket
+        @param fields: per-connection header field keys/values
+        @type  fields: {str : str}
+        @return: Number of bytes sent (for statistics)
+        @rtype: int
+        """
+        parts = self.parts(fields)
+        size = sum([len(p) for p in parts])
+        sendmsg = getattr(sock, 'sendmsg', None)
+        if sendmsg is None or len(parts) == 1:
+            sock.sendall(b''.join(parts))
+            return size
+        sent = sendmsg(parts)
+        if sent < size:
+            # short write, send the remainder the usual way
+            sock.sendall(b''.join(parts)[sent:])
+        return size
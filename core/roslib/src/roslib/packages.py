@@ -43,13 +43,16 @@ import os
 import sys
 import stat
 import string
+import threading
 
-from subprocess import Popen, PIPE
+from subprocess import PIPE
 
 from catkin.find_in_workspaces import find_in_workspaces as catkin_find
 import rospkg
 
+import roslib.instrument
 import roslib.manifest
+import roslib.snapshot
 
 SRC_DIR = 'src'
 
@@ -106,7 +109,11 @@ def get_dir_pkg(d):
     return None, None
 
 _pkg_dir_cache = {}
+# guards filling and clearing _pkg_dir_cache. Lookups read the dict
+# without it: entries are only added in one update() call.
+_pkg_dir_cache_lock = threading.Lock()
 
+@roslib.instrument.timed('packages.get_pkg_dir')
 def get_pkg_dir(package, required=True, ros_root=None, ros_package_path=None):
     """
     Locate directory package is stored in. This routine uses an
@@ -132,57 +139,16 @@ def get_pkg_dir(package, required=True, ros_root=None, ros_package_path=None):
     #UNIXONLY
     #TODO: replace with non-rospack-based solution (e.g. os.walk())
     try:
-        penv = os.environ.copy()
-        if ros_root:
-            ros_root = rospkg.environment._resolve_path(ros_root)
-            penv[ROS_ROOT] = ros_root
-        elif ROS_ROOT in os.environ:
-            # record setting for _pkg_dir_cache
-            ros_root = os.environ[ROS_ROOT]
+        penv, ros_root, ros_package_path = _pkg_dir_env(ros_root, ros_package_path)
+        pkg_dir = _cached_pkg_dir(package, ros_root, ros_package_path)
+        if pkg_dir is not None:
+            return pkg_dir
 
         # determine rospack exe name
         rospack = 'rospack'
-
-        if ros_package_path is not None:
-            ros_package_path = rospkg.environment._resolve_paths(ros_package_path)
-            penv[ROS_PACKAGE_PATH] = ros_package_path
-        elif ROS_PACKAGE_PATH in os.environ:
-            # record setting for _pkg_dir_cache
-            ros_package_path = os.environ[ROS_PACKAGE_PATH]
-
-        # update cache if we haven't. NOTE: we only get one cache
-        if not _pkg_dir_cache:
-            _read_rospack_cache(_pkg_dir_cache, ros_root, ros_package_path)
-            
-        # now that we've resolved the args, check the cache
-        if package in _pkg_dir_cache:
-            dir_, rr, rpp = _pkg_dir_cache[package]
-            if rr == ros_root and rpp == ros_package_path:
-                if os.path.isfile(os.path.join(dir_, MANIFEST_FILE)):
-                    return dir_
-                else:
-                    # invalidate cache
-                    _invalidate_cache(_pkg_dir_cache)
-            
-        rpout, rperr = Popen([rospack, 'find', package], \
+        rpout, rperr = roslib.instrument.Popen([rospack, 'find', package], \
                                  stdout=PIPE, stderr=PIPE, env=penv).communicate()
-
-        pkg_dir = (rpout or '').strip()
-        #python3.1 popen returns as bytes
-        if (isinstance(pkg_dir, bytes)):
-            pkg_dir = pkg_dir.decode()
-        if not pkg_dir:
-            raise InvalidROSPkgException("Cannot locate installation of package %s: %s. ROS_ROOT[%s] ROS_PACKAGE_PATH[%s]"%(package, rperr.strip(), ros_root, ros_package_path))
-
-        pkg_dir = os.path.normpath(pkg_dir)
-        if not os.path.exists(pkg_dir):
-            raise InvalidROSPkgException("Cannot locate installation of package %s: [%s] is not a valid path. ROS_ROOT[%s] ROS_PACKAGE_PATH[%s]"%(package, pkg_dir, ros_root, ros_package_path))
-        elif not os.path.isdir(pkg_dir):
-            raise InvalidROSPkgException("Package %s is invalid: file [%s] is in the way"%(package, pkg_dir))
-        # don't update cache: this should only be updated from
-        # rospack_cache as it will corrupt package list otherwise.
-        #_pkg_dir_cache[package] = (pkg_dir, ros_root, ros_package_path)
-        return pkg_dir
+        return _rospack_find_result(package, rpout, rperr, ros_root, ros_package_path)
     except OSError as e:
         if required:
             raise InvalidROSPkgException("Environment configuration is invalid: cannot locate rospack (%s)"%e)
@@ -192,6 +158,134 @@ def get_pkg_dir(package, required=True, ros_root=None, ros_package_path=None):
             raise
         return None
 
+def _pkg_dir_env(ros_root, ros_package_path):
+    """
+    Resolve the ROS_ROOT and ROS_PACKAGE_PATH overrides of L{get_pkg_dir()}.
+    @return: environment for rospack, ROS_ROOT and ROS_PACKAGE_PATH
+      to record in and compare with _pkg_dir_cache
+    @rtype: ({str: str}, str, str)
+    """
+    penv = os.environ.copy()
+    if ros_root:
+        ros_root = rospkg.environment._resolve_path(ros_root)
+        penv[ROS_ROOT] = ros_root
+    elif ROS_ROOT in os.environ:
+        # record setting for _pkg_dir_cache
+        ros_root = os.environ[ROS_ROOT]
+
+    if ros_package_path is not None:
+        ros_package_path = rospkg.environment._resolve_paths(ros_package_path)
+        penv[ROS_PACKAGE_PATH] = ros_package_path
+    elif ROS_PACKAGE_PATH in os.environ:
+        # record setting for _pkg_dir_cache
+        ros_package_path = os.environ[ROS_PACKAGE_PATH]
+    return penv, ros_root, ros_package_path
+
+def _cached_pkg_dir(package, ros_root, ros_package_path):
+    """
+    Look package up in the active snapshot and in _pkg_dir_cache,
+    filling the latter if needed.
+    @return: directory of package, or None if rospack must be asked
+    @rtype: str
+    """
+    snapshot = roslib.snapshot.get_snapshot(ros_root, ros_package_path)
+    if snapshot is not None:
+        pkg_dir = snapshot.get_package_path(package)
+        if pkg_dir is not None:
+            roslib.instrument.cache_access('packages.pkg_dir', True)
+            return pkg_dir
+
+    # update cache if we haven't. NOTE: we only get one cache
+    if not _pkg_dir_cache:
+        _fill_pkg_dir_cache(ros_root, ros_package_path)
+
+    # now that we've resolved the args, check the cache
+    entry = _pkg_dir_cache.get(package)
+    if entry is not None:
+        dir_, rr, rpp = entry
+        if rr == ros_root and rpp == ros_package_path:
+            if os.path.isfile(os.path.join(dir_, MANIFEST_FILE)):
+                roslib.instrument.cache_access('packages.pkg_dir', True)
+                return dir_
+            else:
+                # invalidate cache
+                _invalidate_cache(_pkg_dir_cache)
+    roslib.instrument.cache_access('packages.pkg_dir', False)
+    return None
+
+def _rospack_find_result(package, rpout, rperr, ros_root, ros_package_path):
+    """
+    @param rpout: standard output of 'rospack find package'
+    @param rperr: standard error of 'rospack find package'
+    @return: validated package directory
+    @rtype: str
+    @raise InvalidROSPkgException: if rospack did not find a valid directory
+    """
+    pkg_dir = (rpout or '').strip()
+    #python3.1 popen returns as bytes
+    if (isinstance(pkg_dir, bytes)):
+        pkg_dir = pkg_dir.decode()
+    if not pkg_dir:
+        raise InvalidROSPkgException("Cannot locate installation of package %s: %s. ROS_ROOT[%s] ROS_PACKAGE_PATH[%s]"%(package, rperr.strip(), ros_root, ros_package_path))
+
+    pkg_dir = os.path.normpath(pkg_dir)
+    if not os.path.exists(pkg_dir):
+        raise InvalidROSPkgException("Cannot locate installation of package %s: [%s] is not a valid path. ROS_ROOT[%s] ROS_PACKAGE_PATH[%s]"%(package, pkg_dir, ros_root, ros_package_path))
+    elif not os.path.isdir(pkg_dir):
+        raise InvalidROSPkgException("Package %s is invalid: file [%s] is in the way"%(package, pkg_dir))
+    # don't update cache: this should only be updated from
+    # rospack_cache as it will corrupt package list otherwise.
+    #_pkg_dir_cache[package] = (pkg_dir, ros_root, ros_package_path)
+    return pkg_dir
+
+@roslib.instrument.timed('packages.get_pkg_dirs')
+def get_pkg_dirs(packages, required=True):
+    """
+    Batch version of L{get_pkg_dir()}. Packages that are not in the
+    internal cache are located with a single crawl of the package
+    path instead of one rospack process per package.
+
+    @param packages: package names
+    @type  packages: [str]
+    @param required: if True, an exception will be raised if a
+    package directory cannot be located.
+    @type  required: bool
+    @return: directory of each package, None for packages that cannot
+    be found if required is False
+    @rtype: [str]
+    @raise InvalidROSPkgException: if required is True and a package cannot be located
+    """
+    ros_root = os.environ.get(ROS_ROOT)
+    ros_package_path = os.environ.get(ROS_PACKAGE_PATH)
+    if not _pkg_dir_cache:
+        _fill_pkg_dir_cache(ros_root, ros_package_path)
+    dirs = []
+    rospack = None
+    snapshot = roslib.snapshot.get_snapshot(ros_root, ros_package_path)
+    for package in packages:
+        if snapshot is not None:
+            pkg_dir = snapshot.get_package_path(package)
+            if pkg_dir is not None:
+                roslib.instrument.cache_access('packages.pkg_dir', True)
+                dirs.append(pkg_dir)
+                continue
+        entry = _pkg_dir_cache.get(package)
+        if entry is not None and entry[1:] == (ros_root, ros_package_path) and \
+                os.path.isfile(os.path.join(entry[0], MANIFEST_FILE)):
+            roslib.instrument.cache_access('packages.pkg_dir', True)
+            dirs.append(entry[0])
+            continue
+        roslib.instrument.cache_access('packages.pkg_dir', False)
+        if rospack is None:
+            rospack = rospkg.RosPack()
+        try:
+            dirs.append(rospack.get_path(package))
+        except rospkg.ResourceNotFound:
+            if required:
+                raise InvalidROSPkgException("Cannot locate installation of package %s. ROS_ROOT[%s] ROS_PACKAGE_PATH[%s]"%(package, ros_root, ros_package_path))
+            dirs.append(None)
+    return dirs
+
 def _get_pkg_subdir_by_dir(package_dir, subdir, required=True, env=None):
     """
     @param required: if True, will attempt to  create the subdirectory
@@ -280,17 +374,32 @@ def _update_rospack_cache(env=None):
     """
     if env is None:
         env = os.environ
-    cache = _pkg_dir_cache
-    if cache:
+    if _pkg_dir_cache:
         return True
     ros_root = env[ROS_ROOT]
     ros_package_path = env.get(ROS_PACKAGE_PATH, '')
-    return _read_rospack_cache(cache, ros_root, ros_package_path)
+    return _fill_pkg_dir_cache(ros_root, ros_package_path)
+
+def _fill_pkg_dir_cache(ros_root, ros_package_path):
+    """
+    Fill the empty _pkg_dir_cache from the rospack cache file. Threads
+    that find the cache empty at the same time read the file once.
+    @return: True if cache is valid
+    @rtype: bool
+    """
+    with _pkg_dir_cache_lock:
+        if _pkg_dir_cache:
+            return True
+        cache = {}
+        valid = _read_rospack_cache(cache, ros_root, ros_package_path)
+        _pkg_dir_cache.update(cache)
+        return valid
 
 def _invalidate_cache(cache):
     # I've only made this a separate routine because roslib.packages should really be using
     # the roslib.stacks cache implementation instead with the separate cache marker
-    cache.clear()
+    with _pkg_dir_cache_lock:
+        cache.clear()
 
 def _read_rospack_cache(cache, ros_root, ros_package_path):
     """
@@ -330,6 +439,7 @@ def _read_rospack_cache(cache, ros_root, ros_package_path):
     except:
         pass
     
+@roslib.instrument.timed('packages.list_pkgs_by_path')
 def list_pkgs_by_path(path, packages=None, cache=None, env=None):
     """
     List ROS packages within the specified path.
@@ -384,6 +494,7 @@ def list_pkgs_by_path(path, packages=None, cache=None, env=None):
             
     return packages
 
+@roslib.instrument.timed('packages.find_node')
 def find_node(pkg, node_type, rospack=None):
     """
     Warning: unstable API due to catkin.
@@ -457,6 +568,7 @@ def _find_resource(d, resource_name, filter_fn=None):
 # TODO: this routine really belongs in rospkg, but the catkin-isms really, really don't
 # belong in rospkg.  With more thought, they can probably be abstracted out so as
 # to no longer be catkin-specific. 
+@roslib.instrument.timed('packages.find_resource')
 def find_resource(pkg, resource_name, filter_fn=None, rospack=None):
     """
     Warning: unstable API due to catkin.
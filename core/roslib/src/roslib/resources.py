@@ -38,7 +38,17 @@ routines will likely be *deleted* in future releases.
 """
 
 import os
+import stat
 
+try:
+    from os import scandir
+except ImportError: #Python < 3.5
+    try:
+        from scandir import scandir
+    except ImportError:
+        scandir = None
+
+import roslib.instrument
 import roslib.manifest
 import roslib.names
 import roslib.packages
@@ -57,6 +67,73 @@ def _get_manifest_by_dir(package_dir):
     else:
         return None
 
+class ExtensionFilter(object):
+    """
+    Resource filter that matches files ending in ext. The listing
+    functions in this module use the type of the directory entries
+    for it instead of calling stat for each file.
+    """
+
+    def __init__(self, ext):
+        """
+        @param ext: file extension, e.g. '.msg'
+        @type  ext: str
+        """
+        self.ext = ext
+
+    def __call__(self, f):
+        return os.path.isfile(f) and f.endswith(self.ext)
+
+## directory -> (mtime, entry names, names of regular files)
+_listing_cache = {}
+
+def _list_dir(d):
+    """
+    List directory d. Listings are cached until the modification
+    time of d changes.
+    @return: names of all entries and of the entries that are
+        (links to) regular files, or None if d is not a directory
+    @rtype: ([str], [str])
+    """
+    if not d:
+        return None
+    try:
+        s = os.stat(d)
+    except OSError:
+        return None
+    if not stat.S_ISDIR(s.st_mode):
+        return None
+    entry = _listing_cache.get(d)
+    if entry is not None and entry[0] == s.st_mtime:
+        roslib.instrument.cache_access('resources.listing', True)
+        return entry[1], entry[2]
+    roslib.instrument.cache_access('resources.listing', False)
+    if scandir is not None:
+        entries = list(scandir(d))
+        names = [e.name for e in entries]
+        files = [e.name for e in entries if e.is_file()] # d_type, stat only for links
+    else:
+        names = os.listdir(d)
+        files = [n for n in names if os.path.isfile(os.path.join(d, n))]
+    # recorded mtime is from before the listing, so concurrent changes relist
+    _listing_cache[d] = s.st_mtime, names, files
+    return names, files
+
+def _list_resources(d, rfilter):
+    """
+    @return: names of the entries of directory d that match rfilter
+    @rtype: [str]
+    """
+    listing = _list_dir(d)
+    if listing is None:
+        return []
+    names, files = listing
+    if rfilter is os.path.isfile:
+        return list(files)
+    elif isinstance(rfilter, ExtensionFilter):
+        return [f for f in files if f.endswith(rfilter.ext)]
+    return [n for n in names if rfilter(os.path.join(d, n))]
+
 def list_package_resources_by_dir(package_dir, include_depends, subdir, rfilter=os.path.isfile):
     """
     List resources in a package directory within a particular
@@ -71,22 +148,18 @@ def list_package_resources_by_dir(package_dir, include_depends, subdir, rfilter=
     @type  rfilter: fn(filename)->bool
     """
     package = os.path.basename(package_dir)
-    resources = []
     dir = roslib.packages._get_pkg_subdir_by_dir(package_dir, subdir, False)
-    if os.path.isdir(dir):
-        resources = [roslib.names.resource_name(package, f, my_pkg=package) \
-                     for f in os.listdir(dir) if rfilter(os.path.join(dir, f))]
-    else:
-        resources = []
+    resources = [roslib.names.resource_name(package, f, my_pkg=package) \
+                 for f in _list_resources(dir, rfilter)]
     if include_depends:
-        depends = _get_manifest_by_dir(package_dir).depends
-        dirs = [roslib.packages.get_pkg_subdir(d.package, subdir, False) for d in depends]
-        for (dep, dir_) in zip(depends, dirs): #py3k
-            if not dir_ or not os.path.isdir(dir_):
+        depends = [d.package for d in _get_manifest_by_dir(package_dir).depends]
+        pkg_dirs = roslib.packages.get_pkg_dirs(depends, required=False)
+        for dep, pkg_dir in zip(depends, pkg_dirs): #py3k
+            if not pkg_dir:
                 continue
             resources.extend(\
-                [roslib.names.resource_name(dep.package, f, my_pkg=package) \
-                 for f in os.listdir(dir_) if rfilter(os.path.join(dir_, f))])
+                [roslib.names.resource_name(dep, f, my_pkg=package) \
+                 for f in _list_resources(os.path.join(pkg_dir, subdir), rfilter)])
     return resources
 
 def list_package_resources(package, include_depends, subdir, rfilter=os.path.isfile):
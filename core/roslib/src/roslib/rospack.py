@@ -43,6 +43,7 @@ import os
 import sys
 import subprocess
 import roslib.exceptions
+import roslib.instrument
 import rospkg
 
 if sys.hexversion > 0x03000000: #Python3
@@ -53,6 +54,7 @@ else:
 import warnings
 warnings.warn("roslib.rospack is deprecated, please use rospkg", stacklevel=2)
 
+@roslib.instrument.timed('rospack.rospackexec')
 def rospackexec(args):
     """
     @return: result of executing rospack command (via subprocess). string will be strip()ed.
@@ -61,10 +63,10 @@ def rospackexec(args):
     """
     rospack_bin = 'rospack'
     if python3:
-        val = subprocess.Popen([rospack_bin] + args, stdout=subprocess.PIPE, stderr=subprocess.PIPE).communicate()[0]
+        val = roslib.instrument.Popen([rospack_bin] + args, stdout=subprocess.PIPE, stderr=subprocess.PIPE).communicate()[0]
         val = val.decode().strip()
     else:
-        val = (subprocess.Popen([rospack_bin] + args, stdout=subprocess.PIPE, stderr=subprocess.PIPE).communicate()[0] or '').strip()        
+        val = (roslib.instrument.Popen([rospack_bin] + args, stdout=subprocess.PIPE, stderr=subprocess.PIPE).communicate()[0] or '').strip()        
     if val.startswith('rospack:'): #rospack error message
         raise roslib.exceptions.ROSLibException(val)
     return val
@@ -118,6 +120,7 @@ def rospack_plugins(pkg):
     else:
       return []
 
+@roslib.instrument.timed('rospack.rosstackexec')
 def rosstackexec(args):
     """
     @return: result of executing rosstack command (via subprocess). string will be strip()ed.
@@ -126,10 +129,10 @@ def rosstackexec(args):
     """
     rosstack_bin = 'rosstack'
     if python3:
-        val = subprocess.Popen([rosstack_bin] + args, stdout=subprocess.PIPE, stderr=subprocess.PIPE).communicate()[0]
+        val = roslib.instrument.Popen([rosstack_bin] + args, stdout=subprocess.PIPE, stderr=subprocess.PIPE).communicate()[0]
         val = val.decode().strip()
     else:
-        val = (subprocess.Popen([rosstack_bin] + args, stdout=subprocess.PIPE, stderr=subprocess.PIPE).communicate()[0] or '').strip()
+        val = (roslib.instrument.Popen([rosstack_bin] + args, stdout=subprocess.PIPE, stderr=subprocess.PIPE).communicate()[0] or '').strip()
     if val.startswith('rosstack:'): #rospack error message
         raise roslib.exceptions.ROSLibException(val)
     return val
@@ -39,8 +39,18 @@ here have been superceded by other libraries (e.g. rospkg).  These
 routines will likely be *deleted* in future releases.
 """
 
+import errno
 import os
+import socket
 import sys
+import threading
+
+try:
+    import xmlrpc.client as xmlrpcclient  #Python 3.x
+    import http.client as httplib
+except ImportError:
+    import xmlrpclib as xmlrpcclient #Python 2.x
+    import httplib
 
 import roslib.names 
 
@@ -85,25 +95,155 @@ def script_resolve_name(script_name, name):
         return ns_join(roslib.names.make_caller_id(script_name), name[1:])
     return roslib.names.get_ros_namespace() + name
 
+## raised when the server closed an idle connection before sending a
+## status line (Python 2: BadStatusLine)
+_RemoteDisconnected = getattr(httplib, 'RemoteDisconnected', httplib.BadStatusLine)
+## errnos of a connection that the server closed while it was idle
+_DEAD_CONNECTION_ERRNOS = (errno.ECONNRESET, errno.ECONNABORTED, errno.EPIPE)
+
+def _is_dead_connection(e):
+    """
+    @return: True if e shows that a pooled connection was closed by
+        the server before the request was answered, i.e. that the
+        request can be sent again on a new connection. Like
+        xmlrpclib.Transport, timeouts and other errors are not retried
+        as the server may have executed the call.
+    @rtype: bool
+    """
+    if isinstance(e, _RemoteDisconnected):
+        return True
+    return isinstance(e, socket.error) and getattr(e, 'errno', None) in _DEAD_CONNECTION_ERRNOS
+
+class PooledTransport(xmlrpcclient.Transport):
+    """
+    Thread-safe XML-RPC transport that keeps HTTP/1.1 connections
+    alive between requests. Idle connections are pooled per host, so
+    concurrent callers do not serialize on a single connection.
+    """
+
+    def __init__(self, pool_size=4, timeout=None, use_datetime=0):
+        """
+        @param pool_size: maximum number of idle connections kept per host
+        @type  pool_size: int
+        @param timeout: socket timeout in seconds, None for the global default
+        @type  timeout: float
+        """
+        xmlrpcclient.Transport.__init__(self, use_datetime)
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self._idle = {}
+        self._lock = threading.Lock()
+
+    def _get_connection(self, host):
+        """
+        @return: idle connection to host, or a new one, and whether
+            it has been used before
+        @rtype: httplib.HTTPConnection, bool
+        """
+        with self._lock:
+            idle = self._idle.get(host)
+            if idle:
+                return idle.pop(), True
+        chost, _, _ = self.get_host_info(host)
+        if self.timeout is None:
+            return httplib.HTTPConnection(chost), False
+        return httplib.HTTPConnection(chost, timeout=self.timeout), False
+
+    def _put_connection(self, host, conn):
+        with self._lock:
+            idle = self._idle.setdefault(host, [])
+            if len(idle) < self.pool_size:
+                idle.append(conn)
+                return
+        conn.close()
+
+    def request(self, host, handler, request_body, verbose=False):
+        while True:
+            conn, reused = self._get_connection(host)
+            try:
+                response = self._send(conn, host, handler, request_body)
+            except (socket.error, httplib.HTTPException) as e:
+                conn.close()
+                if reused and _is_dead_connection(e):
+                    continue # server closed the idle connection, retry on a new one
+                raise
+            if response.status != 200:
+                response.read()
+                conn.close()
+                raise xmlrpcclient.ProtocolError(host + handler, response.status, response.reason, response.msg)
+            self.verbose = verbose
+            try:
+                return self.parse_response(response)
+            except xmlrpcclient.Fault:
+                raise # complete response, connection can be reused
+            except:
+                response.will_close = True
+                raise
+            finally:
+                if response.will_close:
+                    conn.close()
+                else:
+                    self._put_connection(host, conn)
+
+    def _send(self, conn, host, handler, request_body):
+        _, extra_headers, _ = self.get_host_info(host)
+        conn.putrequest('POST', handler, skip_accept_encoding=True)
+        for key, val in (extra_headers or []):
+            conn.putheader(key, val)
+        conn.putheader('Content-Type', 'text/xml')
+        conn.putheader('User-Agent', self.user_agent)
+        conn.putheader('Content-Length', str(len(request_body)))
+        conn.endheaders(request_body)
+        return conn.getresponse()
+
+    def close(self):
+        """
+        Close all idle connections.
+        """
+        with self._lock:
+            idle = [c for conns in self._idle.values() for c in conns]
+            self._idle.clear()
+        for conn in idle:
+            conn.close()
+
+## master URI -> ServerProxy, see get_master()
+_master_proxies = {}
+_master_proxies_lock = threading.Lock()
+
+def _get_master_proxy(uri):
+    """
+    @return: shared XML-RPC proxy for http uris, a new proxy otherwise
+    @rtype: xmlrpclib.ServerProxy
+    """
+    if not uri.lower().startswith('http://'):
+        # e.g. https: the default transport is not thread-safe
+        return xmlrpcclient.ServerProxy(uri)
+    with _master_proxies_lock:
+        proxy = _master_proxies.get(uri)
+        if proxy is None:
+            proxy = _master_proxies[uri] = xmlrpcclient.ServerProxy(uri, transport=PooledTransport())
+        return proxy
+
 @deprecated
 def get_master():
     """
     Get an XMLRPC handle to the Master. It is recommended to use the
     `rosgraph.masterapi` library instead, as it provides many
     conveniences.
+
+    For http master URIs, the handle is shared by all callers with the
+    same master URI and can be used from multiple threads. It keeps
+    connections to the master alive between calls; use
+    xmlrpclib.MultiCall(get_master()) to send several calls in one
+    request. Other schemes get a new handle on each call.
     
     @return: XML-RPC proxy to ROS master
     @rtype: xmlrpclib.ServerProxy
     @raises ValueError if master URI is invalid
     """
-    try:
-        import xmlrpc.client as xmlrpcclient  #Python 3.x
-    except ImportError:
-        import xmlrpclib as xmlrpcclient #Python 2.x
-    
     # changed this to not look as sys args and remove dependency on roslib.rosenv for cleaner cleanup
     uri = os.environ['ROS_MASTER_URI']
-    return xmlrpcclient.ServerProxy(uri)
+    return _get_master_proxy(uri)
 
 @deprecated
 def get_param_server():
@@ -0,0 +1,394 @@
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2012, Willow Garage, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+#
+#  * Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+#  * Redistributions in binary form must reproduce the above
+#    copyright notice, this list of conditions and the following
+#    disclaimer in the documentation and/or other materials provided
+#    with the distribution.
+#  * Neither the name of Willow Garage, Inc. nor the names of its
+#    contributors may be used to endorse or promote products derived
+#    from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE
+# COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT
+# LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN
+# ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+#
+
+"""
+Workspace snapshots: the package and stack locations, direct package
+dependencies and .msg/.srv definitions of a ROS environment, crawled
+once by L{build_snapshot()} and stored in a single file that is read
+through mmap::
+
+  python -m roslib.snapshot snapshot.bin
+  export ROSLIB_SNAPSHOT=snapshot.bin
+
+While the ROSLIB_SNAPSHOT file (or the snapshot passed to
+L{set_snapshot()}) matches ROS_ROOT and ROS_PACKAGE_PATH,
+roslib.packages, roslib.stacks, roslib.msgs and roslib.srvs answer
+from it instead of running rospack or crawling the file system.
+Snapshots are not updated automatically, rebuild them after changing
+the workspace.
+
+File format (little-endian)::
+
+  header   '8sII'   magic, format version, number of sections
+  sections '16sII'  name, offset of entry table, number of entries
+  entries  'IIII'   key offset, key length, value offset, value length
+  data              UTF-8 keys and JSON values
+
+Entries of each section are sorted by key, so lookups are a binary
+search over the mapped file and only decode the values they return.
+"""
+
+import json
+import mmap
+import os
+import struct
+import sys
+import threading
+import time
+
+MAGIC = b'RLSNAP\x00\x00'
+VERSION = 1
+
+#: environment variable with the file name of the active snapshot
+SNAPSHOT_ENV = 'ROSLIB_SNAPSHOT'
+
+_HEADER = struct.Struct('<8sII')
+_SECTION = struct.Struct('<16sII')
+_ENTRY = struct.Struct('<IIII')
+
+if sys.hexversion > 0x03000000: #Python3
+    def _native(val):
+        return val
+else:
+    def _native(val):
+        """
+        @return: val with unicode strings encoded as str, as json
+            returns unicode on Python 2
+        """
+        if isinstance(val, unicode):
+            return val.encode('utf-8')
+        elif isinstance(val, list):
+            return [_native(v) for v in val]
+        elif isinstance(val, dict):
+            return dict([(_native(k), _native(v)) for k, v in val.items()])
+        return val
+
+def _encode(key):
+    return key if isinstance(key, bytes) else key.encode('utf-8')
+
+class SnapshotException(Exception):
+    """
+    Invalid or incompatible snapshot file
+    """
+    pass
+
+def write_snapshot(filename, sections):
+    """
+    Write sections to filename in the snapshot file format. The file
+    is replaced atomically.
+    @param sections: section name -> {key: JSON-serializable value}
+    @type  sections: {str: {str: object}}
+    """
+    names = sorted(sections)
+    tables = []
+    for name in names:
+        items = sorted([(_encode(k), json.dumps(v).encode('utf-8')) for k, v in sections[name].items()])
+        tables.append((name, items))
+    offset = _HEADER.size + _SECTION.size * len(names)
+    data_offset = offset + sum([_ENTRY.size * len(items) for _, items in tables])
+    header = [_HEADER.pack(MAGIC, VERSION, len(names))]
+    entries = []
+    data = []
+    for name, items in tables:
+        header.append(_SECTION.pack(name.encode('ascii'), offset, len(items)))
+        offset += _ENTRY.size * len(items)
+        for k, v in items:
+            entries.append(_ENTRY.pack(data_offset, len(k), data_offset + len(k), len(v)))
+            data.append(k)
+            data.append(v)
+            data_offset += len(k) + len(v)
+    tmp = '%s.%s.tmp'%(filename, os.getpid())
+    with open(tmp, 'wb') as f:
+        f.write(b''.join(header + entries + data))
+    os.rename(tmp, filename)
+
+class Snapshot(object):
+    """
+    Read-only view of a snapshot file.
+    """
+
+    def __init__(self, filename):
+        """
+        @param filename: snapshot file
+        @type  filename: str
+        @raise SnapshotException: if filename is not a snapshot of this version
+        @raise IOError: if filename cannot be read
+        """
+        self.filename = filename
+        with open(filename, 'rb') as f:
+            try:
+                self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError: # empty file
+                raise SnapshotException("%s is not a snapshot"%filename)
+        mm = self._mm
+        if len(mm) < _HEADER.size:
+            raise SnapshotException("%s is not a snapshot"%filename)
+        magic, version, count = _HEADER.unpack_from(mm, 0)
+        if magic != MAGIC:
+            raise SnapshotException("%s is not a snapshot"%filename)
+        elif version != VERSION:
+            raise SnapshotException("%s has format version %s, expected %s"%(filename, version, VERSION))
+        self._sections = {}
+        for i in range(count):
+            name, offset, n = _SECTION.unpack_from(mm, _HEADER.size + i * _SECTION.size)
+            self._sections[name.rstrip(b'\0').decode('ascii')] = (offset, n)
+        meta = dict(self.items('meta'))
+        self.ros_root = meta.get('ros_root')
+        self.ros_package_path = meta.get('ros_package_path')
+        self.created = meta.get('created')
+
+    def close(self):
+        self._mm.close()
+
+    def _key(self, offset, i):
+        key_off, key_len, _, _ = _ENTRY.unpack_from(self._mm, offset + i * _ENTRY.size)
+        return self._mm[key_off:key_off + key_len]
+
+    def _value(self, offset, i):
+        _, _, val_off, val_len = _ENTRY.unpack_from(self._mm, offset + i * _ENTRY.size)
+        return _native(json.loads(self._mm[val_off:val_off + val_len].decode('utf-8')))
+
+    def get(self, section, key, default=None):
+        """
+        @return: value of key in section, or default
+        """
+        if section not in self._sections:
+            return default
+        offset, n = self._sections[section]
+        k = _encode(key)
+        lo, hi = 0, n
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._key(offset, mid) < k:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < n and self._key(offset, lo) == k:
+            return self._value(offset, lo)
+        return default
+
+    def keys(self, section):
+        """
+        @return: keys of section, sorted
+        @rtype: [str]
+        """
+        offset, n = self._sections.get(section, (0, 0))
+        return [_native(self._key(offset, i).decode('utf-8')) for i in range(n)]
+
+    def items(self, section):
+        """
+        @return: (key, value) pairs of section, sorted by key
+        @rtype: [(str, object)]
+        """
+        offset, n = self._sections.get(section, (0, 0))
+        return [(_native(self._key(offset, i).decode('utf-8')), self._value(offset, i)) for i in range(n)]
+
+    def matches(self, ros_root, ros_package_path):
+        """
+        @return: True if the snapshot was built for this environment
+        @rtype: bool
+        """
+        return self.ros_root == ros_root and self.ros_package_path == ros_package_path
+
+    def get_package_path(self, package):
+        """
+        @return: directory of package, or None if it is not in the snapshot
+        @rtype: str
+        """
+        entry = self.get('packages', package)
+        return entry['path'] if entry else None
+
+    def get_package_depends(self, package):
+        """
+        @return: names of the direct dependencies of package, or None
+        @rtype: [str]
+        """
+        entry = self.get('packages', package)
+        return entry['depends'] if entry else None
+
+    def list_types(self, package, subdir, include_depends):
+        """
+        Snapshot version of L{roslib.msgs.list_msg_types()} and
+        L{roslib.srvs.list_srv_types()}.
+        @param subdir: 'msg' or 'srv'
+        @type  subdir: str
+        @return: type names, or None if package is not in the snapshot
+        @rtype: [str]
+        """
+        entry = self.get('packages', package)
+        if entry is None:
+            return None
+        types = list(entry[subdir])
+        if include_depends:
+            for dep in entry['depends']:
+                dep_entry = self.get('packages', dep)
+                if dep_entry:
+                    types.extend(['%s/%s'%(dep, t) for t in dep_entry[subdir]])
+        return types
+
+    def get_stack_path(self, stack):
+        """
+        @return: directory of stack, or None if it is not in the snapshot
+        @rtype: str
+        """
+        entry = self.get('stacks', stack)
+        return entry['path'] if entry else None
+
+    def list_stacks(self):
+        """
+        @return: names of all stacks
+        @rtype: [str]
+        """
+        return self.keys('stacks')
+
+    def get_file(self, path):
+        """
+        @return: contents of .msg/.srv file path, or None if it is not
+            in the snapshot
+        @rtype: str
+        """
+        return self.get('files', path)
+
+def build_snapshot(filename, env=None):
+    """
+    Crawl the ROS environment and write a snapshot of it to filename.
+    @param env: override environment variables
+    @type  env: {str: str}
+    @return: snapshot of the written file
+    @rtype: L{Snapshot}
+    """
+    import rospkg
+    if env is None:
+        env = os.environ
+    ros_paths = rospkg.get_ros_paths(env)
+    rospack = rospkg.RosPack(ros_paths)
+    rosstack = rospkg.RosStack(ros_paths)
+    packages = {}
+    files = {}
+    for package in rospack.list():
+        d = rospack.get_path(package)
+        entry = {'path': d, 'depends': [dep.name for dep in rospack.get_manifest(package).depends]}
+        for subdir in ['msg', 'srv']:
+            ext = '.' + subdir
+            types = []
+            sd = os.path.join(d, subdir)
+            if os.path.isdir(sd):
+                for f in os.listdir(sd):
+                    path = os.path.join(sd, f)
+                    if f.endswith(ext) and os.path.isfile(path):
+                        types.append(f[:-len(ext)])
+                        with open(path) as fd:
+                            files[path] = fd.read()
+            entry[subdir] = sorted(types)
+        packages[package] = entry
+    stacks = {}
+    for stack in rosstack.list():
+        stacks[stack] = {'path': rosstack.get_path(stack), 'packages': rosstack.packages_of(stack)}
+    meta = {'ros_root': env.get(rospkg.environment.ROS_ROOT),
+            'ros_package_path': env.get(rospkg.environment.ROS_PACKAGE_PATH),
+            'created': time.time()}
+    write_snapshot(filename, {'meta': meta, 'packages': packages, 'stacks': stacks, 'files': files})
+    return Snapshot(filename)
+
+# active snapshot ##################################################
+
+## (file name, Snapshot or None if it cannot be read) of ROSLIB_SNAPSHOT
+_env_snapshot = None
+## snapshot set with set_snapshot(), overrides ROSLIB_SNAPSHOT
+_snapshot = None
+_lock = threading.Lock()
+
+def set_snapshot(snapshot):
+    """
+    Make snapshot the active snapshot of this process, overriding
+    the ROSLIB_SNAPSHOT environment variable.
+    @param snapshot: snapshot, or None to use ROSLIB_SNAPSHOT again
+    @type  snapshot: L{Snapshot}
+    """
+    global _snapshot
+    _snapshot = snapshot
+
+def get_snapshot(ros_root=None, ros_package_path=None, env=None):
+    """
+    @param ros_root: ROS_ROOT the snapshot must match, defaults to env
+    @type  ros_root: str
+    @param ros_package_path: ROS_PACKAGE_PATH the snapshot must match, defaults to env
+    @type  ros_package_path: str
+    @param env: override environment variables
+    @type  env: {str: str}
+    @return: active snapshot if it matches the environment, else None
+    @rtype: L{Snapshot}
+    """
+    global _env_snapshot
+    if env is None:
+        env = os.environ
+    snapshot = _snapshot
+    if snapshot is None:
+        filename = env.get(SNAPSHOT_ENV)
+        if not filename:
+            return None
+        with _lock:
+            if _env_snapshot is None or _env_snapshot[0] != filename:
+                try:
+                    _env_snapshot = filename, Snapshot(filename)
+                except (IOError, OSError, SnapshotException):
+                    _env_snapshot = filename, None
+            snapshot = _env_snapshot[1]
+        if snapshot is None:
+            return None
+    if ros_root is None:
+        ros_root = env.get('ROS_ROOT')
+    if ros_package_path is None:
+        ros_package_path = env.get('ROS_PACKAGE_PATH')
+    return snapshot if snapshot.matches(ros_root, ros_package_path) else None
+
+def read_file(path):
+    """
+    @return: contents of path, from the active snapshot if it has them
+    @rtype: str
+    @raise IOError: if path cannot be read
+    """
+    snapshot = get_snapshot()
+    if snapshot is not None:
+        text = snapshot.get_file(path)
+        if text is not None:
+            return text
+    with open(path, 'r') as f:
+        return f.read()
+
+if __name__ == '__main__':
+    if len(sys.argv) != 2:
+        sys.stderr.write("usage: python -m roslib.snapshot <file>\n")
+        sys.exit(1)
+    s = build_snapshot(sys.argv[1])
+    print("%s: %s packages, %s stacks, %s files"%(sys.argv[1], len(s.keys('packages')), len(s.keys('stacks')), len(s.keys('files'))))
@@ -46,10 +46,12 @@ try:
 except ImportError:
     from io import StringIO # Python 3.x
 
+import roslib.instrument
 import roslib.msgs
 import roslib.names
 import roslib.packages
 import roslib.resources
+import roslib.snapshot
 
 # don't directly use code from this, though we do depend on the
 # manifest.Depend data type
@@ -107,11 +109,11 @@ class SrvSpec(object):
 # srv spec loading utilities ##########################################
 
 ## @internal
-## predicate for filtering directory list. matches message files
-def _srv_filter(f):
-    return os.path.isfile(f) and f.endswith(EXT)
+## predicate for filtering directory list. matches service files
+_srv_filter = roslib.resources.ExtensionFilter(EXT)
 
 # also used by doxymaker
+@roslib.instrument.timed('srvs.list_srv_types')
 def list_srv_types(package, include_depends):
     """
     list all services in the specified package
@@ -122,6 +124,11 @@ def list_srv_types(package, include_depends):
     @return: service type names
     @rtype: [str]
     """
+    snapshot = roslib.snapshot.get_snapshot()
+    if snapshot is not None:
+        types = snapshot.list_types(package, 'srv', include_depends)
+        if types is not None:
+            return types
     types = roslib.resources.list_package_resources(package, include_depends, 'srv', _srv_filter)
     return [x[:-len(EXT)] for x in types]
 
@@ -146,15 +153,32 @@ def get_pkg_srv_specs(package):
     of message names that could not be processed. 
     @rtype: [(str,roslib.MsgSpec), [str]]
     """
-    #almost identical to roslib.msgs.get_pkg_msg_specs
-    types = list_srv_types(package, False)
+    return get_pkgs_srv_specs([package])
+
+@roslib.instrument.timed('srvs.get_pkgs_srv_specs')
+def get_pkgs_srv_specs(packages, max_workers=None):
+    """
+    List all services that the packages contain. Service files are
+    read and parsed concurrently; results are ordered by package in
+    the order given.
+    @param packages: packages to load services from
+    @type  packages: [str]
+    @param max_workers: maximum number of loader threads, defaults to roslib.msgs.MAX_LOAD_WORKERS
+    @type  max_workers: int
+    @return: list of service type names and specs for packages, as well as a list
+    of service names that could not be processed. 
+    @rtype: [(str,roslib.SrvSpec), [str]]
+    """
+    #almost identical to roslib.msgs.get_pkgs_msg_specs
+    jobs = roslib.msgs.list_types_concurrently(packages, 'srv', _srv_filter, EXT, max_workers)
+    results = roslib.msgs.map_threaded(
+        lambda j: roslib.msgs.try_load(load_from_file, os.path.join(j[1], j[2]+EXT), j[0]), jobs, max_workers)
     specs = [] #no fancy list comprehension as we want to show errors
     failures = []
-    for t in types:
-        try: 
-            spec = load_from_file(srv_file(package, t), package)
+    for (package, _, t), (spec, e) in zip(jobs, results):
+        if e is None:
             specs.append(spec)
-        except Exception as e:
+        else:
             failures.append(t)
             sys.stderr.write("ERROR: unable to load %s\n"%(t))
     return specs, failures
@@ -185,6 +209,7 @@ def load_from_string(text, package_context='', full_name='', short_name=''):
     msg_out = roslib.msgs.load_from_string(text_out.getvalue(), package_context, '%sResponse'%(full_name), '%sResponse'%(short_name))
     return SrvSpec(msg_in, msg_out, text, full_name, short_name, package_context)
 
+@roslib.instrument.timed('srvs.load_from_file')
 def load_from_file(file_name, package_context=''):
     """
     Convert the .srv representation in the file to a SrvSpec instance.
@@ -213,12 +238,8 @@ def load_from_file(file_name, package_context=''):
     if not roslib.names.is_legal_resource_name(type_):
         raise SrvSpecException("%s: %s is not a legal service type name"%(file_name, type_))
     
-    f = open(file_name, 'r')
-    try:
-        text = f.read()
-        return (type_, load_from_string(text, package_context, type_, base_type_))
-    finally:
-        f.close()
+    text = roslib.snapshot.read_file(file_name)
+    return (type_, load_from_string(text, package_context, type_, base_type_))
 
 
 
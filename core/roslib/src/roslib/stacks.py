@@ -42,8 +42,11 @@ routines will likely be *deleted* in future releases.
 import os
 import sys
 import re
+import threading
 
+import roslib.instrument
 import roslib.packages
+import roslib.snapshot
 import roslib.stack_manifest
 
 import rospkg
@@ -57,6 +60,7 @@ ROS_STACK = 'ros'
 class ROSStackException(Exception): pass
 class InvalidROSStackException(ROSStackException): pass
 
+@roslib.instrument.timed('stacks.stack_of')
 def stack_of(pkg, env=None):
     """
     @param env: override environment variables
@@ -77,6 +81,7 @@ def stack_of(pkg, env=None):
             return os.path.basename(d)
         d = os.path.dirname(d)
         
+@roslib.instrument.timed('stacks.get_stack_dir')
 def get_stack_dir(stack, env=None):
     """
     Get the directory of a ROS stack. This will initialize an internal
@@ -92,25 +97,40 @@ def get_stack_dir(stack, env=None):
     @rtype: str
     @raise InvalidROSStackException: if stack cannot be located.
     """
-    _init_rosstack(env=env)
+    snapshot = roslib.snapshot.get_snapshot(env=env)
+    if snapshot is not None:
+        stack_dir = snapshot.get_stack_path(stack)
+        if stack_dir is not None:
+            return stack_dir
+    rosstack = _init_rosstack(env=env)
     try:
-        return _rosstack.get_path(stack)
+        return rosstack.get_path(stack)
     except rospkg.ResourceNotFound:
         # preserve old signature
         raise InvalidROSStackException(stack)
 
 _rosstack = None
 _ros_paths = None
+# guards replacing _rosstack and _ros_paths together. Lookups run
+# on the returned instance outside of the lock.
+_rosstack_lock = threading.Lock()
 
 def _init_rosstack(env=None):
+    """
+    @return: shared RosStack for the ROS paths of env
+    @rtype: rospkg.RosStack
+    """
     global _rosstack, _ros_paths
     if env is None:
         env = os.environ
     ros_paths = rospkg.get_ros_paths(env)
-    if ros_paths != _ros_paths:
-        _ros_paths = ros_paths
-        _rosstack = rospkg.RosStack(ros_paths)
+    with _rosstack_lock:
+        if ros_paths != _ros_paths:
+            _rosstack = rospkg.RosStack(ros_paths)
+            _ros_paths = ros_paths
+        return _rosstack
     
+@roslib.instrument.timed('stacks.list_stacks')
 def list_stacks(env=None):
     """
     Get list of all ROS stacks. This uses an internal cache.
@@ -122,9 +142,13 @@ def list_stacks(env=None):
     @return: complete list of stacks names in ROS environment
     @rtype: [str]
     """
-    _init_rosstack(env=env)
-    return _rosstack.list()
+    snapshot = roslib.snapshot.get_snapshot(env=env)
+    if snapshot is not None:
+        return snapshot.list_stacks()
+    rosstack = _init_rosstack(env=env)
+    return rosstack.list()
 
+@roslib.instrument.timed('stacks.list_stacks_by_path')
 def list_stacks_by_path(path, stacks=None, cache=None):
     """
     List ROS stacks within the specified path.
@@ -173,6 +197,7 @@ def list_stacks_by_path(path, stacks=None, cache=None):
     return stacks
 
 # #2022
+@roslib.instrument.timed('stacks.expand_to_packages')
 def expand_to_packages(names, env=None):
     """
     Expand names into a list of packages. Names can either be of packages or stacks.
@@ -199,8 +224,8 @@ def get_stack_version(stack, env=None):
     @return: version number of stack, or None if stack is unversioned.
     @rtype: str
     """
-    _init_rosstack(env=env)
-    return _rosstack.get_stack_version(stack)
+    rosstack = _init_rosstack(env=env)
+    return rosstack.get_stack_version(stack)
 
 def get_stack_version_by_dir(stack_dir):
     """
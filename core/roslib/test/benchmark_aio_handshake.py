@@ -0,0 +1,131 @@
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2012, Willow Garage, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+#
+#  * Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+#  * Redistributions in binary form must reproduce the above
+#    copyright notice, this list of conditions and the following
+#    disclaimer in the documentation and/or other materials provided
+#    with the distribution.
+#  * Neither the name of Willow Garage, Inc. nor the names of its
+#    contributors may be used to endorse or promote products derived
+#    from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE
+# COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT
+# LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN
+# ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+#
+
+"""
+Loopback benchmark of tcpros handshakes per second: a single asyncio
+event loop using roslib.aio against a thread-per-connection server
+using roslib.network. Python 3 only. Run directly::
+
+  python benchmark_aio_handshake.py [connections] [concurrency]
+"""
+
+import asyncio
+import socket
+import sys
+import threading
+import time
+from io import BytesIO
+
+import roslib.aio
+import roslib.network
+
+REQUEST = {'callerid': '/listener', 'topic': '/chatter', 'md5sum': '992ce8a1687cec8c8bd883ec73ca41d1',
+           'type': 'std_msgs/String', 'tcp_nodelay': '0'}
+RESPONSE = {'callerid': '/talker', 'md5sum': '992ce8a1687cec8c8bd883ec73ca41d1',
+            'type': 'std_msgs/String', 'message_definition': 'string data\n', 'latching': '0'}
+
+def start_threaded_server():
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind(('127.0.0.1', 0))
+    sock.listen(1024)
+    def handle(conn):
+        try:
+            roslib.network.read_ros_handshake_header(conn, BytesIO(), 65536)
+            roslib.network.write_ros_handshake_header(conn, RESPONSE)
+        finally:
+            conn.close()
+    def accept():
+        while True:
+            try:
+                conn, _ = sock.accept()
+            except OSError:
+                return
+            t = threading.Thread(target=handle, args=(conn,))
+            t.daemon = True
+            t.start()
+    t = threading.Thread(target=accept)
+    t.daemon = True
+    t.start()
+    return sock.getsockname()[1], sock.close
+
+def start_aio_server():
+    loop = asyncio.new_event_loop()
+    async def handle(reader, writer):
+        try:
+            await roslib.aio.read_ros_handshake_header(reader)
+            await roslib.aio.write_ros_handshake_header(writer, RESPONSE)
+        finally:
+            writer.close()
+    server = loop.run_until_complete(asyncio.start_server(handle, '127.0.0.1', 0, backlog=1024))
+    t = threading.Thread(target=loop.run_forever)
+    t.daemon = True
+    t.start()
+    def stop():
+        loop.call_soon_threadsafe(server.close)
+        loop.call_soon_threadsafe(loop.stop)
+    return server.sockets[0].getsockname()[1], stop
+
+def run_clients(port, connections, concurrency):
+    """
+    Open connections from concurrency client threads, each doing a
+    full handshake, and return handshakes per second.
+    """
+    per_thread = connections // concurrency
+    def client():
+        for _ in range(per_thread):
+            s = socket.create_connection(('127.0.0.1', port))
+            try:
+                roslib.network.write_ros_handshake_header(s, REQUEST)
+                roslib.network.read_ros_handshake_header(s, BytesIO(), 65536)
+            finally:
+                s.close()
+    threads = [threading.Thread(target=client) for _ in range(concurrency)]
+    start = time.time()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return per_thread * concurrency / (time.time() - start)
+
+def main(connections=4000, concurrency=40):
+    for name, start_server in [('threaded', start_threaded_server), ('asyncio', start_aio_server)]:
+        port, stop = start_server()
+        try:
+            rate = run_clients(port, connections, concurrency)
+        finally:
+            stop()
+        print("%-8s %d connections, %d concurrent clients: %8.0f handshakes/s"%(name, connections, concurrency, rate))
+
+if __name__ == '__main__':
+    main(*[int(a) for a in sys.argv[1:3]])
@@ -0,0 +1,105 @@
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2012, Willow Garage, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+#
+#  * Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+#  * Redistributions in binary form must reproduce the above
+#    copyright notice, this list of conditions and the following
+#    disclaimer in the documentation and/or other materials provided
+#    with the distribution.
+#  * Neither the name of Willow Garage, Inc. nor the names of its
+#    contributors may be used to endorse or promote products derived
+#    from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE
+# COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT
+# LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN
+# ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+
+"""
+Benchmark of roslib.codec against naive field-by-field decoding of
+large arrays (point clouds, images). Run directly::
+
+  python benchmark_codec.py [points]
+"""
+
+from __future__ import print_function
+
+import struct
+import sys
+import timeit
+
+import roslib.msgs
+import roslib.codec
+
+POINT = "float32 x\nfloat32 y\nfloat32 z\nfloat32 rgb"
+CLOUD = "uint32 height\nuint32 width\nbench/Point[] points\nfloat32[] intensities"
+IMAGE = "uint32 height\nuint32 width\nstring encoding\nuint8[] data\nuint16[] depth"
+
+_FORMATS = roslib.msgs.STRUCT_FORMATS
+
+def naive_decode(spec, data, offset=0):
+    """
+    Reference decoder that unpacks every field and array element
+    with its own struct call.
+    """
+    msg = {}
+    for field in spec.parsed_fields():
+        if field.is_array:
+            (n,) = struct.unpack_from('<I', data, offset)
+            offset += 4
+            val = []
+            for _ in range(n):
+                v, offset = _naive_value(spec, field.base_type, data, offset)
+                val.append(v)
+        else:
+            val, offset = _naive_value(spec, field.base_type, data, offset)
+        msg[field.name] = val
+    return msg, offset
+
+def _naive_value(spec, base_type, data, offset):
+    if base_type == 'string':
+        (n,) = struct.unpack_from('<I', data, offset)
+        return data[offset+4:offset+4+n], offset+4+n
+    elif base_type in _FORMATS:
+        fmt = '<'+_FORMATS[base_type]
+        return struct.unpack_from(fmt, data, offset)[0], offset+struct.calcsize(fmt)
+    return naive_decode(roslib.msgs.get_registered(base_type, spec.package), data, offset)
+
+def _bench(name, spec, msg, number=5):
+    codec = roslib.codec.get_codec(spec)
+    data = codec.encode(msg)
+    t_codec = min(timeit.repeat(lambda: codec.decode(data), number=number, repeat=3)) / number
+    t_naive = min(timeit.repeat(lambda: naive_decode(spec, data), number=number, repeat=3)) / number
+    print("%-6s %9d bytes: codec %8.2fms  naive %8.2fms  speedup %5.1fx"%(
+        name, len(data), t_codec*1000, t_naive*1000, t_naive/t_codec))
+
+def main(n=100000):
+    point = roslib.msgs.load_from_string(POINT, 'bench', 'bench/Point', 'Point')
+    roslib.msgs.register('bench/Point', point)
+    cloud = roslib.msgs.load_from_string(CLOUD, 'bench', 'bench/Cloud', 'Cloud')
+    image = roslib.msgs.load_from_string(IMAGE, 'bench', 'bench/Image', 'Image')
+
+    points = [{'x': float(i), 'y': 1.0, 'z': 2.0, 'rgb': 0.5} for i in range(n)]
+    _bench('cloud', cloud, {'height': 1, 'width': n, 'points': points, 'intensities': [0.25]*n})
+    side = int(n ** 0.5)
+    _bench('image', image, {'height': side, 'width': side, 'encoding': 'mono8',
+                            'data': b'\x01'*(side*side), 'depth': [7]*(side*side)})
+
+if __name__ == '__main__':
+    main(*[int(a) for a in sys.argv[1:2]])
@@ -0,0 +1,90 @@
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2012, Willow Garage, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+#
+#  * Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+#  * Redistributions in binary form must reproduce the above
+#    copyright notice, this list of conditions and the following
+#    disclaimer in the documentation and/or other materials provided
+#    with the distribution.
+#  * Neither the name of Willow Garage, Inc. nor the names of its
+#    contributors may be used to endorse or promote products derived
+#    from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE
+# COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT
+# LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN
+# ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+"""
+Import-time benchmark of roslib. Each statement runs in a fresh
+interpreter; the time of 'python -c pass' is subtracted. On Python
+3.7+ the cumulative times reported by 'python -X importtime' for the
+roslib and ros modules are shown as well. Run directly::
+
+  python benchmark_import.py [runs] [package]
+
+package is passed to roslib.load_manifest() (default: roslib), which
+needs a ROS environment.
+"""
+
+from __future__ import print_function
+
+import os
+import subprocess
+import sys
+import time
+
+def _run(args, env):
+    start = time.time()
+    p = subprocess.Popen([sys.executable] + args, env=env, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    out, err = p.communicate()
+    return time.time() - start, p.returncode, err.decode('utf-8', 'replace')
+
+def _importtime(err, module):
+    """
+    @return: cumulative import time of module in microseconds from
+        -X importtime output, or None
+    @rtype: int
+    """
+    for line in err.splitlines():
+        if line.startswith('import time:') and line.split('|')[-1].strip() == module:
+            return int(line.split('|')[1])
+    return None
+
+def main(runs=20, package='roslib'):
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join([p for p in sys.path if p]))
+    statements = [
+        ('import roslib', 'import roslib', 'roslib'),
+        ('import ros', 'import ros', 'ros'),
+        ('load_manifest', 'import roslib; roslib.load_manifest(%r)'%package, 'roslib'),
+        ]
+    base = min([_run(['-c', 'pass'], env)[0] for _ in range(runs)])
+    for label, stmt, module in statements:
+        results = [_run(['-c', stmt], env) for _ in range(runs)]
+        if results[0][1] != 0:
+            print("%-14s failed: %s"%(label, results[0][2].strip().splitlines()[-1]))
+            continue
+        line = "%-14s %7.1fms"%(label, (min([r[0] for r in results]) - base)*1000)
+        if sys.version_info >= (3, 7):
+            t = _importtime(_run(['-X', 'importtime', '-c', stmt], env)[2], module)
+            if t is not None:
+                line += "  (-X importtime %s: %.1fms)"%(module, t/1000.0)
+        print(line)
+
+if __name__ == '__main__':
+    main(*[int(a) for a in sys.argv[1:2]] + sys.argv[2:3])
@@ -0,0 +1,101 @@
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2012, Willow Garage, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+#
+#  * Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+#  * Redistributions in binary form must reproduce the above
+#    copyright notice, this list of conditions and the following
+#    disclaimer in the documentation and/or other materials provided
+#    with the distribution.
+#  * Neither the name of Willow Garage, Inc. nor the names of its
+#    contributors may be used to endorse or promote products derived
+#    from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE
+# COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT
+# LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN
+# ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+"""
+Benchmark of importing modules from manifest paths with the old
+duplicated sys.path entries, with roslib.launcher's de-duplicated
+insertion and with its import finder. Simulates a process that
+calls load_manifest() for several packages sharing a dependency
+closure. Run directly::
+
+  python benchmark_launcher.py [packages] [manifests]
+"""
+
+from __future__ import print_function
+
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import roslib.launcher
+
+def _import_all(names):
+    """
+    @return: time to import names with cold module caches
+    @rtype: float
+    """
+    for n in names:
+        sys.modules.pop(n, None)
+    if hasattr(sys, 'path_importer_cache'):
+        sys.path_importer_cache.clear()
+    start = time.time()
+    for n in names:
+        __import__(n)
+    return time.time() - start
+
+def main(packages=200, manifests=10):
+    ws = tempfile.mkdtemp()
+    saved = list(sys.path)
+    try:
+        dirs = []
+        for i in range(packages):
+            d = os.path.join(ws, 'pkg%d'%i, 'src')
+            os.makedirs(os.path.join(d, 'bench_mod%d'%i))
+            with open(os.path.join(d, 'bench_mod%d'%i, '__init__.py'), 'w') as f:
+                f.write('')
+            dirs.append(d)
+        names = ['bench_mod%d'%i for i in range(packages)]
+        # each load_manifest() prepends the (shared) closure
+        for _ in range(manifests):
+            sys.path = dirs + sys.path
+        print("sys.path entries: %d duplicated"%len(sys.path), end='')
+        t_dup = min([_import_all(names) for _ in range(3)])
+
+        sys.path[:] = saved
+        for _ in range(manifests):
+            roslib.launcher._insert_paths(dirs)
+        print(", %d de-duplicated"%len(sys.path))
+        t_dedup = min([_import_all(names) for _ in range(3)])
+
+        roslib.launcher.enable_import_finder()
+        t_finder = min([_import_all(names) for _ in range(3)])
+        roslib.launcher.disable_import_finder()
+        print("import %d modules: duplicated %7.1fms  de-duplicated %7.1fms  finder %7.1fms"%(
+            packages, t_dup*1000, t_dedup*1000, t_finder*1000))
+    finally:
+        sys.path[:] = saved
+        shutil.rmtree(ws)
+
+if __name__ == '__main__':
+    main(*[int(a) for a in sys.argv[1:3]])
@@ -0,0 +1,67 @@
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2012, Willow Garage, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+#
+#  * Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+#  * Redistributions in binary form must reproduce the above
+#    copyright notice, this list of conditions and the following
+#    disclaimer in the documentation and/or other materials provided
+#    with the distribution.
+#  * Neither the name of Willow Garage, Inc. nor the names of its
+#    contributors may be used to endorse or promote products derived
+#    from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE
+# COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT
+# LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN
+# ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+
+"""
+Benchmark of the batch name validators in roslib.names against
+per-name calls. Run directly::
+
+  python benchmark_names.py [count]
+"""
+
+from __future__ import print_function
+
+import sys
+import timeit
+
+import roslib.names as names
+
+def main(count=200000):
+    graph_names = ['/robot%d/sensors/camera_%d/image_raw'%(i % 50, i) for i in range(count)]
+    resource_names = ['pkg_%d/Type%d'%(i % 200, i) for i in range(count)]
+    base_names = ['node_%d'%i for i in range(count)]
+    cases = [
+        ('name', graph_names, names.is_legal_name, names.find_illegal_names),
+        ('resource', resource_names, names.is_legal_resource_name, names.find_illegal_resource_names),
+        ('base', base_names, names.is_legal_base_name, names.find_illegal_base_names),
+        ]
+    for label, values, is_legal, find_illegal in cases:
+        t_single = min(timeit.repeat(lambda: [v for v in values if not is_legal(v)], number=1, repeat=3))
+        t_batch = min(timeit.repeat(lambda: find_illegal(values), number=1, repeat=3))
+        # one bad entry forces the per-name fallback
+        bad = values + ['bad name']
+        t_bad = min(timeit.repeat(lambda: find_illegal(bad), number=1, repeat=3))
+        print("%-9s %d names: per-name %7.1fms  batch %7.1fms (%4.1fx)  batch w/ invalid %7.1fms"%(
+            label, len(values), t_single*1000, t_batch*1000, t_single/t_batch, t_bad*1000))
+
+if __name__ == '__main__':
+    main(*[int(a) for a in sys.argv[1:2]])
@@ -0,0 +1,142 @@
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2012, Willow Garage, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+#
+#  * Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+#  * Redistributions in binary form must reproduce the above
+#    copyright notice, this list of conditions and the following
+#    disclaimer in the documentation and/or other materials provided
+#    with the distribution.
+#  * Neither the name of Willow Garage, Inc. nor the names of its
+#    contributors may be used to endorse or promote products derived
+#    from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE
+# COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT
+# LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN
+# ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+#
+
+"""
+Benchmark of roslib.network.decode_ros_handshake_header() against the
+slice-based decoder it replaced and against a decoder that copies each
+key and value straight out of a memoryview. Run directly::
+
+  python benchmark_network.py [fields]
+"""
+
+from __future__ import print_function
+
+import struct
+import sys
+import timeit
+
+import roslib.network
+
+python3 = sys.hexversion > 0x03000000
+
+def slice_decode(header_str):
+    """
+    Previous implementation: slices a new string for every length
+    field and line.
+    """
+    (size, ) = struct.unpack('<I', header_str[0:4])
+    size += 4
+    if size > len(header_str):
+        raise roslib.network.ROSHandshakeException("Incomplete header")
+    d = {}
+    start = 4
+    while start < size:
+        (field_size, ) = struct.unpack('<I', header_str[start:start+4])
+        if field_size == 0:
+            raise roslib.network.ROSHandshakeException("Invalid 0-length handshake header field")
+        start += field_size + 4
+        if start > size:
+            raise roslib.network.ROSHandshakeException("Invalid line length")
+        line = header_str[start-field_size:start]
+        if python3:
+            line = line.decode()
+        idx = line.find("=")
+        if idx < 0:
+            raise roslib.network.ROSHandshakeException("Invalid line")
+        d[line[:idx].strip()] = line[idx+1:]
+    return d
+
+_struct_I = struct.Struct('<I')
+
+def view_decode(header_str):
+    """
+    Copies each key and value exactly once, straight out of a
+    memoryview, without copying the line first.
+    """
+    unpack_from = _struct_I.unpack_from
+    (size, ) = unpack_from(header_str, 0)
+    size += 4
+    if size > len(header_str):
+        raise roslib.network.ROSHandshakeException("Incomplete header")
+    view = memoryview(header_str)
+    find = header_str.find
+    d = {}
+    start = 4
+    while start < size:
+        (field_size, ) = unpack_from(header_str, start)
+        if field_size == 0:
+            raise roslib.network.ROSHandshakeException("Invalid 0-length handshake header field")
+        start += field_size + 4
+        if start > size:
+            raise roslib.network.ROSHandshakeException("Invalid line length")
+        line_start = start - field_size
+        idx = find(b'=', line_start, start)
+        if idx < 0:
+            raise roslib.network.ROSHandshakeException("Invalid line")
+        if python3:
+            d[str(view[line_start:idx], 'utf-8').strip()] = str(view[idx+1:start], 'utf-8')
+        else:
+            d[view[line_start:idx].tobytes().strip()] = view[idx+1:start].tobytes()
+    return d
+
+def _time(fn, data, number):
+    return min(timeit.repeat(lambda: fn(data), number=number, repeat=3)) / number
+
+def main(fields=8, number=20000):
+    header = {'callerid': '/talker', 'topic': '/chatter', 'type': 'std_msgs/String',
+              'md5sum': '992ce8a1687cec8c8bd883ec73ca41d1',
+              'message_definition': 'string data\n' * 200}
+    for i in range(max(0, fields - len(header))):
+        header['field_%d'%i] = 'value_%d'%i
+    data = roslib.network.encode_ros_handshake_header(header)
+    expected = roslib.network.decode_ros_handshake_header(data)
+    assert slice_decode(data) == expected and view_decode(data) == expected
+    t_new = _time(roslib.network.decode_ros_handshake_header, data, number)
+    t_old = _time(slice_decode, data, number)
+    t_view = _time(view_decode, data, number)
+    # ratios are relative to decode_ros_handshake_header()
+    print("%d fields, %d bytes: decode %.2fus  slice %.2fus (%.2fx)  per-key/value view %.2fus (%.2fx)"%(
+        len(header), len(data), t_new*1e6, t_old*1e6, t_old/t_new, t_view*1e6, t_view/t_new))
+
+    # publisher side: one connection-specific field on top of the static ones
+    static = dict(header)
+    conn = {'callerid': static.pop('callerid')}
+    template = roslib.network.HandshakeTemplate(static)
+    merged = dict(header)
+    t_encode = _time(roslib.network.encode_ros_handshake_header, merged, number)
+    t_template = _time(template.encode, conn, number)
+    print("%d fields: encode_ros_handshake_header %.2fus  HandshakeTemplate.encode %.2fus (%.2fx)"%(
+        len(merged), t_encode*1e6, t_template*1e6, t_encode/t_template))
+
+if __name__ == '__main__':
+    main(*[int(a) for a in sys.argv[1:2]])
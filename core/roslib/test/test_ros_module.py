@@ -0,0 +1,105 @@
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2012, Willow Garage, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+#
+#  * Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+#  * Redistributions in binary form must reproduce the above
+#    copyright notice, this list of conditions and the following
+#    disclaimer in the documentation and/or other materials provided
+#    with the distribution.
+#  * Neither the name of Willow Garage, Inc. nor the names of its
+#    contributors may be used to endorse or promote products derived
+#    from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE
+# COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT
+# LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN
+# ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+
+import os
+import threading
+import types
+import unittest
+
+import rospkg
+import roslib
+import ros
+
+class ModuleTest(unittest.TestCase):
+
+  def setUp(self):
+    self.loaded = []
+    self._saved = roslib.load_manifest
+    def load_manifest(package):
+      self.loaded.append(package)
+      if package == 'missing_pkg':
+        raise rospkg.ResourceNotFound(package)
+    roslib.load_manifest = load_manifest
+    self.module = ros.Module(types.ModuleType('fake_ros'))
+
+  def tearDown(self):
+    roslib.load_manifest = self._saved
+
+  def test_ros_module(self):
+    self.assert_(isinstance(ros, ros.Module))
+
+  def test_cache(self):
+    m = self.module
+    self.assert_(m.os is os)
+    self.assert_(m.os is os)
+    self.assertEquals(['os'], self.loaded)
+    for _ in range(3):
+      try:
+        m.missing_pkg
+        self.fail("should have raised ImportError")
+      except ImportError as e:
+        self.assert_('missing_pkg' in str(e))
+    self.assertEquals(['os', 'missing_pkg'], self.loaded)
+    # package exists but has no python module
+    for _ in range(2):
+      self.assertRaises(ImportError, getattr, m, 'roslib_no_such_module')
+    self.assertEquals(['os', 'missing_pkg', 'roslib_no_such_module'], self.loaded)
+    self.assertRaises(AttributeError, getattr, m, '__all__')
+
+    m._clear_cache('missing_pkg')
+    self.assertRaises(ImportError, getattr, m, 'missing_pkg')
+    self.assertEquals(2, self.loaded.count('missing_pkg'))
+    self.assert_(m.os is os)
+    m._clear_cache()
+    self.assert_(m.os is os)
+    self.assertEquals(2, self.loaded.count('os'))
+
+  def test_threads(self):
+    m = self.module
+    results = []
+    def run():
+      for _ in range(100):
+        results.append(m.os)
+        try:
+          m.missing_pkg
+        except ImportError:
+          results.append(None)
+    threads = [threading.Thread(target=run) for _ in range(8)]
+    for t in threads:
+      t.start()
+    for t in threads:
+      t.join()
+    self.assertEquals(800, results.count(os))
+    self.assertEquals(800, results.count(None))
+    # concurrent misses may load more than once, but not per access
+    self.assert_(len(self.loaded) <= 16)
@@ -47,3 +47,22 @@ def test_interactive():
         roslib.set_interactive(v)        
         assert v == roslib.is_interactive()
         
+
+def test_lazy_import():
+    import subprocess
+    import roslib
+    if sys.version_info < (3, 7):
+        return # no module __getattr__, roslib.stacks is imported eagerly
+    script = "import sys, roslib; print(sorted(m for m in ['rospkg', 'roslib.stacks'] if m in sys.modules))"
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(sys.path))
+    out = subprocess.check_output([sys.executable, '-c', script], env=env)
+    assert out.strip() == b'[]', out
+    import roslib.stacks
+    assert roslib.stacks is roslib.__getattr__('stacks')
+    for name in roslib._LAZY_SUBMODULES:
+        assert getattr(roslib, name).__name__ == 'roslib.'+name
+    try:
+        roslib.no_such_module
+        assert False, "should have raised AttributeError"
+    except AttributeError:
+        pass
@@ -0,0 +1,224 @@
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2012, Willow Garage, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+#
+#  * Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+#  * Redistributions in binary form must reproduce the above
+#    copyright notice, this list of conditions and the following
+#    disclaimer in the documentation and/or other materials provided
+#    with the distribution.
+#  * Neither the name of Willow Garage, Inc. nor the names of its
+#    contributors may be used to endorse or promote products derived
+#    from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE
+# COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT
+# LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN
+# ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+
+import os
+import stat
+import struct
+import threading
+import time
+import unittest
+
+try:
+  import asyncio
+  import roslib.aio
+except (ImportError, SyntaxError):
+  # roslib.aio requires Python 3
+  asyncio = None
+
+import roslib.exceptions
+import roslib.network
+import roslib.packages
+import roslib.stacks
+from roslib.network import ROSHandshakeException
+
+from workspace_fixture import WorkspaceTest
+
+HEADER = {'callerid': '/talker', 'topic': '/chatter', 'md5sum': '*', 'message_definition': 'string data\n'}
+
+@unittest.skipIf(asyncio is None, "requires asyncio")
+class AioHandshakeTest(unittest.TestCase):
+
+  def setUp(self):
+    self.loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(self.loop)
+
+  def tearDown(self):
+    asyncio.set_event_loop(None)
+    self.loop.close()
+
+  def _read(self, data, **kwds):
+    reader = asyncio.StreamReader()
+    reader.feed_data(data)
+    reader.feed_eof()
+    return self.loop.run_until_complete(roslib.aio.read_ros_handshake_header(reader, **kwds))
+
+  def test_read_ros_handshake_header(self):
+    encoded = roslib.network.encode_ros_handshake_header(HEADER)
+    self.assertEqual(HEADER, self._read(encoded))
+    self.assertEqual(HEADER, self._read(encoded + b'payload'))
+    self.assertEqual(HEADER, self._read(encoded, max_size=len(encoded) - 4))
+
+  def test_read_ros_handshake_header_errors(self):
+    encoded = roslib.network.encode_ros_handshake_header(HEADER)
+    for data, received in [(b'', 0), (encoded[:2], 2), (encoded[:10], 10)]:
+      try:
+        self._read(data)
+        self.fail("should have raised")
+      except ROSHandshakeException as e:
+        self.assertTrue('%s bytes were received'%received in str(e), str(e))
+    self.assertRaises(ROSHandshakeException, self._read, b'\xff\xff\xff\xff')
+    self.assertRaises(ROSHandshakeException, self._read, encoded, max_size=len(encoded) - 5)
+    bad = struct.pack('<I', 8) + struct.pack('<I', 4) + b'abcd'
+    self.assertRaises(ROSHandshakeException, self._read, bad)
+
+  def test_loopback(self):
+    received = []
+    def connected(reader, writer):
+      async_header = roslib.aio.read_ros_handshake_header(reader)
+      def done(f):
+        received.append(f.result())
+        writer.close()
+      self.loop.create_task(async_header).add_done_callback(done)
+    server = self.loop.run_until_complete(asyncio.start_server(connected, '127.0.0.1', 0))
+    try:
+      port = server.sockets[0].getsockname()[1]
+      reader, writer = self.loop.run_until_complete(asyncio.open_connection('127.0.0.1', port))
+      n = self.loop.run_until_complete(roslib.aio.write_ros_handshake_header(writer, HEADER))
+      self.assertEqual(len(roslib.network.encode_ros_handshake_header(HEADER)), n)
+      self.loop.run_until_complete(reader.read())
+      writer.close()
+      self.assertEqual([HEADER], received)
+    finally:
+      server.close()
+      self.loop.run_until_complete(server.wait_closed())
+
+@unittest.skipIf(asyncio is None, "requires asyncio")
+class AioQueryTest(WorkspaceTest):
+
+  def setUp(self):
+    WorkspaceTest.setUp(self)
+    self.loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(self.loop)
+    self.bin = os.path.join(self.root, 'bin')
+    os.makedirs(self.bin)
+    # no rospack unless a test provides one
+    os.environ['PATH'] = self.bin
+    self.make_stack('stack_a')
+    self.pkg_a = self.make_pkg('stack_a/pkg_a', ['pkg_b'])
+    self.pkg_b = self.make_pkg('pkg_b')
+    self.write_rospack_cache([self.pkg_a])
+
+  def tearDown(self):
+    roslib.aio.set_executor(None)
+    asyncio.set_event_loop(None)
+    self.loop.close()
+    WorkspaceTest.tearDown(self)
+
+  def _script(self, name, output):
+    path = os.path.join(self.bin, name)
+    with open(path, 'w') as f:
+      f.write('#!/bin/sh\necho "$@" >> %s.log\necho "%s"\n'%(path, output))
+    os.chmod(path, stat.S_IRWXU)
+    return path + '.log'
+
+  def _run(self, coro):
+    return self.loop.run_until_complete(coro)
+
+  def test_get_pkg_dir(self):
+    # answered from the rospack cache file, no rospack available
+    self.assertEqual(self.pkg_a, self._run(roslib.aio.get_pkg_dir('pkg_a')))
+    self.assertEqual(None, self._run(roslib.aio.get_pkg_dir('pkg_b', required=False)))
+    self.assertRaises(roslib.packages.InvalidROSPkgException, self._run, roslib.aio.get_pkg_dir('pkg_b'))
+
+    log = self._script('rospack', self.pkg_b)
+    self.assertEqual(self.pkg_b, self._run(roslib.aio.get_pkg_dir('pkg_b')))
+    with open(log) as f:
+      self.assertEqual(['find pkg_b'], f.read().splitlines())
+    self._script('rospack', '')
+    self.assertRaises(roslib.packages.InvalidROSPkgException, self._run, roslib.aio.get_pkg_dir('pkg_c'))
+
+  def test_queries(self):
+    self.assertEqual([self.pkg_a, self.pkg_b], self._run(roslib.aio.get_pkg_dirs(['pkg_a', 'pkg_b'])))
+    self.assertEqual(['pkg_b'], [d.package for d in self._run(roslib.aio.load_manifest('pkg_a')).depends])
+    self.assertEqual(os.path.join(self.ws, 'stack_a'), self._run(roslib.aio.get_stack_dir('stack_a')))
+    self.assertRaises(roslib.stacks.InvalidROSStackException, self._run, roslib.aio.get_stack_dir('stack_b'))
+    self.assertEqual(['stack_a'], self._run(roslib.aio.list_stacks()))
+
+  def test_rospackexec(self):
+    log = self._script('rospack', 'pkg_b')
+    self.assertEqual('pkg_b', self._run(roslib.aio.rospackexec(['deps1', 'pkg_a'])))
+    self._script('rosstack', 'rosstack: no such stack')
+    self.assertRaises(roslib.exceptions.ROSLibException, self._run, roslib.aio.rosstackexec(['find', 'x']))
+    # concurrent identical commands run once
+    results = self._run(asyncio.gather(*[roslib.aio.rospackexec(['deps1', 'pkg_a']) for i in range(5)]))
+    self.assertEqual(['pkg_b'] * 5, results)
+    with open(log) as f:
+      self.assertEqual(['deps1 pkg_a'] * 2, f.read().splitlines())
+
+  def test_coalesce(self):
+    calls = []
+    release = threading.Event()
+    def get_pkg_dirs(packages, required=True):
+      calls.append(list(packages))
+      release.wait(5)
+      return ['/%s'%p for p in packages]
+    saved = roslib.packages.get_pkg_dirs
+    roslib.packages.get_pkg_dirs = get_pkg_dirs
+    try:
+      first = [asyncio.ensure_future(roslib.aio.get_pkg_dirs(['a', 'b'])) for i in range(4)]
+      other = asyncio.ensure_future(roslib.aio.get_pkg_dirs(['c']))
+      self._run(asyncio.sleep(0.05))
+      # a cancelled waiter does not cancel the shared request
+      first[0].cancel()
+      release.set()
+      results = self._run(asyncio.gather(*(first[1:] + [other])))
+      self.assertTrue(first[0].cancelled())
+      # callers get their own lists
+      results[0].append('/x')
+      again = self._run(roslib.aio.get_pkg_dirs(['a', 'b']))
+    finally:
+      roslib.packages.get_pkg_dirs = saved
+    self.assertEqual([['/a', '/b', '/x'], ['/a', '/b'], ['/a', '/b'], ['/c']], results)
+    self.assertEqual(['/a', '/b'], again)
+    # requests finished, so the last call ran again
+    self.assertEqual([['a', 'b'], ['c'], ['a', 'b']], sorted(calls[:2]) + calls[2:])
+    self.assertEqual({}, roslib.aio._inflight)
+
+  def test_executor(self):
+    from concurrent.futures import ThreadPoolExecutor
+    threads = []
+    def get_pkg_dirs(packages, required=True):
+      threads.append(threading.current_thread().name)
+      return []
+    saved = roslib.packages.get_pkg_dirs
+    roslib.packages.get_pkg_dirs = get_pkg_dirs
+    executor = ThreadPoolExecutor(1)
+    try:
+      roslib.aio.set_executor(executor)
+      self._run(roslib.aio.get_pkg_dirs(['a']))
+      self.assertEqual(1, len(threads))
+      self.assertNotEqual(threading.current_thread().name, threads[0])
+      self.assertEqual(threads[0], executor.submit(lambda: threading.current_thread().name).result())
+    finally:
+      roslib.packages.get_pkg_dirs = saved
+      executor.shutdown()
@@ -0,0 +1,183 @@
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2012, Willow Garage, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+#
+#  * Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+#  * Redistributions in binary form must reproduce the above
+#    copyright notice, this list of conditions and the following
+#    disclaimer in the documentation and/or other materials provided
+#    with the distribution.
+#  * Neither the name of Willow Garage, Inc. nor the names of its
+#    contributors may be used to endorse or promote products derived
+#    from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE
+# COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT
+# LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN
+# ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+
+import array
+import struct
+import sys
+import unittest
+
+import roslib.msgs
+import roslib.codec
+from roslib.codec import MsgCodecException
+
+POINT = "float32 x\nfloat32 y\nfloat32 z"
+STAMPED = "uint32 seq\ntime stamp\nstring frame_id"
+CLOUD = """test_codec/Stamped header
+uint32 height
+uint32 width
+test_codec/Point[] points
+uint8[] data
+bool is_dense
+float64[] intensities
+int64[3] ids
+string[] labels
+"""
+
+def _register(name, text):
+  spec = roslib.msgs.load_from_string(text, 'test_codec', 'test_codec/'+name, name)
+  roslib.msgs.register('test_codec/'+name, spec)
+  return spec
+
+class CodecTest(unittest.TestCase):
+
+  def setUp(self):
+    _register('Point', POINT)
+    _register('Stamped', STAMPED)
+    self.cloud = _register('Cloud', CLOUD)
+
+  def tearDown(self):
+    for k in [k for k in roslib.msgs.REGISTERED_TYPES if k.startswith('test_codec/')]:
+      del roslib.msgs.REGISTERED_TYPES[k]
+    roslib.msgs._bump_generation()
+
+  def test_fixed_roundtrip(self):
+    spec = roslib.msgs.load_from_string("int8 a\nuint16 b\ntime t\ntest_codec/Point p\nuint8[4] raw\nbool[2] flags\n", 'test_codec')
+    codec = roslib.codec.get_codec(spec)
+    self.assert_(codec is roslib.codec.get_codec(spec))
+    data = struct.pack('<bHIIfff4sBB', -1, 2, 3, 4, 1.5, 2.5, 3.5, b'abcd', 1, 0)
+    msg = codec.decode(data)
+    self.assertEquals(-1, msg['a'])
+    self.assertEquals(2, msg['b'])
+    self.assertEquals((3, 4), msg['t'])
+    self.assertEquals({'x': 1.5, 'y': 2.5, 'z': 3.5}, msg['p'])
+    self.assertEquals(b'abcd', msg['raw'])
+    self.assertEquals([True, False], msg['flags'])
+    self.assertEquals(data, codec.encode(msg))
+
+  def test_variable_roundtrip(self):
+    codec = roslib.codec.get_codec(self.cloud)
+    msg = {
+      'header': {'seq': 7, 'stamp': (1, 2), 'frame_id': 'base'},
+      'height': 1, 'width': 2,
+      'points': [{'x': 1.0, 'y': 2.0, 'z': 3.0}, {'x': 4.0, 'y': 5.0, 'z': 6.0}],
+      'data': b'\x00\x01\x02',
+      'is_dense': True,
+      'intensities': [0.5, 0.25],
+      'ids': [1, -2, 3],
+      'labels': ['a', 'bc'],
+      }
+    data = codec.encode(msg)
+    expected = struct.pack('<IIII', 7, 1, 2, 4) + b'base' + struct.pack('<II', 1, 2) + \
+        struct.pack('<Ifff', 2, 1, 2, 3) + struct.pack('<fff', 4, 5, 6) + \
+        struct.pack('<I', 3) + b'\x00\x01\x02' + struct.pack('<B', 1) + \
+        struct.pack('<Idd', 2, 0.5, 0.25) + struct.pack('<qqq', 1, -2, 3) + \
+        struct.pack('<II', 2, 1) + b'a' + struct.pack('<I', 2) + b'bc'
+    self.assertEquals(expected, data)
+
+    decoded = codec.decode(data)
+    self.assertEquals(msg['header'], decoded['header'])
+    self.assertEquals(msg['points'], decoded['points'])
+    self.assertEquals(msg['data'], decoded['data'])
+    self.assert_(decoded['is_dense'] is True)
+    self.assert_(isinstance(decoded['intensities'], array.array))
+    self.assertEquals(msg['intensities'], list(decoded['intensities']))
+    self.assertEquals(msg['ids'], decoded['ids'])
+    self.assertEquals(msg['labels'], decoded['labels'])
+    self.assertEquals(data, codec.encode(decoded))
+
+  def test_errors(self):
+    codec = roslib.codec.get_codec(roslib.msgs.get_registered('test_codec/Stamped'))
+    data = codec.encode({'seq': 1, 'stamp': (0, 0), 'frame_id': 'frame'})
+    for bad in [data[:-1], data[:4], data + b'\x00']:
+      try:
+        codec.decode(bad)
+        self.fail("decode should have failed on %r"%bad)
+      except MsgCodecException: pass
+    try:
+      codec.encode({'seq': 1})
+      self.fail("encode should have failed on missing fields")
+    except MsgCodecException: pass
+    spec = roslib.msgs.load_from_string("int32[2] pair", 'test_codec')
+    try:
+      roslib.codec.get_codec(spec).encode({'pair': [1, 2, 3]})
+      self.fail("encode should have failed on wrong fixed array length")
+    except MsgCodecException: pass
+
+  def test_header(self):
+    # Header resolves to std_msgs/Header even if std_msgs is not installed
+    spec = roslib.msgs.load_from_string("Header header\nint32 a", 'test_codec')
+    codec = roslib.codec.get_codec(spec)
+    msg = {'header': {'seq': 1, 'stamp': (2, 3), 'frame_id': 'f'}, 'a': -4}
+    data = codec.encode(msg)
+    self.assertEquals(struct.pack('<IIII', 1, 2, 3, 1) + b'f' + struct.pack('<i', -4), data)
+    self.assertEquals(msg, codec.decode(data))
+    spec = roslib.msgs.load_from_string("roslib/Header[] headers", 'test_codec')
+    data = struct.pack('<IIIII', 1, 1, 2, 3, 0)
+    self.assertEquals({'headers': [{'seq': 1, 'stamp': (2, 3), 'frame_id': ''}]}, roslib.codec.get_codec(spec).decode(data))
+
+  def test_reregister(self):
+    spec = roslib.msgs.load_from_string("test_codec/Point p", 'test_codec')
+    codec = roslib.codec.get_codec(spec)
+    self.assertEquals(12, len(codec.encode({'p': {'x': 0, 'y': 0, 'z': 0}})))
+    _register('Point', "float64 x\nfloat64 y")
+    codec = roslib.codec.get_codec(spec)
+    self.assertEquals(struct.pack('<dd', 1, 2), codec.encode({'p': {'x': 1, 'y': 2}}))
+
+  def test_full_text(self):
+    sep = '='*80
+    text = "Header header\nPoint[] points\ngeometry_msgs/Point32 origin\n" + \
+        sep + "\nMSG: std_msgs/Header\nuint32 seq\ntime stamp\nstring frame_id\n" + \
+        sep + "\nMSG: other_msgs/Point\nint16 x\n" + \
+        sep + "\nMSG: geometry_msgs/Point32\nfloat32 x\nfloat32 y\nfloat32 z\n"
+    spec, types = roslib.codec.load_full_text(text, 'other_msgs/Cloud')
+    self.assertEquals('other_msgs/Cloud', spec.full_name)
+    self.assertEquals(['geometry_msgs/Point32', 'other_msgs/Cloud', 'other_msgs/Point', 'std_msgs/Header'], sorted(types))
+    self.assert_(not roslib.msgs.is_registered('other_msgs/Point'))
+
+    codec = roslib.codec.get_codec_from_full_text(text, 'other_msgs/Cloud')
+    self.assert_(codec is roslib.codec.get_codec_from_full_text(text, 'other_msgs/Cloud'))
+    msg = {'header': {'seq': 1, 'stamp': (2, 3), 'frame_id': ''},
+           'points': [{'x': -1}, {'x': 2}],
+           'origin': {'x': 0.5, 'y': 1.5, 'z': 2.5}}
+    data = codec.encode(msg)
+    self.assertEquals(struct.pack('<IIIII', 1, 2, 3, 0, 2) + struct.pack('<hh', -1, 2) + struct.pack('<fff', 0.5, 1.5, 2.5), data)
+    self.assertEquals(msg, codec.decode(data))
+
+    # types missing from the text fall back to the registry
+    codec = roslib.codec.get_codec_from_full_text("test_codec/Point p", 'other_msgs/Wrapper')
+    self.assertEquals(struct.pack('<fff', 1, 2, 3), codec.encode({'p': {'x': 1, 'y': 2, 'z': 3}}))
+    for bad in ["int32 a\n" + sep + "\nint32 b", "int32 a\n" + sep + "\n" + sep + "\nMSG: a/B\nint32 b"]:
+      try:
+        roslib.codec.get_codec_from_full_text(bad, 'other_msgs/Bad')
+        self.fail("should have failed on %r"%bad)
+      except roslib.msgs.MsgSpecException: pass
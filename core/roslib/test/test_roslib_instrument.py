@@ -0,0 +1,152 @@
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2012, Willow Garage, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+#
+#  * Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+#  * Redistributions in binary form must reproduce the above
+#    copyright notice, this list of conditions and the following
+#    disclaimer in the documentation and/or other materials provided
+#    with the distribution.
+#  * Neither the name of Willow Garage, Inc. nor the names of its
+#    contributors may be used to endorse or promote products derived
+#    from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE
+# COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT
+# LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN
+# ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import unittest
+
+import roslib.instrument
+import roslib.packages
+
+@roslib.instrument.timed('test.spawn')
+def spawn(code):
+  p = roslib.instrument.Popen([sys.executable, '-c', code], stdout=subprocess.PIPE)
+  return p.communicate()[0]
+
+@roslib.instrument.timed('test.outer')
+def outer():
+  return inner() + 1
+
+@roslib.instrument.timed('test.inner')
+def inner():
+  return 1
+
+class InstrumentTest(unittest.TestCase):
+
+  def setUp(self):
+    self.root = tempfile.mkdtemp()
+    roslib.instrument.reset()
+
+  def tearDown(self):
+    roslib.instrument.disable()
+    roslib.instrument.reset()
+    shutil.rmtree(self.root)
+
+  def test_disabled(self):
+    self.failIf(roslib.instrument.is_enabled())
+    self.assertEquals(2, outer())
+    roslib.instrument.count('test.counter')
+    roslib.instrument.cache_access('test.cache', True)
+    spawn('pass')
+    report = roslib.instrument.get_report()
+    self.assertEquals({'calls': {}, 'caches': {}, 'counters': {}, 'subprocesses': []}, report)
+
+  def test_calls(self):
+    roslib.instrument.enable()
+    self.assert_(roslib.instrument.is_enabled())
+    for i in range(3):
+      self.assertEquals(2, outer())
+    roslib.instrument.count('test.counter')
+    roslib.instrument.count('test.counter', 2)
+    for hit in [True, True, True, False]:
+      roslib.instrument.cache_access('test.cache', hit)
+    report = roslib.instrument.get_report()
+    self.assertEquals(3, report['calls']['test.outer']['count'])
+    self.assertEquals(3, report['calls']['test.inner']['count'])
+    self.assert_(report['calls']['test.outer']['time'] >= report['calls']['test.inner']['time'])
+    self.assertEquals({'test.counter': 3}, report['counters'])
+    self.assertEquals({'hits': 3, 'misses': 1, 'ratio': 0.75}, report['caches']['test.cache'])
+    # wrapped functions keep their identity
+    self.assertEquals('outer', outer.__name__)
+
+    roslib.instrument.reset()
+    self.assertEquals({}, roslib.instrument.get_report()['calls'])
+
+  def test_subprocess(self):
+    roslib.instrument.enable()
+    self.assertEquals(b'x', spawn('import sys; sys.stdout.write("x"); sys.exit(3)'))
+    self.assertRaises(OSError, roslib.instrument.Popen, [os.path.join(self.root, 'missing')])
+    first, second = roslib.instrument.get_report()['subprocesses']
+    self.assertEquals([sys.executable, '-c', 'import sys; sys.stdout.write("x"); sys.exit(3)'], first['args'])
+    self.assertEquals('test.spawn', first['caller'])
+    self.assertEquals(3, first['returncode'])
+    self.assert_(first['time'] > 0.)
+    self.assertEquals(None, second['caller'])
+    self.assert_('error' in second)
+
+  def test_pkg_dir_cache(self):
+    d = os.path.join(self.root, 'pkg_a')
+    os.makedirs(d)
+    with open(os.path.join(d, 'manifest.xml'), 'w') as f:
+      f.write('<package></package>')
+    env = dict([(k, os.environ.get(k)) for k in ['ROS_ROOT', 'ROS_PACKAGE_PATH']])
+    cache = dict(roslib.packages._pkg_dir_cache)
+    try:
+      os.environ['ROS_ROOT'] = os.path.join(self.root, 'no_root')
+      os.environ['ROS_PACKAGE_PATH'] = self.root
+      roslib.packages._pkg_dir_cache.clear()
+      roslib.instrument.enable()
+      self.assertEquals([d, None], roslib.packages.get_pkg_dirs(['pkg_a', 'pkg_missing'], required=False))
+    finally:
+      for k, v in env.items():
+        if v is None:
+          os.environ.pop(k, None)
+        else:
+          os.environ[k] = v
+      roslib.packages._pkg_dir_cache.clear()
+      roslib.packages._pkg_dir_cache.update(cache)
+    report = roslib.instrument.get_report()
+    self.assertEquals(1, report['calls']['packages.get_pkg_dirs']['count'])
+    self.assertEquals(2, report['caches']['packages.pkg_dir']['misses'])
+
+  def test_dump(self):
+    filename = os.path.join(self.root, 'report.json')
+    roslib.instrument.enable()
+    outer()
+    roslib.instrument.dump(filename)
+    with open(filename) as f:
+      self.assertEquals(1, json.load(f)['calls']['test.inner']['count'])
+
+  def test_env(self):
+    filename = os.path.join(self.root, 'report.json')
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(sys.path))
+    env[roslib.instrument.INSTRUMENT_ENV] = filename
+    script = "import roslib.instrument as i; i.count('test.env'); print(i.is_enabled())"
+    out = subprocess.Popen([sys.executable, '-c', script], env=env, stdout=subprocess.PIPE).communicate()[0]
+    self.assertEquals(b'True', out.strip())
+    with open(filename) as f:
+      self.assertEquals({'test.env': 1}, json.load(f)['counters'])
@@ -0,0 +1,220 @@
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2012, Willow Garage, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+#
+#  * Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+#  * Redistributions in binary form must reproduce the above
+#    copyright notice, this list of conditions and the following
+#    disclaimer in the documentation and/or other materials provided
+#    with the distribution.
+#  * Neither the name of Willow Garage, Inc. nor the names of its
+#    contributors may be used to endorse or promote products derived
+#    from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE
+# COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT
+# LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN
+# ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+
+import os
+import shutil
+import sys
+import tempfile
+import time
+import unittest
+
+import rospkg
+import roslib.launcher
+
+class Crawled(Exception):
+  pass
+
+class FailingRosPack(object):
+  def __getattr__(self, name):
+    raise Crawled(name)
+
+class PythonPathCacheTest(unittest.TestCase):
+
+  def setUp(self):
+    self.ws = tempfile.mkdtemp()
+    self._make_pkg('a', '<depend package="b"/>', 'src')
+    self._make_pkg('b', '<export><python path="${prefix}/py"/></export>', None)
+    self.rospack = rospkg.RosPack(ros_paths=[self.ws])
+    self.cache_file = os.path.join(self.ws, 'cache', 'python_path.json')
+    self._saved = (os.environ.get(roslib.launcher.PYTHON_PATH_CACHE_ENV), set(roslib.launcher._bootstrapped))
+    os.environ[roslib.launcher.PYTHON_PATH_CACHE_ENV] = self.cache_file
+    self._reset()
+
+  def tearDown(self):
+    env, bootstrapped = self._saved
+    if env is None:
+      del os.environ[roslib.launcher.PYTHON_PATH_CACHE_ENV]
+    else:
+      os.environ[roslib.launcher.PYTHON_PATH_CACHE_ENV] = env
+    self._reset(bootstrapped)
+    shutil.rmtree(self.ws)
+
+  def _reset(self, bootstrapped=()):
+    roslib.launcher._bootstrapped.clear()
+    roslib.launcher._bootstrapped.update(bootstrapped)
+
+  def _make_pkg(self, name, body, subdir):
+    d = os.path.join(self.ws, name)
+    os.makedirs(d)
+    with open(os.path.join(d, 'manifest.xml'), 'w') as f:
+      f.write('<package>%s</package>'%body)
+    if subdir:
+      os.makedirs(os.path.join(d, subdir))
+
+  def _touch(self, path):
+    # mtime resolution of some filesystems is coarse
+    t = os.stat(path).st_mtime + 10
+    os.utime(path, (t, t))
+
+  def test_cache(self):
+    from roslib.launcher import _load_python_path
+    a, b = os.path.join(self.ws, 'a'), os.path.join(self.ws, 'b')
+    expected = [os.path.join(b, 'py'), os.path.join(a, 'src')]
+    self.assertEquals(expected, _load_python_path('a', self.rospack))
+    self.assert_(os.path.isfile(self.cache_file))
+    self.assertEquals(['a', 'b'], sorted(roslib.launcher._bootstrapped))
+    self.assertEquals([], _load_python_path('a', self.rospack))
+
+    # cache hit does not crawl the dependencies
+    self._reset()
+    self.assertEquals(expected, _load_python_path('a', FailingRosPack()))
+    self.assertEquals(['a', 'b'], sorted(roslib.launcher._bootstrapped))
+    for p in list(roslib.launcher._bootstrapped) + expected:
+      self.assert_(isinstance(p, str))
+
+    # new lib dir in a dependency invalidates the entry
+    self._reset()
+    os.makedirs(os.path.join(b, 'lib'))
+    self._touch(b)
+    self.assertRaises(Crawled, _load_python_path, 'a', FailingRosPack())
+    self._reset()
+    self.assertEquals(expected, _load_python_path('a', rospkg.RosPack(ros_paths=[self.ws])))
+
+    # changed manifest
+    self._reset()
+    with open(os.path.join(a, 'manifest.xml'), 'w') as f:
+      f.write('<package></package>')
+    self._touch(os.path.join(a, 'manifest.xml'))
+    self.assertEquals([os.path.join(a, 'src')], _load_python_path('a', rospkg.RosPack(ros_paths=[self.ws])))
+    self.assertEquals(set(['a']), roslib.launcher._bootstrapped)
+
+  def test_corrupt_and_disabled(self):
+    from roslib.launcher import _load_python_path
+    os.makedirs(os.path.dirname(self.cache_file))
+    with open(self.cache_file, 'w') as f:
+      f.write('{not json')
+    self.assertEquals(2, len(_load_python_path('a', self.rospack)))
+    self._reset()
+    self.assertEquals(2, len(_load_python_path('a', FailingRosPack())))
+
+    os.environ[roslib.launcher.PYTHON_PATH_CACHE_ENV] = ''
+    self.assertEquals(None, roslib.launcher.get_python_path_cache_file())
+    self._reset()
+    self.assertRaises(Crawled, _load_python_path, 'a', FailingRosPack())
+
+  def test_cache_file(self):
+    from roslib.launcher import get_python_path_cache_file
+    env = {'ROS_HOME': '/tmp/ros_home', 'ROS_PACKAGE_PATH': '/opt/a:/opt/b'}
+    f = get_python_path_cache_file(env)
+    self.assert_(f.startswith('/tmp/ros_home'))
+    self.assertEquals(f, get_python_path_cache_file(dict(env)))
+    self.assertNotEquals(f, get_python_path_cache_file(dict(env, ROS_PACKAGE_PATH='/opt/a')))
+    self.assertEquals('/tmp/x.json', get_python_path_cache_file(dict(env, ROS_PYTHON_PATH_CACHE='/tmp/x.json')))
+
+class SysPathTest(unittest.TestCase):
+
+  def setUp(self):
+    self.ws = tempfile.mkdtemp()
+    self.dirs = []
+    for d, modules in [('high', ['shadowed', 'only_high']), ('low', ['shadowed', 'only_low'])]:
+      d = os.path.join(self.ws, d)
+      os.makedirs(d)
+      for m in modules:
+        os.makedirs(os.path.join(d, m))
+        with open(os.path.join(d, m, '__init__.py'), 'w') as f:
+          f.write('ORIGIN = %r\n'%d)
+      with open(os.path.join(d, 'mod_%s.py'%os.path.basename(d)), 'w') as f:
+        f.write('ORIGIN = %r\n'%d)
+      self.dirs.append(d)
+    self._saved = (list(sys.path), list(roslib.launcher._added_paths), list(sys.meta_path))
+
+  def tearDown(self):
+    roslib.launcher.disable_import_finder()
+    sys.path[:], roslib.launcher._added_paths[:], sys.meta_path[:] = self._saved
+    for m in ['shadowed', 'only_high', 'only_low', 'mod_high', 'mod_low']:
+      sys.modules.pop(m, None)
+    shutil.rmtree(self.ws)
+
+  def test_insert_paths(self):
+    from roslib.launcher import _insert_paths
+    high, low = self.dirs
+    path = sys.path
+    before = list(sys.path)
+    _insert_paths([low, low])
+    self.assert_(path is sys.path)
+    self.assertEquals([low] + before, sys.path)
+    _insert_paths([high, low, high])
+    self.assertEquals([high, low] + before, sys.path)
+    _insert_paths([])
+    self.assertEquals([high, low] + before, sys.path)
+
+  def test_import_finder(self):
+    from roslib.launcher import _insert_paths
+    high, low = self.dirs
+    _insert_paths([low])
+    finder = roslib.launcher.enable_import_finder()
+    self.assert_(finder is roslib.launcher.enable_import_finder())
+    self.assert_(sys.meta_path[0] is finder)
+    self.assertEquals(low, finder.get_path('shadowed'))
+    _insert_paths([high])
+    self.assertEquals(high, finder.get_path('shadowed'))
+    self.assertEquals(low, finder.get_path('only_low'))
+    self.assertEquals(high, finder.get_path('mod_high'))
+    self.assertEquals(None, finder.get_path('os'))
+
+    # the finder resolves imports without consulting sys.path
+    sys.path[:] = [p for p in sys.path if p not in self.dirs]
+    import shadowed, only_low, mod_high
+    self.assertEquals(high, shadowed.ORIGIN)
+    self.assertEquals(low, only_low.ORIGIN)
+    self.assertEquals(high, mod_high.ORIGIN)
+
+    roslib.launcher.disable_import_finder()
+    self.assert_(finder not in sys.meta_path)
+    sys.modules.pop('only_high', None)
+    try:
+      import only_high
+      self.fail("only_high should not be importable")
+    except ImportError: pass
+
+class RosPackTest(unittest.TestCase):
+
+  def test_get_rospack(self):
+    saved = roslib.launcher._rospack
+    try:
+      roslib.launcher._rospack = None
+      rospack = roslib.launcher._get_rospack()
+      self.assert_(isinstance(rospack, rospkg.RosPack))
+      self.assert_(rospack is roslib.launcher._get_rospack())
+    finally:
+      roslib.launcher._rospack = saved
@@ -0,0 +1,108 @@
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2012, Willow Garage, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+#
+#  * Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+#  * Redistributions in binary form must reproduce the above
+#    copyright notice, this list of conditions and the following
+#    disclaimer in the documentation and/or other materials provided
+#    with the distribution.
+#  * Neither the name of Willow Garage, Inc. nor the names of its
+#    contributors may be used to endorse or promote products derived
+#    from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE
+# COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT
+# LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN
+# ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+
+import threading
+import unittest
+
+import genpy.message
+import roslib.launcher
+import roslib.message
+
+class FakeClass(object):
+  pass
+
+class ClassCacheTest(unittest.TestCase):
+
+  def setUp(self):
+    self.calls = []
+    self.manifests = []
+    self.available = {'foo_msgs/A': FakeClass, 'bar_msgs/B': FakeClass, 'std_msgs/Header': FakeClass}
+    self.lock = threading.Lock()
+    self._saved = (genpy.message.get_message_class, genpy.message.get_service_class,
+                   roslib.message._get_message_or_service_class, roslib.launcher.load_manifest)
+    def genpy_loader(type_name, reload_on_error=False):
+      with self.lock:
+        self.calls.append(type_name)
+      return self.available.get(type_name)
+    genpy.message.get_message_class = genpy_loader
+    genpy.message.get_service_class = genpy_loader
+    roslib.message._get_message_or_service_class = lambda type_str, type_name, reload_on_error=False: None
+    roslib.launcher.load_manifest = self.manifests.append
+    roslib.message.invalidate_message_class()
+    roslib.message.invalidate_service_class()
+
+  def tearDown(self):
+    genpy.message.get_message_class, genpy.message.get_service_class, \
+        roslib.message._get_message_or_service_class, roslib.launcher.load_manifest = self._saved
+    roslib.message.invalidate_message_class()
+    roslib.message.invalidate_service_class()
+
+  def test_negative_cache(self):
+    from roslib.message import get_message_class, get_service_class
+    self.assert_(get_message_class('foo_msgs/A') is FakeClass)
+    self.assert_(get_message_class('foo_msgs/A') is FakeClass)
+    self.assertEquals(None, get_message_class('foo_msgs/Missing'))
+    self.assertEquals(None, get_message_class('foo_msgs/Missing'))
+    self.assertEquals(['foo_msgs/A', 'foo_msgs/Missing'], self.calls)
+
+    # type has been built
+    self.available['foo_msgs/Missing'] = FakeClass
+    self.assertEquals(None, get_message_class('foo_msgs/Missing'))
+    roslib.message.invalidate_message_class('foo_msgs/Missing')
+    self.assert_(get_message_class('foo_msgs/Missing') is FakeClass)
+    # reload_on_error always retries
+    self.assertEquals(None, get_message_class('foo_msgs/Other'))
+    self.available['foo_msgs/Other'] = FakeClass
+    self.assert_(get_message_class('foo_msgs/Other', reload_on_error=True) is FakeClass)
+
+    self.assertEquals(None, get_service_class('foo_srvs/S'))
+    self.assertEquals(None, get_service_class('foo_srvs/S'))
+    self.assertEquals(1, self.calls.count('foo_srvs/S'))
+    self.available['foo_srvs/S'] = FakeClass
+    roslib.message.invalidate_service_class()
+    self.assert_(get_service_class('foo_srvs/S') is FakeClass)
+
+  def test_preload(self):
+    types = ['foo_msgs/A', 'bar_msgs/B', 'foo_msgs/Missing', 'Header']
+    classes = roslib.message.preload_message_classes(types, max_workers=4)
+    self.assertEquals({'foo_msgs/A': FakeClass, 'bar_msgs/B': FakeClass, 'foo_msgs/Missing': None,
+                       'Header': None}, classes)
+    self.assertEquals(['bar_msgs', 'foo_msgs', 'std_msgs'], self.manifests)
+    del self.calls[:]
+    for t in types:
+      roslib.message.get_message_class(t)
+    self.assertEquals([], self.calls)
+    try:
+      roslib.message.preload_message_classes(['NoPackage'])
+      self.fail("should have raised ValueError")
+    except ValueError: pass
@@ -0,0 +1,355 @@
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2012, Willow Garage, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+#
+#  * Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+#  * Redistributions in binary form must reproduce the above
+#    copyright notice, this list of conditions and the following
+#    disclaimer in the documentation and/or other materials provided
+#    with the distribution.
+#  * Neither the name of Willow Garage, Inc. nor the names of its
+#    contributors may be used to endorse or promote products derived
+#    from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE
+# COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT
+# LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN
+# ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+
+import os
+import shutil
+import struct
+import sys
+import tempfile
+import unittest
+
+import roslib.msgs
+import roslib.packages
+
+HEADER_MSG = "uint32 seq\ntime stamp\nstring frame_id\n"
+
+def write_package(root, package, subdir, files):
+  d = os.path.join(root, package, subdir)
+  if not os.path.isdir(d):
+    os.makedirs(d)
+  for name, text in files.items():
+    with open(os.path.join(d, name), 'w') as f:
+      f.write(text)
+
+class MsgWorkspaceTest(unittest.TestCase):
+  """
+  Base class for tests that load message files from a temporary
+  workspace. roslib.packages.get_pkg_dir(s) are pointed at the
+  workspace and the message registry is reset around each test.
+  """
+
+  def setUp(self):
+    self.root = tempfile.mkdtemp()
+    write_package(self.root, 'std_msgs', 'msg', {'Header.msg': HEADER_MSG})
+    self.get_pkg_dir_calls = []
+    self.get_pkg_dirs_calls = []
+    # get_pkg_subdir() reads ROS_ROOT even though get_pkg_dir is replaced
+    self._ros_root = os.environ.get('ROS_ROOT')
+    os.environ['ROS_ROOT'] = self.root
+    self._get_pkg_dir = roslib.packages.get_pkg_dir
+    self._get_pkg_dirs = roslib.packages.get_pkg_dirs
+    roslib.packages.get_pkg_dir = self.get_pkg_dir
+    roslib.packages.get_pkg_dirs = self.get_pkg_dirs
+    roslib.msgs.reinit()
+
+  def tearDown(self):
+    roslib.msgs.reinit()
+    roslib.packages.get_pkg_dir = self._get_pkg_dir
+    roslib.packages.get_pkg_dirs = self._get_pkg_dirs
+    roslib.msgs.REGISTERED_TYPES.clear()
+    roslib.msgs._initialized = False
+    if self._ros_root is None:
+      del os.environ['ROS_ROOT']
+    else:
+      os.environ['ROS_ROOT'] = self._ros_root
+    shutil.rmtree(self.root)
+
+  def get_pkg_dir(self, package, required=True, ros_root=None, ros_package_path=None):
+    self.get_pkg_dir_calls.append(package)
+    d = os.path.join(self.root, package)
+    if not os.path.isdir(d):
+      if required:
+        raise roslib.packages.InvalidROSPkgException(package)
+      return None
+    return d
+
+  def get_pkg_dirs(self, packages, required=True):
+    self.get_pkg_dirs_calls.append(list(packages))
+    return [self.get_pkg_dir(p, required) for p in packages]
+
+class GetPkgsMsgSpecsTest(MsgWorkspaceTest):
+
+  def setUp(self):
+    MsgWorkspaceTest.setUp(self)
+    write_package(self.root, 'pkg_a', 'msg', dict([('T%02d.msg'%i, 'int32 x%d\n'%i) for i in range(20)]))
+    write_package(self.root, 'pkg_a', 'msg', {'Broken.msg': 'not a valid line\n'})
+    write_package(self.root, 'pkg_b', 'msg', {'Cloud.msg': 'std_msgs/Header header\nfloat32[] data\n'})
+    os.makedirs(os.path.join(self.root, 'pkg_c'))
+
+  def _check(self, max_workers):
+    del self.get_pkg_dir_calls[:]
+    del self.get_pkg_dirs_calls[:]
+    specs, failures = roslib.msgs.get_pkgs_msg_specs(['pkg_b', 'pkg_c', 'pkg_a'], max_workers=max_workers)
+    names = [name for name, spec in specs]
+    # package directories are resolved in one batch, not once per message
+    self.assertEquals([['pkg_b', 'pkg_c', 'pkg_a']], self.get_pkg_dirs_calls)
+    self.assertEquals(['pkg_b', 'pkg_c', 'pkg_a'], self.get_pkg_dir_calls)
+    self.assertEquals('pkg_b/Cloud', names[0])
+    self.assertEquals(sorted(names[1:]), sorted(['pkg_a/T%02d'%i for i in range(20)]))
+    # listing order is kept within a package
+    self.assertEquals([n[len('pkg_a/'):] for n in names[1:]],
+                      [t for t in roslib.msgs.list_msg_types('pkg_a', False) if t != 'Broken'])
+    self.assertEquals(['Broken'], failures)
+    self.assertEquals('int32', dict(specs)['pkg_a/T07'].types[0])
+    return specs, failures
+
+  def test_get_pkgs_msg_specs(self):
+    threaded = self._check(None)
+    self.assertEquals(threaded, self._check(1))
+    executor = roslib.msgs.ThreadPoolExecutor
+    try:
+      roslib.msgs.ThreadPoolExecutor = None
+      self.assertEquals(threaded, self._check(8))
+    finally:
+      roslib.msgs.ThreadPoolExecutor = executor
+    self.assertEquals((threaded[0][:1], []), roslib.msgs.get_pkg_msg_specs('pkg_b'))
+    self.assertRaises(roslib.packages.InvalidROSPkgException, roslib.msgs.get_pkgs_msg_specs, ['pkg_a', 'missing'])
+
+  def test_map_threaded(self):
+    def fail(i):
+      if i == 3:
+        raise ValueError(i)
+      return i * 2
+    self.assertEquals([i * 2 for i in range(50)], roslib.msgs.map_threaded(lambda i: i * 2, range(50), 4))
+    self.assertEquals([], roslib.msgs.map_threaded(fail, []))
+    self.assertRaises(ValueError, roslib.msgs.map_threaded, fail, range(10), 4)
+    self.assertEquals((6, None), roslib.msgs.try_load(lambda path, pkg: len(path + pkg), 'abc', 'pkg'))
+    result, e = roslib.msgs.try_load(lambda path, pkg: fail(3), 'abc', 'pkg')
+    self.assertEquals(None, result)
+    self.assert_(isinstance(e, ValueError))
+
+class LazyRegistryTest(MsgWorkspaceTest):
+
+  def setUp(self):
+    MsgWorkspaceTest.setUp(self)
+    write_package(self.root, 'pkg_a', 'msg', {
+      'Point.msg': 'float32 x\nfloat32 y\n',
+      'Stamped.msg': 'Header header\nPoint p\n',
+      'Broken.msg': 'not a valid line\n',
+      })
+    self.parsed = []
+    self._load_from_file = roslib.msgs.load_from_file
+    def load_from_file(path, package_context=''):
+      self.parsed.append(os.path.basename(path))
+      return self._load_from_file(path, package_context)
+    roslib.msgs.load_from_file = load_from_file
+
+  def tearDown(self):
+    roslib.msgs.load_from_file = self._load_from_file
+    MsgWorkspaceTest.tearDown(self)
+
+  def test_load_package_is_lazy(self):
+    roslib.msgs.load_package('pkg_a')
+    self.assertEquals([], self.parsed)
+    self.assert_(roslib.msgs.is_registered('pkg_a/Point'))
+    self.assertEquals(['Point.msg'], self.parsed)
+    # the package-prefixed alias shares the parsed spec
+    self.assert_(roslib.msgs.get_registered('pkg_a/pkg_a/Point') is roslib.msgs.get_registered('pkg_a/Point'))
+    self.assertEquals(['Point.msg'], self.parsed)
+    # loading a package again does not list or parse anything
+    roslib.msgs.load_package('pkg_a')
+    self.assertEquals(['Point.msg'], self.parsed)
+
+  def test_get_registered_default_package(self):
+    roslib.msgs.load_package('pkg_a')
+    spec = roslib.msgs.get_registered('Stamped', default_package='pkg_a')
+    self.assertEquals(['Stamped.msg'], self.parsed)
+    self.assertEquals(['header', 'p'], spec.names)
+    self.assertRaises(KeyError, roslib.msgs.get_registered, 'Missing', 'pkg_a')
+    self.assertRaises(KeyError, roslib.msgs.get_registered, 'pkg_a/Missing')
+
+  def test_bad_msg(self):
+    roslib.msgs.load_package('pkg_a')
+    self.failIf(roslib.msgs.is_registered('pkg_a/Broken'))
+    self.assertEquals(['Broken.msg'], self.parsed)
+    # the failure is reported once, not on every lookup
+    self.failIf(roslib.msgs.is_registered('pkg_a/Broken'))
+    self.failIf(roslib.msgs.is_registered('pkg_a/pkg_a/Broken'))
+    self.assertEquals(['Broken.msg'], self.parsed)
+
+  def test_reinit_clears_pending(self):
+    roslib.msgs.load_package('pkg_a')
+    roslib.msgs.reinit()
+    self.failIf(roslib.msgs.is_registered('pkg_a/Point'))
+    self.assertEquals(['Header.msg'], self.parsed)
+    # package can be loaded again after reinit()
+    roslib.msgs.load_package('pkg_a')
+    self.assert_(roslib.msgs.is_registered('pkg_a/Point'))
+
+class EmbeddingTypesTest(MsgWorkspaceTest):
+
+  def setUp(self):
+    MsgWorkspaceTest.setUp(self)
+    write_package(self.root, 'pkg_a', 'msg', {
+      'Point.msg': 'float32 x\nfloat32 y\n',
+      'Stamped.msg': 'Header header\nPoint[] points\n',
+      'Old.msg': 'roslib/Header header\n',
+      })
+    write_package(self.root, 'pkg_b', 'msg', {
+      'Wrap.msg': 'pkg_a/Stamped[4] s\nuint8 flags\n',
+      })
+    roslib.msgs.load_package('pkg_a')
+    roslib.msgs.load_package('pkg_b')
+
+  def test_get_embedding_types(self):
+    get = roslib.msgs.get_embedding_types
+    self.assertEquals(['pkg_a/Stamped'], get('pkg_a/Point', transitive=False))
+    self.assertEquals(['pkg_a/Stamped', 'pkg_b/Wrap'], get('pkg_a/Point'))
+    self.assertEquals([], get('pkg_b/Wrap'))
+    self.assertEquals([], get('uint8'))
+    headers = ['pkg_a/Old', 'pkg_a/Stamped', 'pkg_b/Wrap']
+    # Header and its REP 100 alias are the same type
+    for name in ['Header', 'std_msgs/Header', 'roslib/Header']:
+      self.assertEquals(headers, get(name))
+      self.assertEquals(['pkg_a/Old', 'pkg_a/Stamped'], get(name, transitive=False))
+
+  def test_load_pending(self):
+    self.assertEquals([], roslib.msgs.get_embedding_types('pkg_a/Point', load_pending=False))
+    roslib.msgs.is_registered('pkg_a/Stamped')
+    self.assertEquals(['pkg_a/Stamped'], roslib.msgs.get_embedding_types('pkg_a/Point', load_pending=False))
+
+  def test_reregister(self):
+    # re-registering a type replaces its entries in the index
+    spec = roslib.msgs.load_from_string('float64 z\n', 'pkg_a', 'pkg_a/Stamped', 'Stamped')
+    roslib.msgs.register('pkg_a/Stamped', spec)
+    self.assertEquals([], roslib.msgs.get_embedding_types('pkg_a/Point'))
+
+  def test_reinit(self):
+    self.assertEquals(['pkg_a/Stamped', 'pkg_b/Wrap'], roslib.msgs.get_embedding_types('pkg_a/Point'))
+    roslib.msgs.reinit()
+    self.assertEquals([], roslib.msgs.get_embedding_types('pkg_a/Point'))
+    self.assertEquals([], roslib.msgs.get_embedding_types('Header'))
+
+class LayoutTest(MsgWorkspaceTest):
+
+  def _spec(self, text, name, register=True):
+    spec = roslib.msgs.load_from_string(text, 'test_layout', 'test_layout/'+name, name)
+    if register:
+      roslib.msgs.register('test_layout/'+name, spec)
+    return spec
+
+  def test_fixed(self):
+    point = self._spec('float32 x\nfloat32 y\nint8 flag\nbool ok\ntime t\n', 'Point')
+    layout = point.layout()
+    self.assert_(layout.is_fixed_size())
+    self.assertEquals(4+4+1+1+8, layout.fixed_size)
+    self.assertEquals(1, len(layout.segments))
+    self.assertEquals('<ffbBII', layout.segments[0].struct.format)
+    self.assertEquals([('x', 'float32', 1), ('y', 'float32', 1), ('flag', 'int8', 1),
+                       ('ok', 'bool', 1), ('t', 'time', 2)], layout.segments[0].fields)
+    self.assertEquals([], layout.variable_fields)
+    # cached on the spec
+    self.assert_(layout is point.layout())
+
+    # embedded fixed-size messages and fixed arrays are merged into one segment
+    pair = self._spec('Point a\nPoint[2] b\nuint8[3] rgb\nchar[2] c\nuint16[2] d\n', 'Pair')
+    layout = pair.layout()
+    self.assertEquals(3*point.layout().fixed_size + 3 + 2 + 4, layout.fixed_size)
+    self.assertEquals(1, len(layout.segments))
+    self.assertEquals('<' + 'ffbBII'*3 + '3s2sHH', layout.segments[0].struct.format)
+    self.assertEquals([('a', 'test_layout/Point', 6), ('b', 'test_layout/Point[2]', 12), ('rgb', 'uint8[3]', 1),
+                       ('c', 'char[2]', 1), ('d', 'uint16[2]', 2)], layout.segments[0].fields)
+    self.assertEquals(layout.fixed_size, layout.segments[0].struct.size)
+    self.assert_(self._spec('', 'Empty').layout().is_fixed_size())
+    self.assertEquals(0, self._spec('', 'Empty').layout().fixed_size)
+
+  def test_variable(self):
+    self._spec('float32 x\nfloat32 y\n', 'Point')
+    spec = self._spec('int32 a\nint32 b\nstring name\nfloat64 c\nPoint[] pts\nuint8 d\nPoint[2] e\nint32[] f\n', 'Var')
+    layout = spec.layout()
+    self.failIf(layout.is_fixed_size())
+    self.assertEquals(None, layout.fixed_size)
+    self.assertEquals([(0, '<ii'), (8, None), (0, '<d'), (8, None), (0, '<Bffff'), (17, None)],
+                      [(s.offset, s.struct and s.struct.format) for s in layout.segments])
+    self.assertEquals([('name', 8), ('pts', 8), ('f', 17)], layout.variable_fields)
+    self.assertEquals([False, True, False, True, False, True], [s.is_variable() for s in layout.segments])
+    # messages with variable-length fields make embedding fields variable
+    self._spec('string s\n', 'Str')
+    layout = self._spec('int32 a\nStr s\nStr[2] t\n', 'Outer').layout()
+    self.assertEquals([('s', 4), ('t', 0)], layout.variable_fields)
+
+  def test_header(self):
+    stamped = self._spec('Header header\nfloat64 x\n', 'Stamped')
+    layout = stamped.layout()
+    # Header is variable-length because of frame_id
+    self.assertEquals([(0, None), (0, '<d')],
+                      [(s.offset, s.struct and s.struct.format) for s in layout.segments])
+    self.assertEquals([('header', 0)], layout.variable_fields)
+    header = roslib.msgs.get_embedded_spec('Header').layout()
+    self.assertEquals([(0, '<III'), (12, None)], [(s.offset, s.struct and s.struct.format) for s in header.segments])
+    self.assertEquals([('seq', 'uint32', 1), ('stamp', 'time', 2)], header.segments[0].fields)
+    for name in ['Header', 'std_msgs/Header', 'roslib/Header']:
+      self.assertEquals(['seq', 'stamp', 'frame_id'], roslib.msgs.get_embedded_spec(name).names)
+
+  def test_header_without_std_msgs(self):
+    # no ROS environment: Header falls back to the built-in definition
+    shutil.rmtree(os.path.join(self.root, 'std_msgs'))
+    roslib.msgs.REGISTERED_TYPES.clear()
+    roslib.msgs._initialized = False
+    try:
+      spec = self._spec('Header header\n', 'Stamped')
+      self.assertEquals(None, spec.layout().fixed_size)
+      self.assertEquals(['seq', 'stamp', 'frame_id'], roslib.msgs.get_embedded_spec('Header').names)
+      self.failIf(roslib.msgs.is_registered('std_msgs/Header'))
+    finally:
+      write_package(self.root, 'std_msgs', 'msg', {'Header.msg': HEADER_MSG})
+
+  def test_unregistered(self):
+    spec = self._spec('test_layout/Missing m\n', 'Bad', register=False)
+    self.assertRaises(roslib.msgs.MsgSpecException, spec.layout)
+    # layout is computed again once the type is registered
+    self._spec('int32 x\n', 'Missing')
+    self.assertEquals(4, spec.layout().fixed_size)
+
+  def test_invalidation(self):
+    self._spec('float32 x\n', 'Point')
+    pair = self._spec('Point a\n', 'Pair')
+    self.assertEquals(4, pair.layout().fixed_size)
+    # re-registering an embedded type invalidates cached layouts
+    self._spec('float64 x\nfloat64 y\n', 'Point')
+    self.assertEquals(16, pair.layout().fixed_size)
+    roslib.msgs.reinit()
+    self.assertRaises(roslib.msgs.MsgSpecException, pair.layout)
+    generation = roslib.msgs.get_registry_generation()
+    self._spec('int8 x\n', 'Point')
+    self.assert_(roslib.msgs.get_registry_generation() != generation)
+    self.assertEquals(1, pair.layout().fixed_size)
+
+  def test_get_spec(self):
+    local = {'test_layout/Point': roslib.msgs.load_from_string('int16 x\n', 'test_layout', 'test_layout/Point', 'Point')}
+    def get_spec(base_type, package_context):
+      return local[roslib.msgs.resolve_type(base_type, package_context)]
+    pair = self._spec('Point a\n', 'Pair', register=False)
+    self.assertEquals(2, pair.layout(get_spec).fixed_size)
+    self.assertEquals('<h', roslib.msgs.compute_layout(pair, get_spec).segments[0].struct.format)
+    self.assertRaises(roslib.msgs.MsgSpecException, pair.layout)
@@ -322,3 +322,102 @@ class NamesTest(unittest.TestCase):
           ]
       for name, node_name, v in tests:
           self.assertEquals(v, resolve_name(name, node_name))
+
+  def test_name_resolver(self):
+      from roslib.names import NameResolver, resolve_name, canonicalize_name
+      remappings = {'/ns1/foo': '/remapped'}
+      names = ['', 'foo', 'foo/', '/foo', 'foo//bar//', '~foo', '~/foo/bar', 'bar']
+      for node_name in ['/', '/node', '/ns1/ns2']:
+          r = NameResolver(node_name, remappings)
+          for _ in range(2):
+              for n in names:
+                  self.assertEquals(resolve_name(n, node_name, remappings), r.resolve_name(n))
+                  self.assertEquals(canonicalize_name(n), r.canonicalize_name(n))
+          self.assertEquals(2 * len(names), r.misses)
+          self.assertEquals(2 * len(names), r.hits)
+      r = NameResolver('/ns1/ns2', remappings)
+      self.assertEquals('/remapped', r.resolve_name('foo'))
+      # resolver keeps its own copy of the remappings
+      remappings['/ns1/bar'] = '/other'
+      self.assertEquals('/ns1/bar', r.resolve_name('bar'))
+
+      # bounded cache evicts least-recently used entries
+      r = NameResolver('/ns', maxsize=2)
+      r.resolve_name('a')
+      r.resolve_name('b')
+      r.resolve_name('a')
+      r.resolve_name('c')
+      self.assertEquals(2, r.cache_size())
+      self.assertEquals((1, 3), (r.hits, r.misses))
+      r.resolve_name('a')
+      r.resolve_name('b')
+      self.assertEquals((2, 4), (r.hits, r.misses))
+      r.clear_cache()
+      self.assertEquals((0, 0, 0), (r.hits, r.misses, r.cache_size()))
+
+  def test_remapper(self):
+      from roslib.names import Remapper, NameResolver, resolve_name, load_mappings
+      r = Remapper(load_mappings(['/robot1/odom:=/odom_fixed', 'foo:=bar']),
+                   {'/robot1': '/fleet/robot1', '/robot1/arm': '/arms/left', '/sim/': '/'})
+      tests = [
+          ('/robot1/odom', '/odom_fixed'),
+          ('/robot1', '/fleet/robot1'),
+          ('/robot1/scan', '/fleet/robot1/scan'),
+          ('/robot1/arm', '/arms/left'),
+          ('/robot1/arm/joint_states', '/arms/left/joint_states'),
+          ('/robot1/armature', '/fleet/robot1/armature'),
+          ('/robot2/odom', '/robot2/odom'),
+          ('/sim/clock', '/clock'),
+          ('/', '/'),
+          ('/foo', '/foo'),
+          ('foo', 'bar'),
+          ('other', 'other'),
+          ]
+      for name, v in tests:
+          self.assertEquals(v, r.remap(name), name)
+      self.assertEquals([v for _, v in tests], r.resolve_many([n for n, _ in tests]))
+      self.assertEquals([v for _, v in reversed(tests)], r.resolve_many([n for n, _ in reversed(tests)]))
+
+      self.assert_('/robot1/scan' in r)
+      self.failIf('/robot2/odom' in r)
+      try:
+        r['/robot2/odom']
+        self.fail("should have raised KeyError")
+      except KeyError: pass
+
+      # usable wherever a remappings dict is accepted
+      self.assertEquals('/fleet/robot1/scan', resolve_name('scan', '/robot1/node', r))
+      self.assertEquals('/odom_fixed', NameResolver('/robot1/node', r).resolve_name('odom'))
+      self.assertEquals('/robot2/odom', NameResolver('/robot2/node', r).resolve_name('odom'))
+
+  def test_find_illegal_names(self):
+      import random
+      import roslib.names as n
+      validators = [(n.find_illegal_names, n.is_legal_name),
+                    (n.find_illegal_resource_names, n.is_legal_resource_name),
+                    (n.find_illegal_base_names, n.is_legal_base_name),
+                    (n.find_illegal_resource_base_names, n.is_legal_resource_base_name)]
+      names = [None, '', 'hello\n', '\t', 'foo++', 'foo-bar', '#foo', 'f/', 'foo/bar', '/', '/a',
+               'f//b', '~f', '~a/b/c', '~/f', ' name', 'name ', '1name', 'foo\\', 'f', 'f1', 'f_',
+               'foo_bar', '/foo/bar/', 'a\nb', '~~a']
+      # random names over a small alphabet to cover edge cases
+      r = random.Random(1234)
+      for _ in range(2000):
+          names.append(''.join([r.choice('ab1_/~-\n') for _ in range(r.randint(0, 6))]))
+      for find, is_legal in validators:
+          illegal = find(names)
+          self.assertEquals([x for x in names if not is_legal(x)], [x for x, _ in illegal])
+          self.failIf([x for x, reason in illegal if not reason])
+          valid = [x for x in names if is_legal(x)]
+          self.assertEquals([], find(valid))
+          self.assertEquals([], find(iter(valid)))
+          self.assertEquals([], find([]))
+      # ASCII names without newlines are narrowed down by the joined scan
+      names = [''.join([r.choice('ab1_/~-. ') for _ in range(r.randint(0, 6))]) for _ in range(2000)]
+      names.extend(['', 'a', '~', '~~', 'a~', '//', 'a//', '~a/b', '/'])
+      for find, is_legal in validators:
+          self.assertEquals([x for x in names if not is_legal(x)], [x for x, _ in find(names)])
+      self.assertEquals([('', "empty name")], n.find_illegal_resource_names(['a', '', 'b']))
+      self.assertEquals([('foo//bar', "contains '//'")], n.find_illegal_names(['/foo', 'foo//bar']))
+      self.assertEquals([('1foo', "illegal first character '1'")], n.find_illegal_resource_names(['1foo']))
+      self.assertEquals([(None, "not a string")], n.find_illegal_base_names([None]))
@@ -0,0 +1,508 @@
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2012, Willow Garage, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+#
+#  * Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+#  * Redistributions in binary form must reproduce the above
+#    copyright notice, this list of conditions and the following
+#    disclaimer in the documentation and/or other materials provided
+#    with the distribution.
+#  * Neither the name of Willow Garage, Inc. nor the names of its
+#    contributors may be used to endorse or promote products derived
+#    from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE
+# COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT
+# LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN
+# ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+
+import os
+import random
+import shutil
+import socket
+import struct
+import sys
+import tempfile
+import threading
+import time
+import unittest
+
+import roslib.network
+from roslib.network import ROSHandshakeException
+
+python3 = sys.hexversion > 0x03000000
+
+def reference_decode_ros_handshake_header(header_str):
+  """
+  Slice-based handshake header decoder that
+  roslib.network.decode_ros_handshake_header() must agree with.
+  """
+  (size, ) = struct.unpack('<I', header_str[0:4])
+  size += 4
+  header_len = len(header_str)
+  if size > header_len:
+    raise ROSHandshakeException("Incomplete header. Expected %s bytes but only have %s"%((size+4), header_len))
+  d = {}
+  start = 4
+  while start < size:
+    (field_size, ) = struct.unpack('<I', header_str[start:start+4])
+    if field_size == 0:
+      raise ROSHandshakeException("Invalid 0-length handshake header field")
+    start += field_size + 4
+    if start > size:
+      raise ROSHandshakeException("Invalid line length in handshake header: %s"%size)
+    line = header_str[start-field_size:start]
+    if python3:
+      line = line.decode()
+    idx = line.find("=")
+    if idx < 0:
+      raise ROSHandshakeException("Invalid line in handshake header: [%s]"%line)
+    d[line[:idx].strip()] = line[idx+1:]
+  return d
+
+def _call(fn, data):
+  try:
+    return 'ok', fn(data)
+  except (UnicodeDecodeError, struct.error) as e:
+    # message text of these depends on the decoding primitive used
+    return e.__class__.__name__, None
+  except Exception as e:
+    return e.__class__.__name__, str(e)
+
+HEADER = {'callerid': '/talker', 'topic': '/chatter', 'type': 'std_msgs/String',
+          'md5sum': '992ce8a1687cec8c8bd883ec73ca41d1', 'message_definition': 'string data\n',
+          'latching': '0', ' padded ': 'a=b=c', 'empty': ''}
+
+class HandshakeHeaderTest(unittest.TestCase):
+
+  def test_roundtrip(self):
+    encoded = roslib.network.encode_ros_handshake_header(HEADER)
+    expected = dict([(k.strip(), v) for k, v in HEADER.items()])
+    self.assertEquals(expected, roslib.network.decode_ros_handshake_header(encoded))
+    # extra data at the end is ignored
+    self.assertEquals(expected, roslib.network.decode_ros_handshake_header(encoded + b'payload'))
+    self.assertEquals(expected, roslib.network.decode_ros_handshake_header(bytearray(encoded)))
+
+  def test_errors(self):
+    encoded = roslib.network.encode_ros_handshake_header(HEADER)
+    field = struct.pack('<I', 3) + b'abc'
+    tests = [
+      b'',
+      b'\x01\x00',
+      encoded[:-1],
+      struct.pack('<I', 4) + struct.pack('<I', 0),
+      struct.pack('<I', 7) + struct.pack('<I', 9) + b'abc',
+      struct.pack('<I', len(field)) + field,
+      struct.pack('<I', 6) + struct.pack('<I', 3) + b'a=',
+      ]
+    for data in tests:
+      expected = _call(reference_decode_ros_handshake_header, data)
+      self.assertNotEquals('ok', expected[0])
+      self.assertEquals(expected, _call(roslib.network.decode_ros_handshake_header, data))
+
+  def test_fuzz(self):
+    r = random.Random(4321)
+    mismatches = []
+    encoded = bytearray(roslib.network.encode_ros_handshake_header(HEADER))
+    for i in range(3000):
+      data = bytearray(encoded)
+      for _ in range(r.randint(1, 4)):
+        op = r.randint(0, 3)
+        pos = r.randint(0, len(data))
+        if op == 0 and data:
+          data[min(pos, len(data)-1)] = r.randint(0, 255)
+        elif op == 1:
+          data[pos:pos] = bytearray([r.choice([0, 1, 61, 255, r.randint(0, 255)])])
+        elif op == 2:
+          del data[pos:pos+r.randint(1, 8)]
+        else:
+          # corrupt a length field
+          data[0:4] = struct.pack('<I', r.randint(0, len(data)))
+      data = bytes(data)
+      expected = _call(reference_decode_ros_handshake_header, data)
+      actual = _call(roslib.network.decode_ros_handshake_header, data)
+      if expected != actual:
+        mismatches.append((data, expected, actual))
+    self.assertEquals([], mismatches)
+
+class ChunkedSocket(object):
+  """
+  Socket stand-in that returns data in fixed size chunks.
+  """
+  def __init__(self, data, chunk):
+    self.data = data
+    self.chunk = chunk
+  def recv_into(self, buff):
+    n = min(self.chunk, len(buff), len(self.data))
+    buff[:n] = self.data[:n]
+    self.data = self.data[n:]
+    return n
+
+class HandshakeReaderTest(unittest.TestCase):
+
+  def test_read_header(self):
+    encoded = roslib.network.encode_ros_handshake_header(HEADER)
+    expected = dict([(k.strip(), v) for k, v in HEADER.items()])
+    payload = b'\x01\x02payload'
+    for chunk in [1, 3, 4, 7, 64, 100000]:
+      for buff_size in [1, 5, 16, 65536]:
+        reader = roslib.network.HandshakeReader(ChunkedSocket(encoded + payload, chunk), buff_size)
+        header, leftovers = reader.read_header()
+        self.assertEquals(expected, header)
+        self.assert_(isinstance(leftovers, memoryview))
+        # leftovers depend on how much the last recv returned
+        self.assertEquals(payload[:len(leftovers)], leftovers.tobytes())
+
+    # second header on the same reader
+    sock = ChunkedSocket(encoded, 7)
+    reader = roslib.network.HandshakeReader(sock, 8)
+    self.assertEquals(expected, reader.read_header()[0])
+    sock.data = encoded + payload
+    header, leftovers = reader.read_header()
+    self.assertEquals(expected, header)
+    self.assertEquals(payload[:len(leftovers)], leftovers.tobytes())
+
+  def test_read_header_socket(self):
+    encoded = roslib.network.encode_ros_handshake_header(HEADER)
+    a, b = socket.socketpair()
+    try:
+      a.sendall(encoded)
+      header, leftovers = roslib.network.HandshakeReader(b, 16).read_header()
+      self.assertEquals('/talker', header['callerid'])
+      self.assertEquals(0, len(leftovers))
+      # same result as the StringIO-based reader
+      a.sendall(encoded)
+      if python3:
+        from io import BytesIO as buff_type
+      else:
+        from cStringIO import StringIO as buff_type
+      buff = buff_type()
+      self.assertEquals(header, roslib.network.read_ros_handshake_header(b, buff, 16))
+    finally:
+      a.close()
+      b.close()
+
+  def test_read_header_errors(self):
+    encoded = roslib.network.encode_ros_handshake_header(HEADER)
+    reader = roslib.network.HandshakeReader(ChunkedSocket(encoded[:10], 3), 4)
+    try:
+      reader.read_header()
+      self.fail("should have raised")
+    except ROSHandshakeException as e:
+      self.assert_('10 bytes were received' in str(e), str(e))
+    reader = roslib.network.HandshakeReader(ChunkedSocket(b'', 3))
+    self.assertRaises(ROSHandshakeException, reader.read_header)
+    bad = struct.pack('<I', 8) + struct.pack('<I', 4) + b'abcd'
+    reader = roslib.network.HandshakeReader(ChunkedSocket(bad, 3))
+    self.assertRaises(ROSHandshakeException, reader.read_header)
+
+  def test_read_header_limits(self):
+    # bogus length prefix is rejected before anything is allocated for it
+    reader = roslib.network.HandshakeReader(ChunkedSocket(b'\xff\xff\xff\xff' + b'x' * 100, 8), 16)
+    self.assertRaises(ROSHandshakeException, reader.read_header)
+    self.assertEquals(16, len(reader._buff))
+    encoded = roslib.network.encode_ros_handshake_header(HEADER)
+    reader = roslib.network.HandshakeReader(ChunkedSocket(encoded, 4), 16, max_size=len(encoded) - 5)
+    self.assertRaises(ROSHandshakeException, reader.read_header)
+    reader = roslib.network.HandshakeReader(ChunkedSocket(encoded, 4), 16, max_size=len(encoded) - 4)
+    self.assertEquals('/talker', reader.read_header()[0]['callerid'])
+    # a large but legal prefix only grows the buffer as data arrives
+    reader = roslib.network.HandshakeReader(ChunkedSocket(struct.pack('<I', 1000000) + b'x' * 100, 50), 16)
+    self.assertRaises(ROSHandshakeException, reader.read_header)
+    self.assert_(len(reader._buff) < 1000, len(reader._buff))
+
+class RecordingSocket(object):
+  def __init__(self, sendmsg=True):
+    self.sent = []
+    if sendmsg:
+      self.sendmsg = self._sendmsg
+  def sendall(self, data):
+    self.sent.append(('sendall', bytes(data)))
+  def _sendmsg(self, buffers):
+    # short write on purpose
+    data = b''.join(buffers)
+    self.sent.append(('sendmsg', data[:-1]))
+    return len(data) - 1
+
+class HandshakeTemplateTest(unittest.TestCase):
+
+  def test_encode(self):
+    static = {'callerid': '/talker', 'type': 'std_msgs/String', 'md5sum': '992ce8a1687cec8c8bd883ec73ca41d1',
+              'message_definition': 'string data\n'}
+    template = roslib.network.HandshakeTemplate(static)
+    decode = roslib.network.decode_ros_handshake_header
+    self.assertEquals(roslib.network.encode_ros_handshake_header(static), template.encode())
+    self.assertEquals(static, decode(template.encode({})))
+    merged = dict(static)
+    merged['latching'] = '1'
+    self.assertEquals(merged, decode(template.encode({'latching': '1'})))
+    self.assertEquals(3, len(template.parts({'latching': '1'})))
+    # static fields are not modified by later changes to the dict
+    static['callerid'] = '/other'
+    self.assertEquals('/talker', decode(template.encode())['callerid'])
+    # overriding a static field sends it once
+    encoded = template.encode({'callerid': '/other'})
+    self.assertEquals('/other', decode(encoded)['callerid'])
+    self.assertEquals(1, encoded.count(b'callerid'))
+
+  def test_write(self):
+    template = roslib.network.HandshakeTemplate({'type': 'std_msgs/String', 'md5sum': '*'})
+    expected = template.encode({'latching': '0'})
+    for sendmsg in [True, False]:
+      sock = RecordingSocket(sendmsg)
+      self.assertEquals(len(expected), template.write(sock, {'latching': '0'}))
+      self.assertEquals(expected, b''.join([data for _, data in sock.sent]))
+      self.assertEquals(sendmsg, sock.sent[0][0] == 'sendmsg')
+
+    a, b = socket.socketpair()
+    try:
+      template.write(a, {'callerid': '/talker'})
+      header = roslib.network.HandshakeReader(b).read_header()[0]
+      self.assertEquals({'type': 'std_msgs/String', 'md5sum': '*', 'callerid': '/talker'}, header)
+    finally:
+      a.close()
+      b.close()
+
+FIB_TRIE = """Main:
+  +-- 0.0.0.0/0 3 0 5
+     |-- 0.0.0.0
+        /0 universe UNICAST
+     +-- 127.0.0.0/8 2 0 2
+        +-- 127.0.0.0/31 1 0 0
+           |-- 127.0.0.0
+              /8 host LOCAL
+           |-- 127.0.0.1
+              /32 host LOCAL
+        |-- 127.255.255.255
+           /32 link BROADCAST
+     |-- 192.168.1.7
+        /32 host LOCAL
+Local:
+  +-- 0.0.0.0/0 3 0 5
+     |-- 127.0.0.1
+        /32 host LOCAL
+     |-- 192.168.1.7
+        /32 host LOCAL
+"""
+IF_INET6 = """fe8000000000000000fc00fffe000001 04 40 20 80     eth0
+00000000000000000000000000000001 01 80 10 80       lo
+"""
+
+class LocalAddressTest(unittest.TestCase):
+
+  def setUp(self):
+    self.tmp = tempfile.mkdtemp()
+    self.saved = (roslib.network._monotonic, roslib.network._read_local_addresses, socket.getaddrinfo)
+    roslib.network.clear_local_address_cache()
+
+  def tearDown(self):
+    shutil.rmtree(self.tmp)
+    roslib.network._monotonic, roslib.network._read_local_addresses, socket.getaddrinfo = self.saved
+    roslib.network.clear_local_address_cache()
+
+  def _write(self, name, text):
+    path = os.path.join(self.tmp, name)
+    with open(path, 'w') as f:
+      f.write(text)
+    return path
+
+  def test_read_proc_addresses(self):
+    fib_trie = self._write('fib_trie', FIB_TRIE)
+    if_inet6 = self._write('if_inet6', IF_INET6)
+    ipv4, ipv6 = roslib.network._read_proc_addresses(fib_trie, if_inet6)
+    self.assertEquals(['127.0.0.1', '192.168.1.7'], ipv4)
+    self.assertEquals(['fe80::fc:ff:fe00:1', '::1'], ipv6)
+    ipv4, ipv6 = roslib.network._read_proc_addresses(fib_trie, os.path.join(self.tmp, 'missing'))
+    self.assertEquals(['127.0.0.1', '192.168.1.7'], ipv4)
+    self.assertEquals(None, ipv6)
+    self.assertRaises(IOError, roslib.network._read_proc_addresses, os.path.join(self.tmp, 'missing'))
+
+  def test_get_local_addresses_ttl(self):
+    now = [100.0]
+    calls = []
+    def read():
+      calls.append(now[0])
+      return ['127.0.0.1', '10.0.0.%d'%len(calls)], ['::1']
+    roslib.network._monotonic = lambda: now[0]
+    roslib.network._read_local_addresses = read
+
+    self.assertEquals(['127.0.0.1', '10.0.0.1'], roslib.network.get_local_addresses())
+    self.assertEquals(['127.0.0.1', '10.0.0.1', '::1'], roslib.network.get_local_addresses(ipv6=True))
+    self.assertEquals('10.0.0.1', roslib.network.get_local_address())
+    self.assertEquals(1, len(calls))
+    now[0] += roslib.network.LOCAL_ADDRESS_TTL
+    self.assertEquals(['127.0.0.1', '10.0.0.2'], roslib.network.get_local_addresses())
+    roslib.network.clear_local_address_cache()
+    self.assertEquals(['127.0.0.1', '10.0.0.3'], roslib.network.get_local_addresses())
+    self.assertEquals(3, len(calls))
+
+  def test_is_local_address(self):
+    now = [100.0]
+    lookups = []
+    hosts = {'me': ['10.0.0.1'], 'loop': ['127.0.1.1'], 'other': ['10.0.0.2'],
+             'me6': ['2001:db8:0:0:0:0:0:7'], 'both': ['10.0.0.2', 'fe80::fc:ff:fe00:1%eth0']}
+    def getaddrinfo(name, port):
+      lookups.append(name)
+      if name not in hosts:
+        raise socket.gaierror('unknown host')
+      return [(socket.AF_INET6 if ':' in a else socket.AF_INET, socket.SOCK_STREAM, 6, '', (a, 0)) for a in hosts[name]]
+    roslib.network._monotonic = lambda: now[0]
+    roslib.network._read_local_addresses = lambda: (['127.0.0.1', '10.0.0.1'], ['fe80::fc:ff:fe00:1%eth0', '2001:db8::7'])
+    socket.getaddrinfo = getaddrinfo
+
+    self.assert_(roslib.network.is_local_address('me'))
+    self.assert_(roslib.network.is_local_address('loop'))
+    self.failIf(roslib.network.is_local_address('other'))
+    self.failIf(roslib.network.is_local_address('unknown'))
+    # AAAA-only and mixed hosts
+    self.assert_(roslib.network.is_local_address('me6'))
+    self.assert_(roslib.network.is_local_address('both'))
+    # IPv6 literals in any notation
+    for addr in ['::1', '0:0:0:0:0:0:0:1', '[::1]', '2001:DB8::7', '[2001:db8:0::7]', '::ffff:10.0.0.1']:
+      self.assert_(roslib.network.is_local_address(addr), addr)
+    self.failIf(roslib.network.is_local_address('fe80::1'))
+    self.failIf(roslib.network.is_local_address('[fe80::1]'))
+    del lookups[:]
+    # resolutions, including failures, are cached
+    for name in ['me', 'loop', 'other', 'unknown']:
+      roslib.network.is_local_address(name)
+    self.assertEquals([], lookups)
+    hosts['other'] = ['10.0.0.1']
+    now[0] += roslib.network.HOSTNAME_TTL
+    self.assert_(roslib.network.is_local_address('other'))
+    self.assertEquals(['other'], lookups)
+
+  def test_host_cache_size(self):
+    now = [100.0]
+    socket.getaddrinfo = lambda name, port: [(socket.AF_INET, socket.SOCK_STREAM, 6, '', ('10.0.0.2', 0))]
+    roslib.network._monotonic = lambda: now[0]
+    roslib.network._read_local_addresses = lambda: (['127.0.0.1'], [])
+    size = roslib.network.HOSTNAME_CACHE_SIZE
+    for i in range(size):
+      roslib.network.is_local_address('host%s'%i)
+    self.assertEquals(size, len(roslib.network._host_cache))
+    # expired entries are pruned
+    now[0] += roslib.network.HOSTNAME_TTL
+    roslib.network.is_local_address('late')
+    self.assertEquals(['late'], list(roslib.network._host_cache))
+    # the cache stays bounded when no entry has expired
+    for i in range(2 * size):
+      roslib.network.is_local_address('host%s'%i)
+    self.assert_(len(roslib.network._host_cache) <= size)
+
+@unittest.skipIf(roslib.network.selectors is None, "requires selectors")
+class HandshakeAcceptorTest(unittest.TestCase):
+
+  def setUp(self):
+    self.server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    self.server.bind(('127.0.0.1', 0))
+    self.server.listen(16)
+    self.errors = []
+    self.acceptor = roslib.network.HandshakeAcceptor(self.server, max_size=1024, timeout=0.5, buff_size=16)
+    self.acceptor.handle_error = lambda sock, addr, e: self.errors.append(str(e))
+    self.clients = []
+
+  def tearDown(self):
+    for c in self.clients:
+      c.close()
+    self.acceptor.close()
+    self.server.close()
+
+  def _connect(self):
+    c = socket.create_connection(self.server.getsockname())
+    self.clients.append(c)
+    return c
+
+  def _poll_until(self, cond, limit=5.0):
+    end = time.time() + limit
+    while not cond() and time.time() < end:
+      self.acceptor.poll(0.05)
+
+  def test_accept(self):
+    encoded = roslib.network.encode_ros_handshake_header(HEADER)
+    expected = dict([(k.strip(), v) for k, v in HEADER.items()])
+    a = self._connect()
+    b = self._connect()
+    # interleave partial headers from two connections
+    a.sendall(encoded[:3])
+    b.sendall(encoded[:20])
+    self._poll_until(lambda: self.acceptor.pending_count() == 2)
+    a.sendall(encoded[3:])
+    b.sendall(encoded[20:] + b'rest')
+    self._poll_until(lambda: self.acceptor.queue.qsize() == 2)
+    results = [self.acceptor.queue.get_nowait() for _ in range(2)]
+    for sock, header, leftovers in results:
+      self.assertEquals(expected, header)
+      self.assert_(sock.gettimeout() is None)
+      sock.close()
+    self.assertEquals(set([b'', b'rest']), set([r[2].tobytes() for r in results]))
+    self.assertEquals(0, self.acceptor.pending_count())
+    self.assertEquals([], self.errors)
+
+  def test_limits(self):
+    big = self._connect()
+    big.sendall(struct.pack('<I', 1025))
+    slow = self._connect()
+    slow.sendall(struct.pack('<I', 100) + b'ab')
+    bad = self._connect()
+    bad.sendall(struct.pack('<I', 8) + struct.pack('<I', 4) + b'abcd')
+    closed = self._connect()
+    closed.sendall(b'\x01')
+    closed.close()
+    self._poll_until(lambda: len(self.errors) == 4)
+    self.assertEquals(4, len(self.errors), self.errors)
+    self.assert_([e for e in self.errors if 'exceeds limit' in e], self.errors)
+    self.assert_([e for e in self.errors if 'within 0.5 seconds' in e], self.errors)
+    self.assertEquals(0, self.acceptor.pending_count())
+    self.assert_(self.acceptor.queue.empty())
+    # peer sees the connection closed
+    self.assertEquals(b'', slow.recv(1))
+
+  def test_malformed(self):
+    # a field length prefix cut off by the header size
+    truncated = self._connect()
+    truncated.sendall(struct.pack('<I', 12) + struct.pack('<I', 5) + b'a=bcd' + b'\x01\x00\x00')
+    good = self._connect()
+    roslib.network.write_ros_handshake_header(good, {'callerid': '/a'})
+    if python3:
+      invalid = self._connect()
+      invalid.sendall(struct.pack('<I', 8) + struct.pack('<I', 4) + b'a=\xff\xfe')
+    expected = 2 if python3 else 1
+    self._poll_until(lambda: len(self.errors) == expected and self.acceptor.queue.qsize() == 1)
+    self.assertEquals(expected, len(self.errors), self.errors)
+    sock, header, _ = self.acceptor.queue.get_nowait()
+    sock.close()
+    self.assertEquals({'callerid': '/a'}, header)
+    self.assertEquals(0, self.acceptor.pending_count())
+    # peers see their connections closed
+    self.assertEquals(b'', truncated.recv(1))
+    if python3:
+      self.assertEquals(b'', invalid.recv(1))
+
+  def test_serve_forever(self):
+    t = threading.Thread(target=self.acceptor.serve_forever)
+    t.start()
+    try:
+      roslib.network.write_ros_handshake_header(self._connect(), {'callerid': '/a'})
+      sock, header, _ = self.acceptor.queue.get(timeout=5.0)
+      sock.close()
+      self.assertEquals({'callerid': '/a'}, header)
+    finally:
+      self.acceptor.shutdown()
+      t.join(5.0)
+    self.failIf(t.is_alive())
@@ -0,0 +1,121 @@
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2012, Willow Garage, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+#
+#  * Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+#  * Redistributions in binary form must reproduce the above
+#    copyright notice, this list of conditions and the following
+#    disclaimer in the documentation and/or other materials provided
+#    with the distribution.
+#  * Neither the name of Willow Garage, Inc. nor the names of its
+#    contributors may be used to endorse or promote products derived
+#    from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE
+# COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT
+# LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN
+# ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+
+import os
+import unittest
+
+import roslib.packages
+import roslib.resources
+
+from workspace_fixture import WorkspaceTest
+
+class ListPackageResourcesTest(WorkspaceTest):
+
+  def setUp(self):
+    WorkspaceTest.setUp(self)
+    roslib.resources._listing_cache.clear()
+    msgs = dict([('msg/' + m, 'int32 x\n') for m in ['A.msg', 'B.msg', 'notes.txt']])
+    self.pkg_a = self.make_pkg('pkg_a', ['pkg_b', 'pkg_missing', 'pkg_c'], msgs)
+    self.make_pkg('pkg_b', files={'msg/C.msg': 'int32 x\n'})
+    self.make_pkg('pkg_c')
+    os.makedirs(os.path.join(self.pkg_a, 'msg', 'Dir.msg'))
+    self.listdir_calls = []
+    self._listdir = os.listdir
+    self._scandir = roslib.resources.scandir
+    def listdir(d):
+      self.listdir_calls.append(d)
+      return self._listdir(d)
+    os.listdir = listdir
+    if self._scandir is not None:
+      def scandir(d):
+        self.listdir_calls.append(d)
+        return self._scandir(d)
+      roslib.resources.scandir = scandir
+
+  def tearDown(self):
+    os.listdir = self._listdir
+    roslib.resources.scandir = self._scandir
+    roslib.resources._listing_cache.clear()
+    WorkspaceTest.tearDown(self)
+
+  def test_filters(self):
+    from roslib.resources import list_package_resources_by_dir, ExtensionFilter
+    msg_filter = ExtensionFilter('.msg')
+    self.assertEquals(['A.msg', 'B.msg'], sorted(list_package_resources_by_dir(self.pkg_a, False, 'msg', msg_filter)))
+    self.assertEquals(['A.msg', 'B.msg', 'notes.txt'], sorted(list_package_resources_by_dir(self.pkg_a, False, 'msg')))
+    # any other filter sees every entry
+    self.assertEquals(['Dir.msg'], list_package_resources_by_dir(self.pkg_a, False, 'msg', os.path.isdir))
+    self.assertEquals([], list_package_resources_by_dir(self.pkg_a, False, 'srv', msg_filter))
+    self.assert_(msg_filter(os.path.join(self.pkg_a, 'msg', 'A.msg')))
+    self.failIf(msg_filter(os.path.join(self.pkg_a, 'msg', 'Dir.msg')))
+
+  def test_cache(self):
+    from roslib.resources import list_package_resources_by_dir, ExtensionFilter
+    msg_filter = ExtensionFilter('.msg')
+    msg_dir = os.path.join(self.pkg_a, 'msg')
+    list_package_resources_by_dir(self.pkg_a, False, 'msg', msg_filter)
+    list_package_resources_by_dir(self.pkg_a, False, 'msg', os.path.isfile)
+    self.assertEquals([msg_dir], self.listdir_calls)
+
+    with open(os.path.join(msg_dir, 'D.msg'), 'w') as f:
+      f.write('int32 x\n')
+    # mtime resolution of some filesystems is coarse
+    t = os.stat(msg_dir).st_mtime + 10
+    os.utime(msg_dir, (t, t))
+    self.assertEquals(['A.msg', 'B.msg', 'D.msg'], sorted(list_package_resources_by_dir(self.pkg_a, False, 'msg', msg_filter)))
+    self.assertEquals([msg_dir, msg_dir], self.listdir_calls)
+
+  def test_include_depends(self):
+    from roslib.resources import list_package_resources_by_dir, ExtensionFilter
+    batches = []
+    get_pkg_dirs = roslib.packages.get_pkg_dirs
+    def record(packages, required=True):
+      batches.append(list(packages))
+      return get_pkg_dirs(packages, required)
+    try:
+      roslib.packages.get_pkg_dirs = record
+      resources = list_package_resources_by_dir(self.pkg_a, True, 'msg', ExtensionFilter('.msg'))
+    finally:
+      roslib.packages.get_pkg_dirs = get_pkg_dirs
+    self.assertEquals(['A.msg', 'B.msg', 'pkg_b/C.msg'], sorted(resources))
+    self.assertEquals([['pkg_b', 'pkg_missing', 'pkg_c']], batches)
+
+  def test_get_pkg_dirs(self):
+    from roslib.packages import get_pkg_dirs, InvalidROSPkgException
+    self.assertEquals([os.path.join(self.ws, 'pkg_b'), None, self.pkg_a],
+                      get_pkg_dirs(['pkg_b', 'pkg_missing', 'pkg_a'], required=False))
+    self.assertEquals([], get_pkg_dirs([]))
+    self.assertRaises(InvalidROSPkgException, get_pkg_dirs, ['pkg_a', 'pkg_missing'])
+    # cached entries are used without crawling
+    roslib.packages._pkg_dir_cache['pkg_cached'] = (self.pkg_a, os.environ['ROS_ROOT'], self.ws)
+    self.assertEquals([self.pkg_a], get_pkg_dirs(['pkg_cached']))
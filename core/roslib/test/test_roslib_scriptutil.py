@@ -0,0 +1,194 @@
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2012, Willow Garage, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+#
+#  * Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+#  * Redistributions in binary form must reproduce the above
+#    copyright notice, this list of conditions and the following
+#    disclaimer in the documentation and/or other materials provided
+#    with the distribution.
+#  * Neither the name of Willow Garage, Inc. nor the names of its
+#    contributors may be used to endorse or promote products derived
+#    from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE
+# COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT
+# LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN
+# ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+
+import os
+import socket
+import threading
+import time
+import unittest
+import warnings
+
+try:
+  import xmlrpc.client as xmlrpcclient
+  from xmlrpc.server import SimpleXMLRPCServer, SimpleXMLRPCRequestHandler
+  from socketserver import ThreadingMixIn
+except ImportError:
+  import xmlrpclib as xmlrpcclient
+  from SimpleXMLRPCServer import SimpleXMLRPCServer, SimpleXMLRPCRequestHandler
+  from SocketServer import ThreadingMixIn
+
+import roslib.scriptutil
+
+class KeepAliveHandler(SimpleXMLRPCRequestHandler):
+  protocol_version = 'HTTP/1.1'
+
+  def log_message(self, *args):
+    pass
+
+class MasterStandIn(ThreadingMixIn, SimpleXMLRPCServer):
+  """
+  Threaded XML-RPC server that counts accepted connections and
+  requests.
+  """
+  daemon_threads = True
+
+  def __init__(self):
+    SimpleXMLRPCServer.__init__(self, ('127.0.0.1', 0), KeepAliveHandler, logRequests=False)
+    self.connections = 0
+    self.requests = 0
+    self.register_function(self.getUri)
+    self.register_function(lambda a, b: a + b, 'add')
+    self.register_function(self.fail, 'fail')
+    self.register_function(self.slow, 'slow')
+    self.register_multicall_functions()
+
+  def get_request(self):
+    self.connections += 1
+    return SimpleXMLRPCServer.get_request(self)
+
+  def _dispatch(self, method, params):
+    self.requests += 1
+    return SimpleXMLRPCServer._dispatch(self, method, params)
+
+  def getUri(self, caller_id):
+    return 1, 'uri', 'http://%s:%s/'%self.server_address
+
+  def fail(self):
+    raise ValueError('failed')
+
+  def slow(self, seconds):
+    time.sleep(seconds)
+    return seconds
+
+class GetMasterTest(unittest.TestCase):
+
+  def setUp(self):
+    self.server = MasterStandIn()
+    self.thread = threading.Thread(target=self.server.serve_forever)
+    self.thread.daemon = True
+    self.thread.start()
+    self.uri = 'http://%s:%s/'%self.server.server_address
+    self._uri = os.environ.get('ROS_MASTER_URI')
+    os.environ['ROS_MASTER_URI'] = self.uri
+    socket.setdefaulttimeout(10.0)
+
+  def tearDown(self):
+    socket.setdefaulttimeout(None)
+    proxy = roslib.scriptutil._master_proxies.pop(self.uri, None)
+    if proxy is not None:
+      proxy('transport').close()
+    self.server.shutdown()
+    self.server.server_close()
+    if self._uri is None:
+      del os.environ['ROS_MASTER_URI']
+    else:
+      os.environ['ROS_MASTER_URI'] = self._uri
+
+  def get_master(self):
+    with warnings.catch_warnings():
+      warnings.simplefilter('ignore', DeprecationWarning)
+      return roslib.scriptutil.get_master()
+
+  def test_keep_alive(self):
+    m = self.get_master()
+    self.assert_(m is self.get_master())
+    for i in range(20):
+      self.assertEquals([1, 'uri', self.uri], m.getUri('/script'))
+    self.assertEquals(1, self.server.connections)
+    try:
+      m.fail()
+      self.fail("should have raised Fault")
+    except xmlrpcclient.Fault: pass
+    self.assertEquals(3, m.add(1, 2))
+    self.assertEquals(1, self.server.connections)
+
+  def test_reconnect(self):
+    m = self.get_master()
+    self.assertEquals(3, m.add(1, 2))
+    # server side closes the idle connection
+    transport = m('transport')
+    for conns in transport._idle.values():
+      for c in conns:
+        c.sock.shutdown(socket.SHUT_RDWR)
+    self.assertEquals(5, m.add(2, 3))
+    self.assertEquals(2, self.server.connections)
+
+  def test_no_retry_after_send(self):
+    # a timeout on a reused connection must not send the call again
+    m = xmlrpcclient.ServerProxy(self.uri, transport=roslib.scriptutil.PooledTransport(timeout=0.2))
+    self.assertEquals(3, m.add(1, 2))
+    self.assertRaises(socket.timeout, m.slow, 0.5)
+    time.sleep(0.5)
+    self.assertEquals(2, self.server.requests)
+    m('transport').close()
+
+  def test_multicall(self):
+    multicall = xmlrpcclient.MultiCall(self.get_master())
+    multicall.add(1, 2)
+    multicall.getUri('/script')
+    multicall.add('a', 'b')
+    self.assertEquals([3, [1, 'uri', self.uri], 'ab'], list(multicall()))
+    self.assertEquals(1, self.server.connections)
+
+  def test_threads(self):
+    m = self.get_master()
+    errors = []
+    def run(n):
+      try:
+        for i in range(20):
+          if m.add(n, i) != n + i:
+            errors.append((n, i))
+      except Exception as e:
+        errors.append(e)
+    threads = [threading.Thread(target=run, args=(n,)) for n in range(8)]
+    for t in threads:
+      t.start()
+    for t in threads:
+      t.join()
+    self.assertEquals([], errors)
+    self.assertEquals(160, self.server.requests)
+    self.assert_(self.server.connections <= 8, self.server.connections)
+    self.assert_(len(m('transport')._idle[self.server.server_address[0] + ':%s'%self.server.server_address[1]]) <= 4)
+
+  def test_proxy_per_uri(self):
+    other = roslib.scriptutil._get_master_proxy('http://localhost:1/')
+    try:
+      self.assert_(other is not self.get_master())
+      self.assert_(isinstance(other('transport'), roslib.scriptutil.PooledTransport))
+    finally:
+      del roslib.scriptutil._master_proxies['http://localhost:1/']
+    # https transports are not thread-safe and are not shared
+    https = roslib.scriptutil._get_master_proxy('https://localhost:1/')
+    self.assert_(https is not roslib.scriptutil._get_master_proxy('https://localhost:1/'))
+    self.failIf(isinstance(https('transport'), roslib.scriptutil.PooledTransport))
+    self.failIf('https://localhost:1/' in roslib.scriptutil._master_proxies)
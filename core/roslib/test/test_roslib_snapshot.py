@@ -0,0 +1,143 @@
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2012, Willow Garage, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+#
+#  * Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+#  * Redistributions in binary form must reproduce the above
+#    copyright notice, this list of conditions and the following
+#    disclaimer in the documentation and/or other materials provided
+#    with the distribution.
+#  * Neither the name of Willow Garage, Inc. nor the names of its
+#    contributors may be used to endorse or promote products derived
+#    from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE
+# COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT
+# LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN
+# ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+
+import os
+import shutil
+import unittest
+
+import roslib.msgs
+import roslib.packages
+import roslib.snapshot
+import roslib.srvs
+import roslib.stacks
+
+from workspace_fixture import WorkspaceTest
+
+class SnapshotTest(WorkspaceTest):
+
+  def setUp(self):
+    WorkspaceTest.setUp(self)
+    self.make_stack('stack_a')
+    self.pkg_a = self.make_pkg('stack_a/pkg_a', ['pkg_b'], {'msg/A.msg': 'int32 x\n', 'srv/S.srv': 'int32 a\n---\nint32 b\n'})
+    self.pkg_b = self.make_pkg('pkg_b', files={'msg/B.msg': 'string s\n'})
+    self.filename = os.path.join(self.root, 'snapshot')
+    roslib.snapshot._env_snapshot = None
+
+  def tearDown(self):
+    roslib.snapshot.set_snapshot(None)
+    if roslib.snapshot._env_snapshot and roslib.snapshot._env_snapshot[1]:
+      roslib.snapshot._env_snapshot[1].close()
+    roslib.snapshot._env_snapshot = None
+    WorkspaceTest.tearDown(self)
+
+  def test_write_snapshot(self):
+    from roslib.snapshot import write_snapshot, Snapshot, SnapshotException
+    write_snapshot(self.filename, {'meta': {'ros_root': 'r', 'ros_package_path': 'p'},
+                                   'numbers': dict([(str(i), i) for i in range(100)]),
+                                   'empty': {}})
+    s = Snapshot(self.filename)
+    try:
+      self.assertEquals('r', s.ros_root)
+      self.assert_(s.matches('r', 'p'))
+      self.failIf(s.matches('r', 'q'))
+      for i in range(100):
+        self.assertEquals(i, s.get('numbers', str(i)))
+      self.assertEquals(None, s.get('numbers', '100'))
+      self.assertEquals('x', s.get('missing', '1', 'x'))
+      self.assertEquals(sorted([str(i) for i in range(100)]), s.keys('numbers'))
+      self.assertEquals([], s.items('empty'))
+    finally:
+      s.close()
+
+    with open(self.filename, 'wb') as f:
+      f.write(b'not a snapshot')
+    self.assertRaises(SnapshotException, Snapshot, self.filename)
+    with open(self.filename, 'wb') as f:
+      pass
+    self.assertRaises(SnapshotException, Snapshot, self.filename)
+
+  def test_build_snapshot(self):
+    s = roslib.snapshot.build_snapshot(self.filename)
+    try:
+      self.assertEquals(self.ws, s.ros_package_path)
+      self.assertEquals(self.pkg_a, s.get_package_path('pkg_a'))
+      self.assertEquals(None, s.get_package_path('pkg_missing'))
+      self.assertEquals(['pkg_b'], s.get_package_depends('pkg_a'))
+      self.assertEquals(['A', 'pkg_b/B'], s.list_types('pkg_a', 'msg', True))
+      self.assertEquals(['S'], s.list_types('pkg_a', 'srv', False))
+      self.assertEquals(None, s.list_types('pkg_missing', 'msg', False))
+      self.assertEquals(['stack_a'], s.list_stacks())
+      self.assertEquals(os.path.join(self.ws, 'stack_a'), s.get_stack_path('stack_a'))
+      self.assertEquals('string s\n', s.get_file(os.path.join(self.pkg_b, 'msg', 'B.msg')))
+    finally:
+      s.close()
+
+  def test_active_snapshot(self):
+    from roslib.snapshot import get_snapshot, set_snapshot, build_snapshot
+    self.assertEquals(None, get_snapshot())
+    build_snapshot(self.filename).close()
+
+    os.environ[roslib.snapshot.SNAPSHOT_ENV] = self.filename
+    s = get_snapshot()
+    self.assert_(s is not None)
+    self.assert_(s is get_snapshot())
+    # snapshots of another environment are ignored
+    self.assertEquals(None, get_snapshot(ros_package_path=os.path.join(self.root, 'other')))
+    os.environ[roslib.snapshot.SNAPSHOT_ENV] = os.path.join(self.root, 'missing')
+    self.assertEquals(None, get_snapshot())
+
+    set_snapshot(s)
+    self.assert_(s is get_snapshot())
+    set_snapshot(None)
+    self.assertEquals(None, get_snapshot())
+
+  def test_hooks(self):
+    from roslib.snapshot import set_snapshot, build_snapshot
+    s = build_snapshot(self.filename)
+    # lookups are answered by the snapshot even after the tree is gone
+    a_msg = os.path.join(self.pkg_a, 'msg', 'A.msg')
+    s_srv = os.path.join(self.pkg_a, 'srv', 'S.srv')
+    shutil.rmtree(self.pkg_a)
+    shutil.rmtree(self.pkg_b)
+    set_snapshot(s)
+    self.assertEquals(self.pkg_a, roslib.packages.get_pkg_dir('pkg_a'))
+    self.assertEquals([self.pkg_a, self.pkg_b], roslib.packages.get_pkg_dirs(['pkg_a', 'pkg_b']))
+    self.assertEquals(['A', 'pkg_b/B'], roslib.msgs.list_msg_types('pkg_a', True))
+    self.assertEquals(['S'], roslib.srvs.list_srv_types('pkg_a', False))
+    self.assertEquals(['stack_a'], roslib.stacks.list_stacks())
+    self.assertEquals(os.path.join(self.ws, 'stack_a'), roslib.stacks.get_stack_dir('stack_a'))
+    t, spec = roslib.msgs.load_from_file(a_msg, 'pkg_a')
+    self.assertEquals('pkg_a/A', t)
+    self.assertEquals(['x'], spec.names)
+    t, spec = roslib.srvs.load_from_file(s_srv, 'pkg_a')
+    self.assertEquals(['b'], spec.response.names)
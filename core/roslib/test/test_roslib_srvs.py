@@ -0,0 +1,95 @@
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2012, Willow Garage, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+#
+#  * Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+#  * Redistributions in binary form must reproduce the above
+#    copyright notice, this list of conditions and the following
+#    disclaimer in the documentation and/or other materials provided
+#    with the distribution.
+#  * Neither the name of Willow Garage, Inc. nor the names of its
+#    contributors may be used to endorse or promote products derived
+#    from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE
+# COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT
+# LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN
+# ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+
+import os
+import shutil
+import tempfile
+import unittest
+
+import roslib.msgs
+import roslib.packages
+import roslib.srvs
+
+class GetPkgsSrvSpecsTest(unittest.TestCase):
+
+  def setUp(self):
+    self.root = tempfile.mkdtemp()
+    files = {
+      'pkg_a': dict([('S%02d.srv'%i, 'int32 a\n---\nint32 b%d\n'%i) for i in range(12)]),
+      'pkg_b': {'Add.srv': 'int64 a\nint64 b\n---\nint64 sum\n', 'Broken.srv': 'int32 a b c\n---\n'},
+      }
+    for package, srvs in files.items():
+      d = os.path.join(self.root, package, 'srv')
+      os.makedirs(d)
+      for name, text in srvs.items():
+        with open(os.path.join(d, name), 'w') as f:
+          f.write(text)
+    self.calls = []
+    self._get_pkg_dir = roslib.packages.get_pkg_dir
+    self._get_pkg_dirs = roslib.packages.get_pkg_dirs
+    roslib.packages.get_pkg_dir = self.get_pkg_dir
+    roslib.packages.get_pkg_dirs = lambda packages, required=True: [self.get_pkg_dir(p, required) for p in packages]
+
+  def tearDown(self):
+    roslib.packages.get_pkg_dir = self._get_pkg_dir
+    roslib.packages.get_pkg_dirs = self._get_pkg_dirs
+    shutil.rmtree(self.root)
+
+  def get_pkg_dir(self, package, required=True, ros_root=None, ros_package_path=None):
+    self.calls.append(package)
+    d = os.path.join(self.root, package)
+    if not os.path.isdir(d):
+      raise roslib.packages.InvalidROSPkgException(package)
+    return d
+
+  def _check(self, max_workers):
+    del self.calls[:]
+    specs, failures = roslib.srvs.get_pkgs_srv_specs(['pkg_b', 'pkg_a'], max_workers=max_workers)
+    self.assertEquals(['pkg_b', 'pkg_a'], self.calls)
+    names = [name for name, spec in specs]
+    self.assertEquals(['pkg_b/Add'], names[:1])
+    self.assertEquals(sorted(['pkg_a/S%02d'%i for i in range(12)]), sorted(names[1:]))
+    self.assertEquals(['Broken'], failures)
+    self.assertEquals(['sum'], dict(specs)['pkg_b/Add'].response.names)
+    return names, failures
+
+  def test_get_pkgs_srv_specs(self):
+    threaded = self._check(None)
+    self.assertEquals(threaded, self._check(1))
+    executor = roslib.msgs.ThreadPoolExecutor
+    try:
+      roslib.msgs.ThreadPoolExecutor = None
+      self.assertEquals(threaded, self._check(8))
+    finally:
+      roslib.msgs.ThreadPoolExecutor = executor
+    self.assertEquals(['pkg_b/Add'], [name for name, _ in roslib.srvs.get_pkg_srv_specs('pkg_b')[0]])
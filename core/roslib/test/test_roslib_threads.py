@@ -0,0 +1,187 @@
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2012, Willow Garage, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+#
+#  * Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+#  * Redistributions in binary form must reproduce the above
+#    copyright notice, this list of conditions and the following
+#    disclaimer in the documentation and/or other materials provided
+#    with the distribution.
+#  * Neither the name of Willow Garage, Inc. nor the names of its
+#    contributors may be used to endorse or promote products derived
+#    from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE
+# COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT
+# LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN
+# ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+
+import os
+import sys
+import threading
+import unittest
+
+import rospkg
+
+import roslib.launcher
+import roslib.message
+import roslib.msgs
+import roslib.packages
+import roslib.stacks
+
+from workspace_fixture import WorkspaceTest
+
+PACKAGES = ['pkg_%s'%i for i in range(8)]
+TYPES = ['M%s'%i for i in range(10)]
+
+def hammer(fn, threads=16, iterations=50):
+  """
+  Call fn(thread index, iteration) from many threads at once.
+  @return: exceptions raised by fn
+  """
+  errors = []
+  start = threading.Event()
+  def run(i):
+    start.wait()
+    try:
+      for n in range(iterations):
+        fn(i, n)
+    except Exception as e:
+      errors.append(e)
+  workers = [threading.Thread(target=run, args=(i,)) for i in range(threads)]
+  # switch threads as often as possible to provoke races
+  if hasattr(sys, 'setswitchinterval'):
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+  else: #Python 2
+    interval = sys.getcheckinterval()
+    sys.setcheckinterval(1)
+  try:
+    for w in workers:
+      w.start()
+    start.set()
+    for w in workers:
+      w.join()
+  finally:
+    if hasattr(sys, 'setswitchinterval'):
+      sys.setswitchinterval(interval)
+    else:
+      sys.setcheckinterval(interval)
+  return errors
+
+class ThreadStressTest(WorkspaceTest):
+
+  def setUp(self):
+    WorkspaceTest.setUp(self)
+    os.environ[roslib.launcher.PYTHON_PATH_CACHE_ENV] = ''
+    self._make_pkg('std_msgs', [], {'Header': 'uint32 seq\ntime stamp\nstring frame_id\n'})
+    for p in PACKAGES:
+      self._make_pkg(p, ['std_msgs'], dict([(t, 'Header header\nint32 %s\n'%t.lower()) for t in TYPES]))
+    self.write_rospack_cache([os.path.join(self.ws, p) for p in ['std_msgs'] + PACKAGES])
+
+    self._sys_path = list(sys.path)
+    self._launcher = (set(roslib.launcher._bootstrapped), list(roslib.launcher._added_paths),
+                      roslib.launcher._bootstrapped_ready, roslib.launcher._rospack)
+    roslib.launcher._rospack = None
+    roslib.msgs.reinit()
+
+  def tearDown(self):
+    roslib.msgs.reinit()
+    roslib.msgs.REGISTERED_TYPES.clear()
+    roslib.msgs._initialized = False
+    sys.path[:] = self._sys_path
+    bootstrapped, added_paths, ready, rospack = self._launcher
+    roslib.launcher._bootstrapped.clear()
+    roslib.launcher._bootstrapped.update(bootstrapped)
+    roslib.launcher._added_paths[:] = added_paths
+    roslib.launcher._bootstrapped_ready = ready
+    roslib.launcher._rospack = rospack
+    WorkspaceTest.tearDown(self)
+
+  def _make_pkg(self, name, depends, msgs):
+    d = self.make_pkg(name, depends, dict([('msg/%s.msg'%t, text) for t, text in msgs.items()]))
+    os.makedirs(os.path.join(d, 'src'))
+
+  def test_pkg_dir_cache(self):
+    def lookup(i, n):
+      p = PACKAGES[(i + n) % len(PACKAGES)]
+      self.assertEquals(os.path.join(self.ws, p), roslib.packages.get_pkg_dir(p))
+    self.assertEquals([], hammer(lookup))
+
+    # lookups fall back to crawling while the cache is cleared
+    def lookup_batch(i, n):
+      if i == 0:
+        roslib.packages._invalidate_cache(roslib.packages._pkg_dir_cache)
+      else:
+        self.assertEquals([os.path.join(self.ws, p) for p in PACKAGES], roslib.packages.get_pkg_dirs(PACKAGES))
+    self.assertEquals([], hammer(lookup_batch, iterations=10))
+
+  def test_rosstack(self):
+    envs = [dict(os.environ, ROS_PACKAGE_PATH=os.path.join(self.root, str(i))) for i in range(4)]
+    def init(i, n):
+      env = envs[(i + n) % len(envs)]
+      rosstack = roslib.stacks._init_rosstack(env)
+      self.assertEquals(rospkg.get_ros_paths(env), rosstack.get_ros_paths())
+    self.assertEquals([], hammer(init, iterations=100))
+
+  def test_registry(self):
+    def load(i, n):
+      p = PACKAGES[(i + n) % len(PACKAGES)]
+      if n % 2:
+        roslib.msgs.load_package_dependencies(p)
+      roslib.msgs.load_package(p)
+      for t in TYPES:
+        spec = roslib.msgs.get_registered('%s/%s'%(p, t))
+        self.assertEquals(['header', t.lower()], spec.names)
+      self.assert_(roslib.msgs.is_registered('std_msgs/Header'))
+    self.assertEquals([], hammer(load, iterations=len(PACKAGES)))
+    self.assertEquals(set(['std_msgs'] + PACKAGES), roslib.msgs._loaded_packages)
+    self.assertEquals({}, roslib.msgs._pending_types)
+    for p in PACKAGES:
+      # each file is parsed once and shared by its aliases
+      for t in TYPES:
+        self.assert_(roslib.msgs.get_registered('%s/%s'%(p, t)) is roslib.msgs.get_registered('%s/%s/%s'%(p, p, t)))
+    self.assertEquals(sorted(['%s/%s'%(p, t) for p in PACKAGES for t in TYPES]),
+                      roslib.msgs.get_embedding_types('std_msgs/Header'))
+
+  def test_message_class_cache(self):
+    classes = dict([(t, type(t, (object,), {})) for t in TYPES])
+    loads = []
+    def loader(type_name, reload_on_error=False):
+      loads.append(type_name)
+      return classes.get(type_name.split('/')[1])
+    def get(i, n):
+      t = TYPES[(i + n) % len(TYPES)]
+      if i == 0 and n % 5 == 0:
+        roslib.message._invalidate(cache, misses, None)
+      self.assert_(roslib.message._get_class('pkg/' + t, 'msg', loader, cache, misses, False) is classes[t])
+      self.assertEquals(None, roslib.message._get_class('pkg/Missing', 'msg', loader, cache, misses, False))
+    cache = {}
+    misses = set()
+    self.assertEquals([], hammer(get))
+    self.assert_(len(loads) < 16 * 50 * 2, len(loads))
+
+  def test_load_manifest(self):
+    def load(i, n):
+      p = PACKAGES[(i + n) % len(PACKAGES)]
+      roslib.launcher.load_manifest(p)
+      # paths are on sys.path once load_manifest() returns
+      self.assert_(os.path.join(self.ws, p, 'src') in sys.path, p)
+      self.assert_(os.path.join(self.ws, 'std_msgs', 'src') in sys.path)
+    self.assertEquals([], hammer(load, iterations=len(PACKAGES)))
+    self.assertEquals(len(set(sys.path)), len(sys.path))
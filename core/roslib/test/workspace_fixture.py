@@ -0,0 +1,135 @@
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2012, Willow Garage, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+#
+#  * Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+#  * Redistributions in binary form must reproduce the above
+#    copyright notice, this list of conditions and the following
+#    disclaimer in the documentation and/or other materials provided
+#    with the distribution.
+#  * Neither the name of Willow Garage, Inc. nor the names of its
+#    contributors may be used to endorse or promote products derived
+#    from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE
+# COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT
+# LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN
+# ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+
+"""
+Temporary ROS workspace shared by tests that crawl packages and stacks.
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+
+import roslib.packages
+
+## environment variables that tests of WorkspaceTest may change
+ENV_VARS = ['ROS_ROOT', 'ROS_PACKAGE_PATH', 'ROS_HOME', 'PATH',
+            'ROSLIB_SNAPSHOT', 'ROS_PYTHON_PATH_CACHE']
+
+def write_package(d, depends=(), files=None):
+  """
+  Write a rosbuild package with a manifest.xml to directory d.
+  @param depends: names of the packages it depends on
+  @param files: path relative to d -> text of additional files
+  @return: d
+  """
+  if not os.path.isdir(d):
+    os.makedirs(d)
+  with open(os.path.join(d, 'manifest.xml'), 'w') as f:
+    f.write('<package>%s</package>'%''.join(['<depend package="%s"/>'%p for p in depends]))
+  for path, text in (files or {}).items():
+    path = os.path.join(d, path)
+    if not os.path.isdir(os.path.dirname(path)):
+      os.makedirs(os.path.dirname(path))
+    with open(path, 'w') as f:
+      f.write(text)
+  return d
+
+def write_stack(d):
+  """
+  Write a stack with an empty stack.xml to directory d.
+  @return: d
+  """
+  if not os.path.isdir(d):
+    os.makedirs(d)
+  with open(os.path.join(d, 'stack.xml'), 'w') as f:
+    f.write('<stack></stack>')
+  return d
+
+class WorkspaceTest(unittest.TestCase):
+  """
+  Base class for tests that run against a temporary workspace
+  self.ws, which is the only entry of ROS_PACKAGE_PATH. ROS_ROOT
+  does not exist and ROS_HOME is a temporary directory. The variables
+  of ENV_VARS and the package directory cache are restored after
+  each test.
+  """
+
+  def setUp(self):
+    self.root = tempfile.mkdtemp()
+    self.ws = os.path.join(self.root, 'ws')
+    self.home = os.path.join(self.root, 'home')
+    os.makedirs(self.ws)
+    os.makedirs(self.home)
+    self._saved_env = dict([(k, os.environ.get(k)) for k in ENV_VARS])
+    os.environ['ROS_ROOT'] = os.path.join(self.root, 'no_root')
+    os.environ['ROS_PACKAGE_PATH'] = self.ws
+    os.environ['ROS_HOME'] = self.home
+    os.environ.pop('ROSLIB_SNAPSHOT', None)
+    self._saved_pkg_dir_cache = dict(roslib.packages._pkg_dir_cache)
+    roslib.packages._pkg_dir_cache.clear()
+
+  def tearDown(self):
+    roslib.packages._pkg_dir_cache.clear()
+    roslib.packages._pkg_dir_cache.update(self._saved_pkg_dir_cache)
+    for k, v in self._saved_env.items():
+      if v is None:
+        os.environ.pop(k, None)
+      else:
+        os.environ[k] = v
+    shutil.rmtree(self.root)
+
+  def make_pkg(self, path, depends=(), files=None):
+    """
+    Write a package to path relative to the workspace.
+    @return: package directory
+    """
+    return write_package(os.path.join(self.ws, path), depends, files)
+
+  def make_stack(self, path):
+    """
+    Write a stack to path relative to the workspace.
+    @return: stack directory
+    """
+    return write_stack(os.path.join(self.ws, path))
+
+  def write_rospack_cache(self, pkg_dirs):
+    """
+    Write the rospack_cache file that roslib.packages reads its
+    package directory cache from.
+    @param pkg_dirs: package directories to list
+    """
+    with open(os.path.join(self.home, 'rospack_cache'), 'w') as f:
+      f.write('#ROS_ROOT=%s\n#ROS_PACKAGE_PATH=%s\n'%(os.environ['ROS_ROOT'], os.environ['ROS_PACKAGE_PATH']))
+      for d in pkg_dirs:
+        f.write(d + '\n')